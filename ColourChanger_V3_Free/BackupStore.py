@@ -0,0 +1,244 @@
+# BackupStore.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import shutil
+import threading
+import json
+import time
+import os
+import sys
+
+from ConvCache import sha256_file
+
+try:
+    import fcntl  # Linux: FICLONE (copy-on-write clone on btrfs/xfs)
+except ImportError:
+    fcntl = None
+
+'''
+Description:
+Backups of the .sav, keyed by content hash (sha256)
+
+#1) Dedup:
+The same bytes are stored once --> saving again without a game change adds nothing
+
+#2) Cheap snapshots:
+clone (copy-on-write, Linux btrfs/xfs) --> plain copy
+A hardlink only when explicitly asked for (link=True): the game may write the .sav in place,
+which would change the stored object too --> a linked object is re-hashed before it is reused
+
+#3) Retention:
+Least recently used backups are evicted when there are more than max_count of them
+or they take more than max_bytes (the newest one is always kept)
+
+#4) Restore:
+restore(hash or unique prefix, dest) --> checks the hash, then replaces dest atomically
+
+Store: <SaveGames>/.lvcc_backups/
+    objects/<sha256>.sav
+    index.json  {"<sha256>": {"size", "source", "method", "created", "last_used"}}
+'''
+
+STORE_NAME = ".lvcc_backups"
+MAX_COUNT = 50
+MAX_BYTES = 256 * 1024 * 1024
+_FICLONE = 0x40049409
+
+
+class BackupError(RuntimeError):
+    """백업을 찾을 수 없거나 내용이 손상됨"""
+
+
+def _clone(src: Path, dst: Path) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        with src.open("rb") as s, dst.open("wb") as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        return True
+    except OSError:
+        dst.unlink(missing_ok=True)
+        return False
+
+
+def _place(src: Path, dst: Path, link: bool) -> str:
+    """src --> dst, 가능한 가장 싼 방법으로. 사용한 방법 이름 반환."""
+    if _clone(src, dst):
+        return "clone"
+    if link:
+        try:
+            os.link(src, dst)
+            return "link"
+        except OSError:
+            pass  # 다른 드라이브/FAT 등
+    shutil.copyfile(src, dst)
+    return "copy"
+
+
+class BackupStore:
+    """SaveGames 폴더 하나의 백업 저장소"""
+
+    def __init__(self, save_dir: str | Path, max_count: int = MAX_COUNT, max_bytes: int = MAX_BYTES):
+        self.root = Path(save_dir) / STORE_NAME
+        self.objects = self.root / "objects"
+        self.index_path = self.root / "index.json"
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with self.index_path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        tmp.write_text(json.dumps(self.entries, indent=2), encoding="utf-8")
+        tmp.replace(self.index_path)
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects / f"{digest}.sav"
+
+    # ---- 백업 ----
+    def snapshot(self, file: str | Path, sha256: Optional[str] = None, link: bool = False) -> Optional[str]:
+        """
+        file의 현재 내용을 백업하고 해시를 반환 (파일이 없으면 None).
+        - sha256: 이미 알고 있으면 넘겨서 다시 읽지 않음 (ConversionCache.known_hash)
+        - link=True: 하드링크 허용. 호출한 쪽이 곧 file을 새 파일로 '교체'(replace)할 때만!
+          (제자리에 덮어쓰면 백업도 같이 바뀜)
+        """
+        file = Path(file)
+        if not file.exists():
+            return None
+        digest = sha256 or sha256_file(file)
+        now = time.time()
+        with self._lock:
+            obj = self.object_path(digest)
+            entry = self.entries.get(digest)
+            if entry is not None and entry.get("method") == "link" and not self._intact(digest):
+                entry = None  # 링크된 원본이 제자리에서 바뀜 → 다시 저장
+            if entry is not None and obj.exists():
+                entry["last_used"] = now  # 같은 내용 → 새로 저장하지 않음
+            else:
+                self.objects.mkdir(parents=True, exist_ok=True)
+                tmp = obj.with_name(obj.name + ".tmp")
+                tmp.unlink(missing_ok=True)
+                method = _place(file, tmp, link)
+                tmp.replace(obj)
+                self.entries[digest] = {
+                    "size": obj.stat().st_size, "source": file.name, "method": method,
+                    "created": now, "last_used": now,
+                }
+                print(f"[backup] {file.name} -> {digest[:12]} ({method})", file=sys.stderr)
+            self._evict(keep=digest)
+            self._save()
+        return digest
+
+    def _intact(self, digest: str) -> bool:
+        try:
+            return sha256_file(self.object_path(digest)) == digest
+        except OSError:
+            return False
+
+    def _evict(self, keep: str) -> List[str]:
+        """LRU 순서로 max_count / max_bytes 를 넘는 만큼 삭제"""
+        removed = []
+        order = sorted(self.entries, key=lambda d: (self.entries[d]["last_used"], self.entries[d]["created"]))
+        total = sum(e["size"] for e in self.entries.values())
+        for digest in order:
+            if len(self.entries) <= self.max_count and total <= self.max_bytes:
+                break
+            if digest == keep:
+                continue
+            total -= self.entries.pop(digest)["size"]
+            self.object_path(digest).unlink(missing_ok=True)
+            removed.append(digest)
+        return removed
+
+    # ---- 조회 / 복원 ----
+    def list(self) -> List[Dict[str, Any]]:
+        """최근에 쓴 것부터: [{"sha256", "size", "source", ...}]"""
+        items = [{"sha256": d, **e} for d, e in self.entries.items()]
+        return sorted(items, key=lambda e: e["last_used"], reverse=True)
+
+    def resolve(self, prefix: str) -> str:
+        """해시 전체 또는 앞부분(유일해야 함) → 해시 전체"""
+        if prefix in self.entries:
+            return prefix
+        hits = [d for d in self.entries if d.startswith(prefix)]
+        if len(hits) != 1:
+            raise BackupError(f"backup not found: {prefix}" if not hits else f"ambiguous backup hash: {prefix}")
+        return hits[0]
+
+    def restore(self, digest: str, dest: str | Path, verify: bool = True) -> Path:
+        """
+        백업 내용을 dest 에 복원 (tmp에 만든 뒤 replace → 실패해도 dest는 그대로).
+        verify=True 면 복원 전에 해시 확인.
+        """
+        dest = Path(dest)
+        with self._lock:
+            digest = self.resolve(digest)
+            obj = self.object_path(digest)
+            if not obj.exists():
+                self.entries.pop(digest, None)
+                self._save()
+                raise BackupError(f"backup file missing: {obj.name}")
+            if verify and sha256_file(obj) != digest:
+                raise BackupError(f"backup corrupted: {obj.name}")
+            tmp = dest.with_name(dest.name + ".tmp")
+            tmp.unlink(missing_ok=True)
+            _place(obj, tmp, link=False)  # dest는 게임이 제자리에 덮어쓸 수 있으므로 링크 금지
+            tmp.replace(dest)
+            self.entries[digest]["last_used"] = time.time()
+            self._save()
+        print(f"[restore] {digest[:12]} -> {dest}", file=sys.stderr)
+        return dest
+
+
+# -------------------------
+# Testing
+# -------------------------
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sav = Path(tmp) / "characterStyle-1.0.sav"
+        store = BackupStore(tmp, max_count=3)
+
+        sav.write_bytes(b"v1")
+        h1 = store.snapshot(sav)
+        assert store.snapshot(sav) == h1 and len(store.entries) == 1  # dedup
+
+        for i in range(2, 6):
+            sav.write_bytes(b"v%d" % i)
+            store.snapshot(sav)
+        assert len(store.entries) == 3 and h1 not in store.entries  # LRU eviction
+        assert len(list(store.objects.iterdir())) == 3
+
+        h5 = store.list()[0]["sha256"]
+        sav.write_bytes(b"broken")
+        store.restore(h5[:8], sav)
+        assert sav.read_bytes() == b"v5"
+
+        # link=True 다음에 replace로 쓰면 백업은 그대로
+        sav.write_bytes(b"v6")
+        h6 = store.snapshot(sav, link=True)
+        new = sav.with_name("new.tmp")
+        new.write_bytes(b"v7")
+        new.replace(sav)
+        assert store.object_path(h6).read_bytes() == b"v6"
+
+        # 링크된 백업의 원본을 제자리에서 고치면 → 다음 snapshot이 다시 저장
+        sav.write_bytes(b"v8")
+        h8 = store.snapshot(sav, link=True)
+        with sav.open("r+b") as f:
+            f.write(b"v9")
+        new.write_bytes(b"v8")
+        new.replace(sav)
+        assert store.snapshot(sav) == h8 and store.object_path(h8).read_bytes() == b"v8"
+        print("ok:", [e["method"] for e in store.list()])
@@ -0,0 +1,203 @@
+# BatchApply.py
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+import atexit
+import hashlib
+import json
+import os
+import time
+
+import Uesave
+from ConvCache import file_identity
+from Create_json import STYLE_SAV
+from Headless import PARTS, Session, parse_color, use_uesave
+
+'''
+Description:
+The same Skin / Hair / BALDY recipe applied to many SaveGames folders at once
+
+#1) Manifest:
+One SaveGames folder per line (blank lines and "# ..." ignored), or a JSON list of folders
+
+#2) Recipe:
+{"Skin": "#ffccaa", "Hair": "10,10,10", "baldy": true}   (colours as in Headless.parse_color, all keys optional)
+    python Headless.py apply-all manifest.txt --recipe recipe.json
+    python Headless.py apply-all manifest.txt --skin "#ffccaa" --baldy
+
+#3) Run:
+Every folder is one job on a process pool of `workers` (each process has its own uesave/GVAS state).
+A folder whose Str would come out the same is not written ("unchanged").
+One JSON line per folder as it finishes: {"dir", "status": written|unchanged|skipped|error, "ms", ...},
+then a summary line.
+stdout carries only these lines: the workers' progress ([exec], [backup], [ok] wrote) goes to stderr.
+
+#4) Resume:
+Finished folders are appended to <manifest>.done.jsonl (recipe hash + .sav size/mtime after the run).
+Running again with the same recipe skips them ("skipped") unless their .sav changed since;
+errors are not recorded, so they are retried. --restart ignores the journal.
+'''
+
+JOURNAL_SUFFIX = ".done.jsonl"
+MAX_WORKERS = min(8, os.cpu_count() or 1)  # 폴더 하나 = 프로세스 하나 (sav가 작아서 CPU 수 정도면 충분)
+
+
+def read_manifest(path: str | Path) -> List[Path]:
+    """폴더 목록 (같은 폴더가 두 번 나오면 한 번만 → 두 프로세스가 같은 sav를 쓰지 않음)"""
+    text = Path(path).read_text(encoding="utf-8")
+    if text.lstrip().startswith("["):
+        items = [str(x) for x in json.loads(text)]
+    else:
+        items = [ln.strip() for ln in text.splitlines() if ln.strip() and not ln.strip().startswith("#")]
+    return list(dict.fromkeys(Path(p).expanduser().absolute() for p in items))
+
+
+def normalize_recipe(recipe: Dict[str, Any]) -> Dict[str, Any]:
+    """색은 게임 Str 형식으로 바꿔 둔다 (잘못된 색은 작업을 띄우기 전에 ValueError)"""
+    unknown = set(recipe) - set(PARTS) - {"baldy"}
+    if unknown:
+        raise ValueError(f"unknown recipe keys: {', '.join(sorted(unknown))}")
+    out: Dict[str, Any] = {p: parse_color(str(recipe[p])) for p in PARTS if recipe.get(p)}
+    if recipe.get("baldy"):
+        out["baldy"] = True
+    if not out:
+        raise ValueError("empty recipe (give Skin, Hair and/or baldy)")
+    return out
+
+
+def recipe_hash(recipe: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(recipe, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+# -------- 작업 프로세스 --------
+def _init_worker(uesave: Optional[str], native: bool) -> None:
+    use_uesave(uesave, native)
+    atexit.register(lambda: Uesave.get().close())
+
+
+def _apply_one(save_dir: str, recipe: Dict[str, Any]) -> Dict[str, Any]:
+    """폴더 하나: 읽기 → 레시피 → Str이 달라졌을 때만 기록"""
+    t0 = time.perf_counter()
+    result: Dict[str, Any] = {"dir": save_dir}
+    try:
+        session = Session(save_dir)
+        doc = session.doc()
+        before = doc.to_str()
+        for part in PARTS:
+            if part in recipe:
+                doc.set_field(part, "color", recipe[part])
+        if recipe.get("baldy"):
+            doc.set_baldy()
+        if doc.to_str() == before:
+            doc.discard()
+            result["status"] = "unchanged"
+        else:
+            result.update(session.apply(), status="written")
+        result.update(file_identity(session.sav))
+    except Exception as e:  # 폴더 하나의 실패가 나머지를 멈추지 않도록 결과로 돌려줌
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+    result["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return result
+
+
+# -------- 진행 기록 (재개용) --------
+class Journal:
+    """끝난 폴더를 한 줄씩 덧붙이는 JSONL (중간에 끊겨도 그때까지 끝난 것은 남음)"""
+
+    def __init__(self, path: Path, recipe: str):
+        self.path = path
+        self.recipe = recipe
+
+    def done(self) -> Dict[str, Dict[str, Any]]:
+        """같은 레시피로 끝난 폴더 → 기록 (나중 줄이 이김)"""
+        entries: Dict[str, Dict[str, Any]] = {}
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        e = json.loads(line)
+                    except ValueError:
+                        continue  # 쓰는 도중 끊긴 마지막 줄
+                    if isinstance(e, dict) and e.get("recipe") == self.recipe:
+                        entries[e["dir"]] = e
+        except OSError:
+            pass
+        return entries
+
+    def is_done(self, entries: Dict[str, Dict[str, Any]], save_dir: Path) -> bool:
+        e = entries.get(str(save_dir))
+        try:
+            ident = file_identity(save_dir / STYLE_SAV)
+        except OSError:
+            return False
+        return e is not None and ident == {"size": e.get("size"), "mtime_ns": e.get("mtime_ns")}
+
+    def add(self, result: Dict[str, Any]) -> None:
+        entry = {"dir": result["dir"], "recipe": self.recipe, "status": result["status"],
+                 "size": result.get("size"), "mtime_ns": result.get("mtime_ns")}
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+
+    def reset(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def run(dirs: List[Path], recipe: Dict[str, Any], journal: Optional[Journal] = None,
+        workers: int = MAX_WORKERS, uesave: Optional[str] = None, native: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    폴더별 결과를 끝나는 순서대로 내보낸다 (journal에 이미 끝난 폴더는 "skipped").
+    마지막에 {"summary": {...}} 한 줄.
+    """
+    t0 = time.perf_counter()
+    counts = {"written": 0, "unchanged": 0, "skipped": 0, "error": 0}
+    finished = journal.done() if journal else {}
+    todo: List[Path] = []
+    for d in dirs:
+        if journal and journal.is_done(finished, d):
+            counts["skipped"] += 1
+            yield {"dir": str(d), "status": "skipped", "ms": 0.0}
+        else:
+            todo.append(d)
+
+    if todo:
+        pool = ProcessPoolExecutor(max_workers=max(1, min(workers, len(todo))),
+                                   initializer=_init_worker, initargs=(uesave, native))
+        try:
+            futures = [pool.submit(_apply_one, str(d), recipe) for d in todo]
+            for fut in as_completed(futures):
+                result = fut.result()
+                counts[result["status"]] += 1
+                if journal and result["status"] != "error":
+                    journal.add(result)
+                yield result
+        finally:
+            # 중단(Ctrl+C)되면 아직 시작하지 않은 폴더는 버림 → 다음 실행에서 이어서
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    yield {"summary": {**counts, "dirs": len(dirs), "ms": round((time.perf_counter() - t0) * 1000, 1)}}
+
+
+def load_recipe(path: Optional[str], skin: Optional[str] = None, hair: Optional[str] = None,
+                baldy: bool = False) -> Dict[str, Any]:
+    """--recipe 파일 + 명령줄 값 (명령줄이 이김)"""
+    recipe: Dict[str, Any] = json.loads(Path(path).read_text(encoding="utf-8")) if path else {}
+    if not isinstance(recipe, dict):
+        raise ValueError("recipe must be a JSON object")
+    for key, value in (("Skin", skin), ("Hair", hair), ("baldy", baldy or None)):
+        if value:
+            recipe[key] = value
+    return normalize_recipe(recipe)
+
+
+# -------------------------
+# Testing
+# -------------------------
+if __name__ == "__main__":
+    import sys
+    # 명령줄은 Headless.py apply-all (python Headless.py apply-all <manifest> --recipe <recipe.json>)
+    manifest = sys.argv[1] if len(sys.argv) > 1 else "manifest.txt"
+    rec = load_recipe(None, skin="#ffccaa")
+    for line in run(read_manifest(manifest), rec, Journal(Path(manifest + JOURNAL_SUFFIX), recipe_hash(rec))):
+        print(json.dumps(line, ensure_ascii=False))
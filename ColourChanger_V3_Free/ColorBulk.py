@@ -0,0 +1,289 @@
+# ColorBulk.py
+from __future__ import annotations
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import colorsys
+import re
+
+from Update_json import StyleBlock, parse_blocks, build_str
+from Palette import PaletteLibrary, rgb_to_lab
+
+# NumPy(선택): 있으면 모든 색을 배열 하나로 한 번에 계산, 없으면 같은 연산을 색 하나씩
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+'''
+Description:
+Bulk colour edits over EVERY block of the Str (not only Skin / Hair)
+
+#1) Load:
+Every field of every block whose value is an RGBA "(R=..,G=..,B=..,A=..)" (color, and e.g. a second colour
+of the same block; `fields=[...]` limits it) --> one row each in a (n, 3) float array of R, G, B in 0..1
+A field name repeated inside one block counts once: its last value, the one the game and StyleBlock use.
+(A is kept as the original text, it is never changed)
+
+#2) Transforms (all blocks at once, or only `types=[...]`):
+hue_shift(degrees), scale_saturation(factor), scale_value(factor),
+gradient(start_rgb255, end_rgb255, strength), remap(palette_rgb255) / remap_library(PaletteLibrary)
+
+#3) Write back:
+write() puts the changed colours into the StyleBlocks (patches) --> build_str / StyleDocument.commit()
+writes everything in one pass. Colours are quantised to 0..255 and formatted like rgba_str_from_255,
+colours that did not change keep their original text.
+
+Usage:
+    with StyleDocument(json_path) as doc:
+        bulk = BulkColors(doc.blocks, doc.order)
+        bulk.hue_shift(30).scale_saturation(1.2, types=["Hair"])
+        bulk.write()
+'''
+
+COLOR_RE = re.compile(r"\(R=([-+0-9.eE]+),G=([-+0-9.eE]+),B=([-+0-9.eE]+),A=([^)]*)\)")
+
+
+def _fmt(q: int) -> str:
+    return str(round(q / 255, 6))
+
+
+_FMT = [_fmt(q) for q in range(256)]  # 0..255 → rgba_str_from_255와 같은 숫자 문자열
+
+
+class BulkColors:
+    """블록들의 색 필드 값을 배열로 모아 한 번에 변환 (행 하나 = 블록 하나의 색 필드 하나)"""
+
+    def __init__(self, blocks: Dict[str, StyleBlock], order: Optional[Iterable[str]] = None,
+                 fields: Optional[Iterable[str]] = None):
+        self.blocks = blocks
+        self.types: List[str] = []
+        self.fields: List[str] = []
+        self.alpha: List[str] = []
+        rows: List[Tuple[float, float, float]] = []
+        wanted = list(fields) if fields is not None else None
+        for typ in dict.fromkeys(order if order is not None else blocks):
+            blk = blocks.get(typ)
+            if blk is None:
+                continue
+            names = wanted if wanted is not None else list(dict.fromkeys([*blk.fields, *blk.patches]))
+            for name in names:
+                m = COLOR_RE.fullmatch(blk.get(name))
+                if m is None:
+                    continue  # 색이 아닌 필드 / 알 수 없는 형식은 건드리지 않음
+                self.types.append(typ)
+                self.fields.append(name)
+                self.alpha.append(m.group(4))
+                rows.append((float(m.group(1)), float(m.group(2)), float(m.group(3))))
+        self.rgb = np.array(rows, dtype=np.float64).reshape(-1, 3) if np is not None else [list(r) for r in rows]
+        self._orig = self._quantized()  # 원래 값 (0~255) → write()는 이것과 다른 색만 기록
+
+    @classmethod
+    def from_str(cls, s: str) -> Tuple["BulkColors", Tuple[List[str], Dict[str, StyleBlock], str]]:
+        parsed = parse_blocks(s)
+        return cls(parsed[1], parsed[0]), parsed
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    # ---- 선택 ----
+    def _rows(self, types: Optional[Iterable[str]]) -> List[int]:
+        if types is None:
+            return list(range(len(self.types)))
+        wanted = set(types)
+        return [i for i, t in enumerate(self.types) if t in wanted]
+
+    def _map(self, types: Optional[Iterable[str]],
+             vec: Callable[["np.ndarray"], "np.ndarray"],
+             one: Callable[[List[float]], List[float]]) -> "BulkColors":
+        rows = self._rows(types)
+        if not rows:
+            return self
+        if np is not None:
+            idx = np.array(rows)
+            self.rgb[idx] = np.clip(vec(self.rgb[idx]), 0.0, 1.0)
+        else:
+            for i in rows:
+                self.rgb[i] = [min(1.0, max(0.0, c)) for c in one(self.rgb[i])]
+        return self
+
+    # ---- HSV 계열 ----
+    def _hsv_map(self, types, fh: Callable, fs: Callable, fv: Callable) -> "BulkColors":
+        def vec(rgb):
+            h, s, v = _rgb_to_hsv(rgb)
+            return _hsv_to_rgb(fh(h) % 1.0, np.clip(fs(s), 0, 1), np.clip(fv(v), 0, 1))
+
+        def one(rgb):
+            h, s, v = colorsys.rgb_to_hsv(*rgb)
+            return list(colorsys.hsv_to_rgb(fh(h) % 1.0, min(1.0, max(0.0, fs(s))), min(1.0, max(0.0, fv(v)))))
+
+        return self._map(types, vec, one)
+
+    def hue_shift(self, degrees: float, types: Optional[Iterable[str]] = None) -> "BulkColors":
+        d = degrees / 360.0
+        return self._hsv_map(types, lambda h: h + d, lambda s: s, lambda v: v)
+
+    def scale_saturation(self, factor: float, types: Optional[Iterable[str]] = None) -> "BulkColors":
+        return self._hsv_map(types, lambda h: h, lambda s: s * factor, lambda v: v)
+
+    def scale_value(self, factor: float, types: Optional[Iterable[str]] = None) -> "BulkColors":
+        return self._hsv_map(types, lambda h: h, lambda s: s, lambda v: v * factor)
+
+    # ---- 그라데이션 ----
+    def gradient(self, start: Sequence[int], end: Sequence[int], strength: float = 1.0,
+                 types: Optional[Iterable[str]] = None) -> "BulkColors":
+        """선택된 블록 순서대로 start→end 그라데이션 색을 strength(0~1)만큼 섞음"""
+        rows = self._rows(types)
+        n = len(rows)
+        if n == 0:
+            return self
+        a = [c / 255 for c in start]
+        b = [c / 255 for c in end]
+        if np is not None:
+            t = np.linspace(0.0, 1.0, n)[:, None] if n > 1 else np.zeros((1, 1))
+            target = np.array(a) + (np.array(b) - np.array(a)) * t
+            idx = np.array(rows)
+            self.rgb[idx] = np.clip(self.rgb[idx] * (1 - strength) + target * strength, 0.0, 1.0)
+        else:
+            for k, i in enumerate(rows):
+                t = k / (n - 1) if n > 1 else 0.0
+                self.rgb[i] = [min(1.0, max(0.0, c * (1 - strength) + (x + (y - x) * t) * strength))
+                               for c, x, y in zip(self.rgb[i], a, b)]
+        return self
+
+    # ---- 팔레트 재매핑 ----
+    def remap(self, palette: Sequence[Sequence[int]], types: Optional[Iterable[str]] = None) -> "BulkColors":
+        """각 색을 palette(0~255 RGB 목록)에서 CIELAB 거리가 가장 가까운 색으로"""
+        rows = self._rows(types)
+        if not rows or not palette:
+            return self
+        if np is not None:
+            pal = np.array(palette, dtype=np.float64) / 255
+            idx = np.array(rows)
+            d = ((_lab(self.rgb[idx])[:, None, :] - _lab(pal)[None, :, :]) ** 2).sum(axis=2)
+            self.rgb[idx] = pal[d.argmin(axis=1)]
+        else:
+            pal_lab = [rgb_to_lab(p) for p in palette]
+            for i in rows:
+                lab = rgb_to_lab([round(c * 255) for c in self.rgb[i]])
+                j = min(range(len(palette)), key=lambda j: sum((x - y) ** 2 for x, y in zip(lab, pal_lab[j])))
+                self.rgb[i] = [c / 255 for c in palette[j]]
+        return self
+
+    def remap_library(self, lib: PaletteLibrary, kind: Optional[str] = None,
+                      types: Optional[Iterable[str]] = None) -> "BulkColors":
+        """PaletteLibrary의 프리셋 중 가장 가까운 색으로 (k-d tree 검색, 색 하나당 1회)"""
+        for i in self._rows(types):
+            hit = lib.nearest(self.rgb255(i), k=1, kind=kind)
+            if hit:
+                self.rgb[i] = [c / 255 for c in hit[0][0].rgb]
+        return self
+
+    # ---- 결과 ----
+    def rgb255(self, i: int) -> Tuple[int, int, int]:
+        r, g, b = (min(255, max(0, int(round(float(c) * 255)))) for c in self.rgb[i])
+        return r, g, b
+
+    def changed(self) -> List[Tuple[str, str]]:
+        """색이 바뀐 (type, field)"""
+        return [(self.types[i], self.fields[i]) for i, q in enumerate(self._quantized()) if q != self._orig[i]]
+
+    def _quantized(self) -> List[Tuple[int, int, int]]:
+        if np is not None:
+            return [tuple(q) for q in np.clip(np.rint(self.rgb * 255), 0, 255).astype(int).tolist()]
+        return [self.rgb255(i) for i in range(len(self.types))]
+
+    def write(self) -> int:
+        """바뀐 색만 StyleBlock 패치로 기록 → 기록한 블록 수 (파일 쓰기는 build_str / commit 때)"""
+        n = 0
+        for i, q in enumerate(self._quantized()):
+            if q == self._orig[i]:
+                continue
+            r, g, b = q
+            self.blocks[self.types[i]].set(self.fields[i], f"(R={_FMT[r]},G={_FMT[g]},B={_FMT[b]},A={self.alpha[i]})")
+            n += 1
+        return n
+
+
+# -------- 배열용 색 공간 변환 (NumPy) --------
+def _rgb_to_hsv(rgb):
+    r, g, b = rgb[:, 0], rgb[:, 1], rgb[:, 2]
+    mx = rgb.max(axis=1)
+    mn = rgb.min(axis=1)
+    delta = mx - mn
+    safe = np.where(delta == 0, 1.0, delta)
+    h = np.where(mx == r, (g - b) / safe, np.where(mx == g, 2.0 + (b - r) / safe, 4.0 + (r - g) / safe))
+    h = np.where(delta == 0, 0.0, (h / 6.0) % 1.0)
+    s = np.where(mx == 0, 0.0, delta / np.where(mx == 0, 1.0, mx))
+    return h, s, mx
+
+
+def _hsv_to_rgb(h, s, v):
+    i = np.floor(h * 6.0)
+    f = h * 6.0 - i
+    p, q, t = v * (1 - s), v * (1 - s * f), v * (1 - s * (1 - f))
+    i = i.astype(int) % 6
+    r = np.choose(i, [v, q, p, p, t, v])
+    g = np.choose(i, [t, v, v, q, p, p])
+    b = np.choose(i, [p, p, t, v, v, q])
+    return np.stack([r, g, b], axis=1)
+
+
+def _lab(rgb):
+    """(n,3) sRGB 0~1 → (n,3) CIELAB (Palette.rgb_to_lab과 같은 식)"""
+    lin = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    m = np.array([[0.4124564, 0.3575761, 0.1804375],
+                  [0.2126729, 0.7151522, 0.0721750],
+                  [0.0193339, 0.1191920, 0.9503041]])
+    xyz = lin @ m.T / np.array([0.95047, 1.0, 1.08883])
+    f = np.where(xyz > 216 / 24389, np.cbrt(xyz), (24389 / 27 * xyz + 16) / 116)
+    return np.stack([116 * f[:, 1] - 16, 500 * (f[:, 0] - f[:, 1]), 200 * (f[:, 1] - f[:, 2])], axis=1)
+
+
+def transform_str(s: str, fn: Callable[[BulkColors], object]) -> str:
+    """Str 하나에 fn(bulk)을 적용한 새 Str (파일은 건드리지 않음)"""
+    bulk, (order, blocks, tail) = BulkColors.from_str(s)
+    fn(bulk)
+    bulk.write()
+    return build_str(order, blocks, tail)
+
+
+# -------------------------
+# Testing: NumPy/없는 경우 결과 비교 + 블록 수백 개 시간
+# -------------------------
+if __name__ == "__main__":
+    import time
+
+    def make(n: int) -> str:
+        return "".join(
+            f"definitionid:T{i};color:(R={(i * 37 % 256) / 255:.6f},G={(i * 91 % 256) / 255:.6f},"
+            f"B={(i * 13 % 256) / 255:.6f},A=1.000000);type:T{i};" for i in range(n)) + "version:2"
+
+    s = make(6)
+    assert transform_str(s, lambda b: None) == s  # 아무것도 안 바꾸면 그대로
+
+    # 블록 하나에 색 필드가 여럿 → 모두 변환, 색이 아닌 필드는 그대로
+    two = "definitionid:Hat_1;color:(R=1.0,G=0.0,B=0.0,A=1.000000);fxcolor:(R=0.0,G=0.0,B=1.0,A=0.5);fx:a;type:Hat;"
+    b2, parsed = BulkColors.from_str(two)
+    assert b2.fields == ["color", "fxcolor"]
+    b2.hue_shift(120).write()
+    assert b2.changed() == [("Hat", "color"), ("Hat", "fxcolor")]
+    assert build_str(*parsed) == ("definitionid:Hat_1;color:(R=0.0,G=1.0,B=0.0,A=1.000000);"
+                                  "fxcolor:(R=1.0,G=0.0,B=0.0,A=0.5);fx:a;type:Hat;")
+    assert transform_str(s, lambda b: b.hue_shift(360)) == s
+
+    def edits(b: BulkColors) -> None:
+        b.hue_shift(40).scale_saturation(0.7, types=["T1", "T3"]).gradient((255, 0, 0), (0, 0, 255), 0.5)
+        b.remap([(0, 0, 0), (255, 255, 255), (200, 120, 90)], types=["T5"])
+
+    out = transform_str(s, edits)
+    if np is not None:
+        saved, np = np, None
+        assert transform_str(s, edits) == out, "numpy / pure python mismatch"
+        np = saved
+    print(out)
+
+    big = make(1000)
+    for _ in range(2):
+        t0 = time.perf_counter()
+        transform_str(big, lambda b: b.hue_shift(25).scale_saturation(1.1))
+        dt = (time.perf_counter() - t0) * 1000
+    print(f"1000 blocks, parse + hue + saturation + write + build: {dt:.2f} ms (numpy={np is not None})")
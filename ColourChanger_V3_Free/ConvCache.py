@@ -0,0 +1,159 @@
+# ConvCache.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import hashlib
+import json
+import sys
+
+'''
+Description:
+Conversion cache for .sav --> .json
+
+create_json() is called on startup, on every Refresh and at the start of every Save.
+If the .sav did not change since the last conversion (and nobody touched the .json),
+the existing .json is still correct --> skip the conversion entirely.
+
+Cache file: <SaveGames>/.lvcc_cache.json
+{
+    "characterStyle-1.0.sav": {
+        "size": ..., "mtime_ns": ..., "sha256": "...",
+        "json": {"name": "characterStyle-1.0.json", "size": ..., "mtime_ns": ...},
+        "properties": ["AllStyleValues_0", ...]
+    },
+    ... one entry per .sav in the folder
+}
+
+It doubles as the index of every .sav in SaveGames: saves() lists them (optionally only
+the ones that have a given top-level property) without opening any .sav.
+'''
+
+CACHE_NAME = ".lvcc_cache.json"
+
+
+def file_identity(path: Path) -> Dict[str, int]:
+    st = Path(path).stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with Path(path).open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ConversionCache:
+    """SaveGames 폴더 하나의 변환 캐시 (sav 크기/mtime/해시 + 대응 json의 크기/mtime)"""
+
+    def __init__(self, save_dir: str | Path):
+        self.save_dir = Path(save_dir)
+        self.path = self.save_dir / CACHE_NAME
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self) -> None:
+        try:
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(self.entries, indent=2), encoding="utf-8")
+            tmp.replace(self.path)
+        except OSError as e:
+            # 캐시는 최적화일 뿐: 못 써도 변환 자체는 성공
+            print("[cache] write failed:", e, file=sys.stderr)
+
+    def lookup(self, sav: Path, jpath: Path) -> bool:
+        '''
+        #1) json must be exactly the one we recorded (not edited, not deleted)
+        #2) sav size + mtime equal --> hit without reading the file
+        #3) mtime changed but content hash equal (e.g. touched/copied) --> hit, refresh identity
+        '''
+        entry = self.entries.get(sav.name)
+        if not entry or not sav.exists() or not jpath.exists():
+            return False
+        if entry.get("json") != {"name": jpath.name, **file_identity(jpath)}:
+            return False
+
+        ident = file_identity(sav)
+        if ident == {"size": entry.get("size"), "mtime_ns": entry.get("mtime_ns")}:
+            return True
+        if ident["size"] != entry.get("size") or sha256_file(sav) != entry.get("sha256"):
+            return False
+        entry.update(ident)
+        self._save()
+        return True
+
+    def known_hash(self, sav: Path) -> Optional[str]:
+        """sav가 기록 당시 그대로(크기/mtime)면 기록된 sha256, 아니면 None (파일을 읽지 않음)"""
+        entry = self.entries.get(Path(sav).name)
+        try:
+            ident = file_identity(sav)
+        except OSError:
+            return None
+        if not entry or ident != {"size": entry.get("size"), "mtime_ns": entry.get("mtime_ns")}:
+            return None
+        return entry.get("sha256")
+
+    def record(self, sav: Path, jpath: Path,
+               sav_ident: Optional[Dict[str, int]] = None, sha256: Optional[str] = None,
+               properties: Optional[List[str]] = None, flush: bool = True) -> None:
+        """
+        sav와 jpath가 같은 내용을 나타낸다고 기록.
+        sav_ident/sha256은 변환 '전'에 잰 값을 넘기면, 변환 중에 게임이 sav를 바꿔도 잘못 hit 하지 않음.
+        properties(최상위 property 이름)가 없으면 이전 기록을 유지 (Str만 고쳐 쓴 경우 이름은 그대로).
+        flush=False 면 여러 개를 기록한 뒤 flush() 한 번으로 저장.
+        """
+        old = self.entries.get(sav.name) or {}
+        self.entries[sav.name] = {
+            **(sav_ident or file_identity(sav)),
+            "sha256": sha256 or sha256_file(sav),
+            "json": {"name": jpath.name, **file_identity(jpath)},
+            "properties": properties if properties is not None else old.get("properties"),
+        }
+        if flush:
+            self._save()
+
+    def record_failure(self, sav: Path, sav_ident: Dict[str, int], error: str) -> None:
+        """변환 실패도 기록 → 같은 파일(크기/mtime)이면 다음 실행에서 다시 시도하지 않음"""
+        self.entries[Path(sav).name] = {**sav_ident, "error": error}
+
+    def failed(self, sav: Path) -> Optional[str]:
+        """이전에 실패했고 그 뒤로 바뀌지 않은 sav면 그때의 오류 메시지"""
+        entry = self.entries.get(Path(sav).name)
+        if not entry or "error" not in entry:
+            return None
+        try:
+            ident = file_identity(sav)
+        except OSError:
+            return None
+        return entry["error"] if ident == {"size": entry.get("size"), "mtime_ns": entry.get("mtime_ns")} else None
+
+    def set_properties(self, sav: Path, properties: List[str]) -> None:
+        entry = self.entries.get(Path(sav).name)
+        if entry is not None:
+            entry["properties"] = properties
+
+    def prune(self, keep: Iterable[str]) -> None:
+        """폴더에서 사라진 sav의 기록 삭제 (저장은 flush 때)"""
+        keep = set(keep)
+        for name in [n for n in self.entries if n not in keep]:
+            del self.entries[name]
+
+    def flush(self) -> None:
+        self._save()
+
+    def saves(self, prop: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """색인된 sav들: {파일 이름: 기록}. prop을 주면 그 최상위 property가 있는 것만."""
+        return {name: dict(e, path=str(self.save_dir / name)) for name, e in self.entries.items()
+                if "error" not in e and (prop is None or prop in (e.get("properties") or ()))}
+
+    def invalidate(self, sav: Path) -> None:
+        if self.entries.pop(Path(sav).name, None) is not None:
+            self._save()
@@ -1,14 +1,20 @@
 # Create_json.py
 from pathlib import Path
-import subprocess, sys, os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import os, sys, json
+from GvasCodec import read_sav, GvasUnsupported
+from ConvCache import ConversionCache, file_identity, sha256_file
+import Procs
+import Uesave
+from Profiler import span
 
 '''
 Description:
 Function for READING .sav files & CREATING .json files --> Readable (utf-8) 
 '''
 
-BASE = Path(getattr(sys, "_MEIPASS", Path(__file__).parent))
-UESAVE = BASE / ("uesave.exe" if os.name == "nt" else "uesave")  
+BASE = Path(getattr(sys, "_MEIPASS", Path(__file__).parent))  # 번들된 uesave가 있는 곳 (Uesave.resolve_binary)
 '''
 #1) MEIPASS:
 When the exe file launches, all resources (.py files) would be loaded in User\PC\AppData\Local\MEIPASS
@@ -25,39 +31,221 @@ It means the current file running itself
 So Path(__file__).parent could be DIR of the file running which can be MEIPASS
 
 '''
+USE_NATIVE_GVAS = True  # GvasCodec로 먼저 시도, 모르는 property 타입이면 uesave로
+JSON_DEBUG = os.environ.get("LVCC_JSON_DEBUG", "") not in ("", "0")  # 1 --> indent=2 .json을 디스크에 남김
+STYLE_SAV = "characterStyle-1.0.sav"
+MAX_WORKERS = min(4, os.cpu_count() or 1)  # 동시에 변환할 sav 수 (uesave 프로세스 수 상한)
+'''
+#1) uesave:
+Which binary, its argument style, timeouts and error messages --> Uesave.py (Uesave.get())
+
+#2) JSON_DEBUG:
+Off (default): .json we write is compact (no indent/spaces) --> smaller, faster to write and for uesave to parse
+               and the GUI works on the document in memory (no .json at all, see Main.py)
+On (env LVCC_JSON_DEBUG=1): pretty .json (indent=2) is written next to the .sav so you can read / diff it
+
+'''
+def dumps_document(doc: dict) -> str:
+    if JSON_DEBUG:
+        return json.dumps(doc, ensure_ascii=False, indent=2)
+    return json.dumps(doc, ensure_ascii=False, separators=(",", ":"))
+
 def _to_json_text(sav: Path) -> str:
-    out = subprocess.check_output([str(UESAVE), "to-json", "--input", str(sav)])
+    with span("uesave_to_json", sav=str(sav)) as sp:
+        out = Uesave.get().to_json(sav)
+        sp.set(bytes_out=len(out))
     '''
-    #1) subprocess.check_output():
-    This is a method for making external program available such as UESAVE
+    #1) Uesave.get().to_json():
+    runs "uesave to-json" on the .sav (timeout & cancel support, see Procs.py)
+    with the argument style this uesave build understands (probed once, see Uesave.py)
     AND
     This will return ***'BYTES'***
 
-    #2) List [a, b, c, d]: 
-    This would be all CLI in cmd 
+    #2) Failure:
+    Uesave.UesaveError (a subprocess.CalledProcessError) carrying uesave's own error text
+    '''
+    return out.decode("utf-8", errors="replace")
 
-    #3) parameters:
-    a: This would be the path of the program we are trying to use
-    b: to-json is the command for UESAVE (change it into json structure)
-    c: --input--> so change which one?
-    d: the path of sav files location
+def _sav_to_json_text(sav: Path) -> Tuple[str, Optional[List[str]]]:
+    '''
+    #1) Native first:
+    GvasCodec reads the .sav in-process (no uesave launch)
 
+    #2) Fallback:
+    GvasUnsupported means the file has property types the codec does not know --> uesave
+
+    #3) Return:
+    (json text, top-level property names) --> names go into the index (None if the shape is unexpected)
     '''
-    return out.decode("utf-8", errors="replace")
+    if USE_NATIVE_GVAS:
+        try:
+            with span("gvas_read", sav=str(sav), bytes_in=sav.stat().st_size) as sp:
+                doc = read_sav(sav)
+                text = dumps_document(doc)
+                sp.set(bytes_out=len(text))
+            return text, _property_names(doc)
+        except GvasUnsupported as e:
+            print("[gvas] fallback to uesave:", e, file=sys.stderr)
+    text = _to_json_text(sav)
+    try:
+        return text, _property_names(json.loads(text))
+    except ValueError:
+        return text, None
+
+def _property_names(doc: Any) -> Optional[List[str]]:
+    try:
+        return list(doc["root"]["properties"])
+    except (KeyError, TypeError):
+        return None
+
+def _stream_uesave_doc(sav: Path) -> dict:
+    '''
+    #1) Uesave.get().read_doc():
+    Unlike to_json(), the output is not collected into one big bytes object first.
+    json.load() reads the text straight from the pipe --> no .json file, no extra bytes copy
+
+    #2) returncode:
+    Checked after the pipe is drained, same error type as to_json()
+    (timeout & cancel just like every other uesave call)
+    '''
+    with span("uesave_to_json_stream", sav=str(sav)):
+        return Uesave.get().read_doc(sav)
+
+def load_document(sav) -> dict:
+    '''
+    Streaming mode: .sav --> parsed document in memory, the .json is never written
+    (native GvasCodec first, uesave stdout pipe as fallback)
+    '''
+    sav = Path(sav)
+    if USE_NATIVE_GVAS:
+        try:
+            with span("gvas_read", sav=str(sav), bytes_in=sav.stat().st_size):
+                return read_sav(sav)
+        except GvasUnsupported as e:
+            print("[gvas] fallback to uesave:", e, file=sys.stderr)
+    return _stream_uesave_doc(sav)
+
+def load_style_str(sav) -> str:
+    '''Only the AllStyleValues_0 Str value of the .sav (no .json on disk)'''
+    return load_document(sav)["root"]["properties"]["AllStyleValues_0"]["Str"]
 
-def create_json(path):
-    sav_dir = Path(path)
-    created = []
-    for sav in sav_dir.glob("characterStyle-1.0.sav"):
+def create_json(path, use_cache: bool = True, pattern: str = "*.sav", workers: int = MAX_WORKERS) -> List[Path]:
+    '''
+    #1) Every .sav matching `pattern` in the folder (default: all of them) --> .json next to it
+
+    #2) Changed files are converted concurrently on a thread pool of `workers`
+    (uesave runs as separate processes, so threads are enough to keep several busy)
+
+    #3) Return:
+    The .json paths, characterStyle-1.0.json first (if it is there)
+    '''
+    with span("create_json", save_dir=str(path)):
+        return _create_json(Path(path), use_cache, pattern, workers)
+
+def _convert(sav: Path) -> Tuple[Path, Dict[str, int], str, Optional[List[str]]]:
+    '''
+    Runs on a worker thread.
+    Identity & hash are taken BEFORE converting --> if the game rewrites the .sav meanwhile, the next lookup misses
+    '''
+    jpath = sav.with_suffix(".json")
+    ident, sha = file_identity(sav), sha256_file(sav)
+    text, props = _sav_to_json_text(sav)
+    with span("write_json", bytes_out=len(text)):
+        jpath.write_text(text, encoding="utf-8")
+    print("Wrote:", jpath, file=sys.stderr)
+    return jpath, ident, sha, props
+
+def _create_json(sav_dir: Path, use_cache: bool, pattern: str, workers: int) -> List[Path]:
+    savs = sorted(sav_dir.glob(pattern), key=lambda p: (p.name != STYLE_SAV, p.name))
+    cache = ConversionCache(sav_dir) if use_cache else None
+    created: Dict[Path, Path] = {}
+    todo = []
+    for sav in savs:
         jpath = sav.with_suffix(".json")
         '''
         #1) with_suffix():
         Return Path object with extension '.json'
+
+        #2) cache:
+        If the .sav is unchanged since the last conversion, the .json is reused as it is
         '''
-        jpath.write_text(_to_json_text(sav), encoding="utf-8")
-        print("Wrote:", jpath)
-        created.append(jpath)
-    if not created:
-        print("characterStyle-1.0.json is not created")
-    return created
+        with span("cache_lookup") as sp:
+            hit = bool(cache and cache.lookup(sav, jpath))
+            sp.set(hit=hit)
+        if hit:
+            print("Cached:", jpath, file=sys.stderr)
+            created[sav] = jpath
+            if cache.entries[sav.name].get("properties") is None:  # 예전 캐시 → 이름만 채움
+                cache.set_properties(sav, _json_property_names(jpath))
+            continue
+        if cache and cache.failed(sav):  # 전에 실패했고 그대로인 파일 → uesave를 또 부르지 않음
+            print(f"Skipped (unchanged, failed before): {sav.name}", file=sys.stderr)
+            continue
+        todo.append(sav)
 
+    errors: Dict[Path, Exception] = {}
+    idents = {sav: file_identity(sav) for sav in todo}
+    for sav, result in _convert_all(todo, workers):
+        if isinstance(result, Procs.Cancelled):
+            raise result
+        if isinstance(result, Exception):  # 다른 sav 변환은 계속
+            print(f"[WARN] {sav.name}: conversion failed:", result, file=sys.stderr)
+            errors[sav] = result
+            if cache and sav.name != STYLE_SAV:
+                cache.record_failure(sav, idents[sav], str(result))
+            continue
+        jpath, ident, sha, props = result
+        created[sav] = jpath
+        if cache:
+            cache.record(sav, jpath, ident, sha, properties=props, flush=False)
+    if cache:
+        if pattern == "*.sav":
+            cache.prune(s.name for s in savs)
+        cache.flush()
+
+    style = sav_dir / STYLE_SAV
+    if style in errors:
+        raise errors[style]
+    if style not in created:
+        print("characterStyle-1.0.json is not created", file=sys.stderr)
+    return [created[s] for s in savs if s in created]
+
+def _convert_all(savs: List[Path], workers: int):
+    '''(sav, result or exception) in order. One file (the usual case) --> no pool at all'''
+    if len(savs) <= 1 or workers <= 1:
+        for sav in savs:
+            try:
+                yield sav, _convert(sav)
+            except Exception as e:
+                yield sav, e
+        return
+    token = Procs.current()  # 부른 작업의 취소 토큰을 풀 스레드에도 (Cancel이 이 변환들까지 멈추도록)
+
+    def convert(sav: Path):
+        with Procs.job(token):
+            return _convert(sav)
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(savs)), thread_name_prefix="lvcc-conv") as pool:
+        futures = [(sav, pool.submit(convert, sav)) for sav in savs]
+        for sav, fut in futures:
+            e = fut.exception()
+            yield sav, e if e is not None else fut.result()
+
+def _json_property_names(jpath: Path) -> Optional[List[str]]:
+    try:
+        with jpath.open("r", encoding="utf-8") as f:
+            return _property_names(json.load(f))
+    except (OSError, ValueError):
+        return None
+
+def save_index(path, refresh: bool = True, prop: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    '''
+    Index of every .sav in the folder: {file name: {"path", "size", "mtime_ns", "sha256", "properties", "json"}}
+
+    #1) refresh=True: create_json() first --> only new / changed saves are converted
+    #2) refresh=False: just reads <SaveGames>/.lvcc_cache.json (no .sav is opened)
+    #3) prop: only saves that have this top-level property (e.g. "AllStyleValues_0")
+    '''
+    if refresh:
+        create_json(path)
+    return ConversionCache(path).saves(prop)
@@ -1,14 +1,14 @@
 # GetData.py
-import json
-import re
 from pathlib import Path
 from typing import Dict
-from Create_json import create_json
+from Update_json import style_source
 
 def load_str_blocks(save_dir: str) -> Dict[str, str]:
     """
     #1) Description:
-    --> Creating json files (including data inside with utf-8) from Create_json.py
+    --> Reading characterStyle-1.0.sav straight into memory via Update_json.style_source
+        (streaming mode: no characterStyle-1.0.json is written or re-read)
+    --> The parsed model is shared with StyleDocument / Main: an unchanged .sav is not read again
     --> Load Str blocks the program will edit
     --> The value would be stored in ["root"]["properties"]["AllStyleValues_0"]["Str"]
     
@@ -21,43 +21,27 @@ def load_str_blocks(save_dir: str) -> Dict[str, str]:
         ...
     }
     """
-    # 1) Creating .json via Create_json.py
-    # --> created list would be the list of the ***path***
-    created = create_json(save_dir)  
-    if not created:
-        raise FileNotFoundError("characterStyle-1.0.json creation failed")
-
-    json_path = created[0]  
-    # *** There should be only one characterStyle-1.0.json ***
-    if not Path(json_path).exists():
-        raise FileNotFoundError(f"No json file exists: {json_path}")
-
-    # 2) JSON loading
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    s = data["root"]["properties"]["AllStyleValues_0"]["Str"]
-
-    # 3) Blocks
-    results: Dict[str, str] = {}
+    # 1) Locating the .sav
+    # *** There should be only one characterStyle-1.0.sav ***
+    sav_path = Path(save_dir) / "characterStyle-1.0.sav"
+    if not sav_path.exists():
+        raise FileNotFoundError(f"No sav file exists: {sav_path}")
+
+    # 2) Str loading + blocks (cached model, tail is kept there: style_source(...).model.tail)
+    results: Dict[str, str] = style_source(sav_path).model.blocks_text()
     """
     --> hint for format of results
     --> Thats why imported Dict 
     """
-    prev_end = 0
-    for m in re.finditer(r";type:([^;]+)", s):
-        typ = m.group(1).strip()
-        block = s[prev_end:m.end()]  
-        results[typ] = block
-        prev_end = m.end()
-
     return results
 
 # -------------------------
 # Testing
 # -------------------------
 if __name__ == "__main__":
-    save_dir = r"C:\Users\PC\AppData\Local\Longvinter\Saved\SaveGames"
+    import sys
+    # 명령줄 도구는 Headless.py (python Headless.py --dir <SaveGames> get)
+    save_dir = sys.argv[1] if len(sys.argv) > 1 else r"C:\Users\PC\AppData\Local\Longvinter\Saved\SaveGames"
     blocks = load_str_blocks(save_dir)
     for t, b in blocks.items():
         print(f"[{t}]")
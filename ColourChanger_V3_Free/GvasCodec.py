@@ -0,0 +1,371 @@
+# GvasCodec.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import struct
+import uuid
+import sys
+
+'''
+Description:
+In-process reader/writer for Unreal GVAS (.sav) files --> no uesave process needed
+
+It produces (and accepts) the same document shape the rest of the program reads:
+    {"header": {...}, "root": {"save_game_type": ..., "properties": {"AllStyleValues_0": {"Str": "..."}}}, "extra": [...]}
+
+Only simple property types are understood (Str, Name, Int, Int64, UInt32, Float, Double, Bool).
+Anything else raises GvasUnsupported, so callers (Create_json / SaveApply) can fall back to uesave.
+
+find_str_property / patch_str: locate one StrProperty in the raw bytes and swap its value
+(size prefix + FString), leaving every other byte untouched --> no decode / encode of the whole file.
+'''
+
+MAGIC = b"GVAS"
+
+
+class GvasUnsupported(Exception):
+    """The file/document uses something this codec does not understand --> use uesave instead"""
+
+
+# -------- FString --------
+def _read_fstring(buf: bytes, pos: int) -> Tuple[Optional[str], int]:
+    '''
+    #1) Length (int32):
+    > 0 --> ANSI bytes (null terminated, length includes the null)
+    < 0 --> UTF-16LE, -length characters (null terminated)
+    = 0 --> no string at all (kept as None so it is written back the same way)
+    '''
+    (n,) = struct.unpack_from("<i", buf, pos)
+    pos += 4
+    if n == 0:
+        return None, pos
+    if n > 0:
+        raw = buf[pos:pos + n]
+        if len(raw) != n or raw[-1:] != b"\0":
+            raise GvasUnsupported(f"bad FString at {pos - 4}")
+        return raw[:-1].decode("latin-1"), pos + n
+    size = -n * 2
+    raw = buf[pos:pos + size]
+    if len(raw) != size or raw[-2:] != b"\0\0":
+        raise GvasUnsupported(f"bad FString at {pos - 4}")
+    return raw[:-2].decode("utf-16-le"), pos + size
+
+
+def _write_fstring(s: Optional[str]) -> bytes:
+    if s is None:
+        return struct.pack("<i", 0)
+    if s.isascii():
+        raw = s.encode("ascii") + b"\0"
+        return struct.pack("<i", len(raw)) + raw
+    raw = s.encode("utf-16-le") + b"\0\0"
+    return struct.pack("<i", -(len(raw) // 2)) + raw
+
+
+# -------- Header --------
+HEADER_KEYS = {
+    "magic", "save_game_version", "package_version", "package_version_ue5",
+    "engine_version_major", "engine_version_minor", "engine_version_patch",
+    "engine_version_build", "engine_version", "custom_format_version", "custom_format",
+}
+
+
+def _read_header(buf: bytes, pos: int) -> Tuple[Dict[str, Any], int]:
+    if buf[pos:pos + 4] != MAGIC:
+        raise GvasUnsupported("not a GVAS file")
+    h: Dict[str, Any] = {"magic": struct.unpack_from("<I", buf, pos)[0]}
+    pos += 4
+    h["save_game_version"], h["package_version"] = struct.unpack_from("<ii", buf, pos)
+    pos += 8
+    if h["save_game_version"] >= 3:
+        (h["package_version_ue5"],) = struct.unpack_from("<i", buf, pos)
+        pos += 4
+    (h["engine_version_major"], h["engine_version_minor"],
+     h["engine_version_patch"], h["engine_version_build"]) = struct.unpack_from("<HHHI", buf, pos)
+    pos += 10
+    h["engine_version"], pos = _read_fstring(buf, pos)
+    h["custom_format_version"], count = struct.unpack_from("<ii", buf, pos)
+    pos += 8
+    formats: List[List[Any]] = []
+    for _ in range(count):
+        guid = str(uuid.UUID(bytes=bytes(buf[pos:pos + 16])))
+        (ver,) = struct.unpack_from("<i", buf, pos + 16)
+        formats.append([guid, ver])
+        pos += 20
+    h["custom_format"] = formats
+    return h, pos
+
+
+def _write_header(h: Dict[str, Any]) -> bytes:
+    if not set(h) <= HEADER_KEYS or "custom_format" not in h:
+        raise GvasUnsupported("unknown header shape")
+    try:
+        out = [struct.pack("<Iii", h["magic"], h["save_game_version"], h["package_version"])]
+        if h["save_game_version"] >= 3:
+            out.append(struct.pack("<i", h["package_version_ue5"]))
+        out.append(struct.pack("<HHHI", h["engine_version_major"], h["engine_version_minor"],
+                               h["engine_version_patch"], h["engine_version_build"]))
+        out.append(_write_fstring(h["engine_version"]))
+        out.append(struct.pack("<ii", h["custom_format_version"], len(h["custom_format"])))
+        for guid, ver in h["custom_format"]:
+            out.append(uuid.UUID(guid).bytes + struct.pack("<i", ver))
+    except (KeyError, TypeError, ValueError, struct.error) as e:
+        raise GvasUnsupported(f"bad header: {e}") from e
+    return b"".join(out)
+
+
+# -------- Properties --------
+# type name -> (json key, struct format) / Str, Name는 FString
+_SCALARS = {
+    "IntProperty": ("Int", "<i"),
+    "Int64Property": ("Int64", "<q"),
+    "UInt32Property": ("UInt32", "<I"),
+    "FloatProperty": ("Float", "<f"),
+    "DoubleProperty": ("Double", "<d"),
+}
+_STRINGS = {"StrProperty": "Str", "NameProperty": "Name"}
+_KEY_TO_TYPE = {k: t for t, (k, _) in _SCALARS.items()}
+_KEY_TO_TYPE.update({k: t for t, k in _STRINGS.items()})
+_KEY_TO_TYPE["Bool"] = "BoolProperty"
+
+
+def _read_property(buf: bytes, pos: int) -> Tuple[Optional[str], Any, int]:
+    """하나의 property 읽기 --> (name, json value, new pos). name이 "None"이면 끝."""
+    name, pos = _read_fstring(buf, pos)
+    if name == "None":
+        return None, None, pos
+    typ, pos = _read_fstring(buf, pos)
+    size, index = struct.unpack_from("<ii", buf, pos)
+    pos += 8
+    if index != 0:
+        raise GvasUnsupported(f"{name}: array index {index}")
+
+    if typ == "BoolProperty":
+        value, has_guid = buf[pos], buf[pos + 1]
+        if has_guid:
+            raise GvasUnsupported(f"{name}: property guid")
+        return name, {"Bool": bool(value)}, pos + 2
+
+    if typ not in _SCALARS and typ not in _STRINGS:
+        raise GvasUnsupported(f"{name}: {typ}")
+    if buf[pos]:
+        raise GvasUnsupported(f"{name}: property guid")
+    pos += 1
+    end = pos + size
+    if typ in _STRINGS:
+        value, pos = _read_fstring(buf, pos)
+        key = _STRINGS[typ]
+    else:
+        key, fmt = _SCALARS[typ]
+        (value,) = struct.unpack_from(fmt, buf, pos)
+        pos += struct.calcsize(fmt)
+    if pos != end:
+        raise GvasUnsupported(f"{name}: size mismatch")
+    return name, {key: value}, pos
+
+
+def _write_property(name: str, prop: Dict[str, Any]) -> bytes:
+    if not isinstance(prop, dict) or len(prop) != 1:
+        raise GvasUnsupported(f"{name}: unknown property shape")
+    (key, value), = prop.items()
+    typ = _KEY_TO_TYPE.get(key)
+    if typ is None:
+        raise GvasUnsupported(f"{name}: {key}")
+
+    head = _write_fstring(name) + _write_fstring(typ)
+    if typ == "BoolProperty":
+        return head + struct.pack("<iiBB", 0, 0, 1 if value else 0, 0)
+    try:
+        if typ in _STRINGS:
+            body = _write_fstring(value)
+        else:
+            body = struct.pack(_SCALARS[typ][1], value)
+    except (TypeError, AttributeError, struct.error) as e:
+        raise GvasUnsupported(f"{name}: {e}") from e
+    return head + struct.pack("<iiB", len(body), 0, 0) + body
+
+
+# -------- StrProperty 하나만 교체 --------
+class StrSlot(NamedTuple):
+    size_at: int  # property size (int32) 위치
+    start: int    # 값 FString 시작 (길이 int32 포함)
+    end: int      # 값 FString 끝
+
+
+def _skip_fstring(buf, pos: int) -> int:
+    """FString을 디코딩하지 않고 끝 위치만 (종료 문자는 확인)"""
+    (n,) = struct.unpack_from("<i", buf, pos)
+    pos += 4
+    if n == 0:
+        return pos
+    size, nul = (n, b"\0") if n > 0 else (-n * 2, b"\0\0")
+    end = pos + size
+    if end > len(buf) or buf[end - len(nul):end] != nul:
+        raise GvasUnsupported(f"bad FString at {pos - 4}")
+    return end
+
+
+def find_str_property(buf, name: str) -> StrSlot:
+    """
+    buf (bytes / mmap)에서 최상위 StrProperty `name`의 위치.
+    그 앞의 property는 decode_sav와 같은 규칙으로 건너뛰므로, 모르는 타입이 앞에 있으면 GvasUnsupported.
+    """
+    try:
+        _, pos = _read_header(buf, 0)
+        pos = _skip_fstring(buf, pos)  # save_game_type
+        while True:
+            prop_at = pos
+            pname, pos = _read_fstring(buf, pos)
+            if pname == "None":
+                break
+            if pname != name:
+                _, _, pos = _read_property(buf, prop_at)
+                continue
+            typ, pos = _read_fstring(buf, pos)
+            if typ != "StrProperty":
+                raise GvasUnsupported(f"{name}: {typ}")
+            size, index = struct.unpack_from("<ii", buf, pos)
+            if index != 0 or buf[pos + 8]:
+                raise GvasUnsupported(f"{name}: array index / property guid")
+            start = pos + 9
+            end = _skip_fstring(buf, start)
+            if end != start + size:
+                raise GvasUnsupported(f"{name}: size mismatch")
+            return StrSlot(pos, start, end)
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise GvasUnsupported(f"truncated or corrupt file: {e}") from e
+    raise GvasUnsupported(f"{name} not found")
+
+
+def encode_fstring(s: Optional[str]) -> bytes:
+    return _write_fstring(s)
+
+
+def patch_str(buf, slot: StrSlot, value: Optional[str]) -> bytes:
+    """slot의 문자열을 value로 바꾼 새 파일 내용 (size 접두사도 갱신, 나머지 바이트는 그대로)"""
+    body = _write_fstring(value)
+    return b"".join((buf[:slot.size_at], struct.pack("<i", len(body)),
+                     buf[slot.size_at + 4:slot.start], body, buf[slot.end:]))
+
+
+# -------- 공개 API --------
+def decode_sav(data: bytes) -> Dict[str, Any]:
+    """.sav bytes --> document (dict)"""
+    try:
+        header, pos = _read_header(data, 0)
+        save_game_type, pos = _read_fstring(data, pos)
+        props: Dict[str, Any] = {}
+        while True:
+            name, value, pos = _read_property(data, pos)
+            if name is None:
+                break
+            if name in props:
+                raise GvasUnsupported(f"duplicate property {name}")
+            props[name] = value
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise GvasUnsupported(f"truncated or corrupt file: {e}") from e
+    return {
+        "header": header,
+        "root": {"save_game_type": save_game_type, "properties": props},
+        "extra": list(data[pos:]),
+    }
+
+
+def encode_sav(doc: Dict[str, Any]) -> bytes:
+    """document (dict) --> .sav bytes. 모르는 모양이면 GvasUnsupported."""
+    try:
+        header, root, extra = doc["header"], doc["root"], doc.get("extra", [])
+        out = [_write_header(header), _write_fstring(root["save_game_type"])]
+        for name, prop in root["properties"].items():
+            out.append(_write_property(name, prop))
+        out.append(_write_fstring("None"))
+        out.append(bytes(extra))
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise GvasUnsupported(f"unknown document shape: {e}") from e
+    return b"".join(out)
+
+
+def read_sav(sav: Path) -> Dict[str, Any]:
+    return decode_sav(Path(sav).read_bytes())
+
+
+def write_sav(doc: Dict[str, Any], out_sav: Path) -> None:
+    """encode가 끝난 뒤에만 파일을 바꾼다 (실패 시 기존 sav 보존)"""
+    data = encode_sav(doc)
+    out_sav = Path(out_sav)
+    tmp = out_sav.with_name(out_sav.name + ".tmp")
+    tmp.write_bytes(data)
+    tmp.replace(out_sav)
+
+
+# -------------------------
+# Testing: native round-trip & byte-for-byte check against uesave
+# -------------------------
+if __name__ == "__main__":
+    # python GvasCodec.py                                   --> bench/fixtures 와 대조 (uesave 없이)
+    # python GvasCodec.py <characterStyle-1.0.sav> [uesave] --> 그 sav로 uesave와 대조 (Linux: bench/fake_uesave.py behind a stub script)
+    # python GvasCodec.py --update-fixture uesave.exe       --> fixture의 기대값(.json, .patched.sav)을 진짜 uesave로 다시 만든다
+    import json
+    import tempfile
+    import Uesave
+    FIXTURE = Path(__file__).resolve().parent / "bench" / "fixtures"
+    fx_sav = FIXTURE / "style_small.sav"                  # 작은 characterStyle sav (Str, UTF-16 Str, Int, Float, Bool)
+    fx_json = FIXTURE / "style_small.json"                # uesave to-json 결과
+    fx_patched = FIXTURE / "style_small.patched.sav"      # AllStyleValues_0 Str + FX_EXTRA 를 uesave from-json 한 결과
+    FX_EXTRA = "extra:é;"                                 # 비 ASCII --> UTF-16으로 바뀌고 길이도 바뀜
+
+    if sys.argv[1:2] == ["--update-fixture"]:
+        if len(sys.argv) < 3:
+            sys.exit("usage: python GvasCodec.py --update-fixture <uesave>")
+        ue = Uesave.use(sys.argv[2], cache_file=None)
+        if "fake" in (ue.caps()["version"] or ""):
+            sys.exit("--update-fixture needs the real uesave (bench/fake_uesave.py is built on this codec)")
+        fx_json.write_bytes(ue.to_json(fx_sav))
+        ue_doc = json.loads(fx_json.read_text(encoding="utf-8"))
+        ue_doc["root"]["properties"]["AllStyleValues_0"]["Str"] += FX_EXTRA
+        ue.from_json_doc(ue_doc, fx_patched)
+        print("[ok] fixture updated with", ue.caps()["version"])
+        sys.exit(0)
+
+    if len(sys.argv) < 2:
+        original = fx_sav.read_bytes()
+        expected = json.loads(fx_json.read_text(encoding="utf-8"))
+        patched = fx_patched.read_bytes()
+        assert decode_sav(original) == expected, "decode differs from uesave to-json"
+        assert encode_sav(expected) == original, "encode of uesave json differs from the original sav"
+        new = expected["root"]["properties"]["AllStyleValues_0"]["Str"] + FX_EXTRA
+        assert patch_str(original, find_str_property(original, "AllStyleValues_0"), new) == patched, \
+            "Str patch differs from uesave from-json"
+        expected["root"]["properties"]["AllStyleValues_0"]["Str"] = new
+        assert encode_sav(expected) == patched, "encode differs from uesave from-json"
+        print("[ok] fixture:", fx_sav.name, "decode / encode / Str patch match the expected uesave output")
+        sys.exit(0)
+
+    sav = Path(sys.argv[1])
+    ue = Uesave.use(sys.argv[2], cache_file=None) if len(sys.argv) > 2 else Uesave.get()  # 주어진 uesave는 새로 확인
+
+    original = sav.read_bytes()
+    doc = decode_sav(original)
+    assert encode_sav(doc) == original, "native round-trip is not byte-identical"
+    print("[ok] native round-trip:", len(original), "bytes")
+
+    if not ue.path.exists():
+        print("[skip] uesave not found:", ue.path)
+        sys.exit(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        ue_json = Path(tmp) / "ue.json"
+        ue_sav = Path(tmp) / "ue.sav"
+        ue_json.write_bytes(ue.to_json(sav))  # 인자 스타일(--input / 위치 인자)은 어댑터가 맞춤
+        ue_doc = json.loads(ue_json.read_text(encoding="utf-8"))
+        assert ue_doc["root"]["properties"]["AllStyleValues_0"]["Str"] == \
+            doc["root"]["properties"]["AllStyleValues_0"]["Str"], "Str differs from uesave"
+        ue.from_json(ue_json, ue_sav)
+        assert ue_sav.read_bytes() == encode_sav(doc), "native output differs from uesave output"
+        print("[ok] byte-identical with uesave")
+
+        # Str만 교체 (길이 변화 포함) == 문서 전체를 uesave로 다시 쓴 결과
+        slot = find_str_property(original, "AllStyleValues_0")
+        for new in ("", "x" * 300, ue_doc["root"]["properties"]["AllStyleValues_0"]["Str"] + "extra:é;"):
+            ue_doc["root"]["properties"]["AllStyleValues_0"]["Str"] = new
+            ue.from_json_doc(ue_doc, ue_sav)
+            assert ue_sav.read_bytes() == patch_str(original, slot, new), "Str patch differs from uesave output"
+    print("[ok] Str patch byte-identical with uesave")
@@ -0,0 +1,475 @@
+# Headless.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import argparse
+import inspect
+import json
+import os
+import re
+import socketserver
+import sys
+import threading
+
+import Create_json
+import SaveApply
+import Uesave
+from Create_json import create_json, STYLE_SAV
+from Update_json import StyleDocument, rgba_str_from_255
+from LastState import load_state
+
+'''
+Description:
+The colour changer without the GUI: one-shot commands and a long-lived local server
+
+#1) One-shot:
+    python Headless.py --dir <SaveGames> get [Skin Hair ...] [--field color]
+    python Headless.py --dir <SaveGames> set-color Skin "#ffccaa"      (also "255,204,170" or "(R=..,G=..,B=..,A=..)")
+    python Headless.py --dir <SaveGames> baldy
+    python Headless.py --dir <SaveGames> bulk --hue 30 [--saturation 1.2] [--value 0.9] [--type Hair ...]
+    python Headless.py --dir <SaveGames> apply                         (LVCC_JSON_DEBUG: .json --> .sav)
+--dir defaults to the folder the GUI used last time (LastState.py)
+
+#2) Batch (one document for all lines, written once at the end):
+    python Headless.py --dir <SaveGames> batch < requests.jsonl
+
+#3) Server:
+    python Headless.py --dir <SaveGames> serve [--port 8765 | --unix /tmp/lvcc.sock]
+The parsed StyleDocument stays in memory between calls --> edits cost no conversion,
+only "apply" writes the .sav (once, however many edits were queued).
+If the .sav changes on disk (the game saved) it is re-read on the next call, unless edits are pending:
+then "apply" puts only the queued edits on top of the new content ("merged": true, see StyleDocument).
+
+#4) Protocol (server and batch): JSON-RPC 2.0, one JSON object per line
+    {"jsonrpc": "2.0", "id": 1, "method": "set_color", "params": {"part": "Skin", "color": "#ffccaa"}}
+    {"jsonrpc": "2.0", "id": 1, "result": {"Skin": {"color": "(R=1.0,G=0.8,B=0.666667,A=1.000000)"}}}
+Methods: get, get_str, set_color, set_field, baldy, bulk, apply, discard, reload, status, shutdown
+stdout carries only these JSON lines (batch: the final apply result is one more line);
+progress messages ([backup], [ok] wrote, [exec] ...) go to stderr
+
+#5) Many SaveGames folders, one recipe (BatchApply.py: process pool, resumable):
+    python Headless.py apply-all manifest.txt --recipe recipe.json [--workers 4] [--restart]
+
+#6) uesave:
+--uesave <path> replaces the bundled uesave (e.g. bench/fake_uesave.py wrapped in a script on Linux),
+--no-native skips the built-in GVAS reader/writer and always uses uesave
+'''
+
+DEFAULT_PORT = 8765
+PARTS = ("Skin", "Hair")
+RGBA_RE = re.compile(r"\(R=([0-9.]+),G=([0-9.]+),B=([0-9.]+),A=[0-9.]+\)")
+
+# JSON-RPC 오류 코드
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+APP_ERROR = -32000
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+
+
+def parse_color(text: str) -> str:
+    """'#rrggbb' / 'r,g,b' (0~255) / '(R=..,G=..,B=..,A=..)' --> 게임 Str 형식"""
+    text = text.strip()
+    if RGBA_RE.fullmatch(text):
+        return text
+    m = re.fullmatch(r"#?([0-9a-fA-F]{6})", text)
+    if m:
+        v = int(m.group(1), 16)
+        return rgba_str_from_255(v >> 16, (v >> 8) & 0xFF, v & 0xFF)
+    parts = [p.strip() for p in text.split(",")]
+    if len(parts) == 3 and all(p.isdigit() and int(p) <= 255 for p in parts):
+        return rgba_str_from_255(*(int(p) for p in parts))
+    raise ValueError(f"not a colour: {text!r} (use #rrggbb, r,g,b or (R=..,G=..,B=..,A=..))")
+
+
+def use_uesave(path: Optional[str], native: bool = True) -> None:
+    """변환에 쓸 uesave 실행 파일 / 내장 GVAS 사용 여부 (Create_json, SaveApply 둘 다)"""
+    if path:
+        Uesave.use(path)
+    for mod in (Create_json, SaveApply):
+        mod.USE_NATIVE_GVAS = native
+
+
+def _file_sig(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+# -------- 메모리에 상주하는 문서 --------
+class Session:
+    """
+    SaveGames 폴더 하나에 대한 StyleDocument를 들고 있는 객체.
+    수정은 문서 안에 쌓이고 apply() 때 한 번에 기록된다. 메서드는 모두 스레드 안전.
+    """
+
+    def __init__(self, save_dir: str | Path):
+        self.save_dir = Path(save_dir)
+        self.sav = self.save_dir / STYLE_SAV
+        self.json_path = self.sav.with_suffix(".json")
+        self._lock = threading.RLock()
+        self._doc: Optional[StyleDocument] = None
+        self._sig: Optional[Tuple[int, int]] = None
+        self.loads = 0  # 실제로 sav/json을 읽은 횟수 (status 확인용)
+
+    @property
+    def source(self) -> Path:
+        return self.json_path if Create_json.JSON_DEBUG else self.sav
+
+    def _open(self) -> StyleDocument:
+        if Create_json.JSON_DEBUG:
+            create_json(str(self.save_dir), pattern=STYLE_SAV)
+        if not self.source.exists():
+            raise FileNotFoundError(f"File not found: {self.source}")
+        sig = _file_sig(self.source)
+        doc = StyleDocument(self.json_path) if Create_json.JSON_DEBUG else StyleDocument.from_sav(self.sav)
+        self._doc, self._sig = doc, sig
+        self.loads += 1
+        return doc
+
+    def doc(self) -> StyleDocument:
+        """상주 문서 (없거나, 수정 대기 없이 디스크가 바뀌었으면 다시 읽음)"""
+        with self._lock:
+            if self._doc is None:
+                return self._open()
+            if not self._doc.dirty and _file_sig(self.source) != self._sig:
+                return self._open()
+            return self._doc
+
+    # ---- 읽기 ----
+    def get(self, parts: Optional[List[str]] = None, fields: Optional[List[str]] = None) -> Dict[str, Dict[str, str]]:
+        with self._lock:
+            doc = self.doc()
+            parts = parts or list(PARTS)
+            fields = fields or ["color"]
+            missing = [p for p in parts if not doc.has_block(p)]
+            if missing:
+                raise ValueError(f"no such block: {', '.join(missing)}")
+            return {p: {f: doc.get_field(p, f) for f in fields} for p in parts}
+
+    def get_str(self) -> str:
+        with self._lock:
+            return self.doc().to_str()
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            doc = self._doc
+            return {
+                "save_dir": str(self.save_dir),
+                "source": str(self.source),
+                "loaded": doc is not None,
+                "dirty": bool(doc is not None and doc.dirty),
+                "stale": doc is not None and _file_sig(self.source) != self._sig,
+                "loads": self.loads,
+            }
+
+    # ---- 수정 (apply 전까지는 메모리에만) ----
+    def set_color(self, part: str, color: str) -> Dict[str, Dict[str, str]]:
+        return self.set_field(part, "color", parse_color(color))
+
+    def set_field(self, part: str, field: str, value: str) -> Dict[str, Dict[str, str]]:
+        with self._lock:
+            self.doc().set_field(part, field, value)
+            return {part: {field: value}}
+
+    def baldy(self) -> Dict[str, Dict[str, str]]:
+        with self._lock:
+            self.doc().set_baldy()
+            return {"Hair": {"definitionid": ""}}
+
+    def bulk(self, hue: float = 0.0, saturation: float = 1.0, value: float = 1.0,
+             types: Optional[List[str]] = None) -> Dict[str, Dict[str, str]]:
+        """모든 블록(또는 types)의 색 필드 전부: 색상 회전(도), 채도/명도 배율 (ColorBulk.py) → 바뀐 필드"""
+        from ColorBulk import BulkColors
+        with self._lock:
+            doc = self.doc()
+            bulk = BulkColors(doc.blocks, doc.order)
+            if hue:
+                bulk.hue_shift(float(hue), types)
+            if saturation != 1:
+                bulk.scale_saturation(float(saturation), types)
+            if value != 1:
+                bulk.scale_value(float(value), types)
+            bulk.write()
+            out: Dict[str, Dict[str, str]] = {}
+            for typ, field in bulk.changed():
+                out.setdefault(typ, {})[field] = doc.get_field(typ, field)
+            return out
+
+    def discard(self) -> bool:
+        with self._lock:
+            if self._doc is None or not self._doc.dirty:
+                return False
+            self._doc.discard()
+            return True
+
+    def reload(self) -> Dict[str, Any]:
+        with self._lock:
+            self._open()
+            return self.status()
+
+    # ---- 기록 ----
+    def apply(self) -> Dict[str, Any]:
+        """
+        대기 중인 수정을 sav에 한 번에 기록 (JSON_DEBUG: json에 쓰고 sav로 변환).
+        수정이 쌓인 사이에 게임이 sav를 바꿨으면 새 내용 위에 우리 수정만 병합해서 기록.
+        """
+        with self._lock:
+            doc = self._doc
+            written = False
+            result: Dict[str, Any] = {}
+            if doc is not None and doc.dirty and doc.to_str() == doc.source_str:
+                doc.discard()  # 되돌린 수정 등으로 Str이 그대로 → 백업도 기록도 하지 않음
+                return {"written": False, "sav": str(self.sav)}
+            if doc is not None and doc.dirty:
+                if Create_json.JSON_DEBUG:
+                    # 게임이 바꾼 sav를 json에 먼저 반영해야 병합 대상이 보인다 (안 바뀌었으면 캐시 hit)
+                    create_json(str(self.save_dir), pattern=STYLE_SAV)
+                written = doc.commit()
+                result = {"merged": doc.merged, "conflicts": doc.conflicts}
+            if Create_json.JSON_DEBUG and (written or doc is None):
+                SaveApply.apply_json_to_sav(self.save_dir)
+                written = True
+            if written:
+                self._sig = _file_sig(self.source)
+            return {"written": written, "sav": str(self.sav), **result}
+
+
+# -------- JSON-RPC --------
+def _params(params: Any) -> Tuple[list, dict]:
+    if params is None:
+        return [], {}
+    if isinstance(params, list):
+        return params, {}
+    if isinstance(params, dict):
+        return [], params
+    raise RpcError(INVALID_PARAMS, "params must be an array or an object")
+
+
+class Dispatcher:
+    """JSON-RPC 요청 한 줄 → 응답 한 줄 (알림(id 없음)이면 None)"""
+
+    METHODS = ("get", "get_str", "set_color", "set_field", "baldy", "bulk", "apply", "discard", "reload", "status")
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.stop_requested = threading.Event()
+
+    def call(self, method: str, params: Any = None) -> Any:
+        if method == "shutdown":
+            self.stop_requested.set()
+            return True
+        if method not in self.METHODS:
+            raise RpcError(METHOD_NOT_FOUND, f"unknown method: {method}")
+        fn = getattr(self.session, method)
+        args, kwargs = _params(params)
+        try:
+            inspect.signature(fn).bind(*args, **kwargs)  # 인자 모양만 확인 (메서드 안의 TypeError는 그대로 내부 오류)
+        except TypeError as e:
+            raise RpcError(INVALID_PARAMS, f"{method}: {e}")
+        return fn(*args, **kwargs)
+
+    def handle_line(self, line: str) -> Optional[str]:
+        req_id = None
+        try:
+            try:
+                req = json.loads(line)
+            except ValueError as e:
+                raise RpcError(PARSE_ERROR, f"parse error: {e}")
+            if not isinstance(req, dict) or not isinstance(req.get("method"), str):
+                raise RpcError(INVALID_REQUEST, "expected an object with a 'method'")
+            req_id = req.get("id")
+            result = self.call(req["method"], req.get("params"))
+            if "id" not in req:
+                return None
+            resp: Dict[str, Any] = {"jsonrpc": "2.0", "id": req_id, "result": result}
+        except RpcError as e:
+            resp = {"jsonrpc": "2.0", "id": req_id, "error": {"code": e.code, "message": str(e)}}
+        except Exception as e:
+            resp = {"jsonrpc": "2.0", "id": req_id,
+                    "error": {"code": APP_ERROR, "message": f"{type(e).__name__}: {e}"}}
+        return json.dumps(resp, ensure_ascii=False)
+
+
+class _RpcHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        dispatcher: Dispatcher = self.server.dispatcher  # type: ignore[attr-defined]
+        for raw in self.rfile:
+            line = raw.decode("utf-8").strip()
+            if not line:
+                continue
+            out = dispatcher.handle_line(line)
+            if out is not None:
+                self.wfile.write(out.encode("utf-8") + b"\n")
+                self.wfile.flush()
+            if dispatcher.stop_requested.is_set():
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def make_server(session: Session, port: int = DEFAULT_PORT, unix: Optional[str] = None) -> socketserver.BaseServer:
+    """localhost TCP (기본) 또는 Unix 소켓 서버. serve_forever()로 실행."""
+    if unix:
+        if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+            raise RuntimeError("Unix sockets are not available on this platform, use --port")
+        Path(unix).unlink(missing_ok=True)
+
+        class _UnixServer(socketserver.ThreadingUnixStreamServer):
+            daemon_threads = True
+
+        server: socketserver.BaseServer = _UnixServer(unix, _RpcHandler)
+    else:
+        server = _TCPServer(("127.0.0.1", port), _RpcHandler)  # 외부에서는 접속 불가
+    server.dispatcher = Dispatcher(session)  # type: ignore[attr-defined]
+    return server
+
+
+# -------- 명령줄 --------
+def _resolve_dir(arg: Optional[str]) -> Path:
+    path = arg or load_state().get("save_dir")
+    if not path:
+        raise SystemExit("error: no SaveGames folder (use --dir, or open it once in the GUI)")
+    return Path(path)
+
+
+def _print(obj: Any) -> None:
+    print(obj if isinstance(obj, str) else json.dumps(obj, indent=2, ensure_ascii=False))
+
+
+def _apply_all(args: argparse.Namespace) -> int:
+    """apply-all: 폴더별 결과 한 줄씩 + 요약 (실패한 폴더가 있으면 1)"""
+    import BatchApply
+    try:
+        recipe = BatchApply.load_recipe(args.recipe, args.skin, args.hair, args.baldy)
+        dirs = BatchApply.read_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print("[ERROR]", e, file=sys.stderr)
+        return 1
+    journal = BatchApply.Journal(Path(args.journal or args.manifest + BatchApply.JOURNAL_SUFFIX),
+                                 BatchApply.recipe_hash(recipe))
+    if args.restart:
+        journal.reset()
+    errors = 0
+    try:
+        for line in BatchApply.run(dirs, recipe, journal, args.workers or BatchApply.MAX_WORKERS,
+                                   uesave=args.uesave, native=not args.no_native):
+            errors += line.get("status") == "error"
+            print(json.dumps(line, ensure_ascii=False), flush=True)
+    except KeyboardInterrupt:
+        print("[apply-all] interrupted; run again to continue", file=sys.stderr)
+        return 130
+    return 1 if errors else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="Headless.py", description="Longvinter colour changer without the GUI")
+    ap.add_argument("--dir", help="SaveGames folder (default: the one used last time)")
+    ap.add_argument("--uesave", help="uesave executable to use instead of the bundled one")
+    ap.add_argument("--no-native", action="store_true", help="always convert with uesave")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("get", help="print block fields as JSON")
+    p.add_argument("parts", nargs="*", default=list(PARTS))
+    p.add_argument("--field", action="append", dest="fields", help="field name (repeatable, default color)")
+    sub.add_parser("get-str", help="print the whole AllStyleValues_0 Str")
+
+    p = sub.add_parser("set-color", help="set a block colour and write the .sav")
+    p.add_argument("part")
+    p.add_argument("color", help="#rrggbb, r,g,b or (R=..,G=..,B=..,A=..)")
+    p.add_argument("--baldy", action="store_true", help="also clear Hair definitionid")
+    p.add_argument("--dry-run", action="store_true", help="print the new Str instead of writing")
+
+    p = sub.add_parser("baldy", help="clear Hair definitionid and write the .sav")
+    p.add_argument("--dry-run", action="store_true", help="print the new Str instead of writing")
+
+    p = sub.add_parser("bulk", help="shift/scale every colour field of every block and write the .sav")
+    p.add_argument("--hue", type=float, default=0.0, help="hue rotation in degrees")
+    p.add_argument("--saturation", type=float, default=1.0, help="saturation factor")
+    p.add_argument("--value", type=float, default=1.0, help="brightness (HSV value) factor")
+    p.add_argument("--type", action="append", dest="types", help="only this block type (repeatable)")
+    p.add_argument("--dry-run", action="store_true", help="print the new Str instead of writing")
+
+    sub.add_parser("apply", help="write pending changes (LVCC_JSON_DEBUG: convert the .json to .sav)")
+    sub.add_parser("batch", help="JSON-RPC requests on stdin, one per line; pending edits applied at the end")
+
+    p = sub.add_parser("serve", help="JSON-RPC server keeping the document in memory")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"localhost TCP port (default {DEFAULT_PORT})")
+    p.add_argument("--unix", help="Unix socket path instead of TCP")
+
+    p = sub.add_parser("apply-all", help="apply one recipe to every SaveGames folder in a manifest (--dir is ignored)")
+    p.add_argument("manifest", help="text file, one SaveGames folder per line (or a JSON list)")
+    p.add_argument("--recipe", help='JSON file: {"Skin": "#ffccaa", "Hair": "10,10,10", "baldy": true}')
+    p.add_argument("--skin", help="Skin colour (overrides the recipe)")
+    p.add_argument("--hair", help="Hair colour (overrides the recipe)")
+    p.add_argument("--baldy", action="store_true", help="also clear Hair definitionid")
+    p.add_argument("--workers", type=int, help="worker processes (default: CPU count, max 8)")
+    p.add_argument("--journal", help="progress file (default: <manifest>.done.jsonl)")
+    p.add_argument("--restart", action="store_true", help="forget the progress of an earlier run")
+
+    args = ap.parse_args(argv)
+    use_uesave(args.uesave, native=not args.no_native)
+    if args.cmd == "apply-all":
+        return _apply_all(args)
+    session = Session(_resolve_dir(args.dir))
+
+    try:
+        if args.cmd == "get":
+            _print(session.get(args.parts, args.fields))
+        elif args.cmd == "get-str":
+            _print(session.get_str())
+        elif args.cmd in ("set-color", "baldy"):
+            if args.cmd == "set-color":
+                session.set_color(args.part, args.color)
+            if args.cmd == "baldy" or args.baldy:
+                session.baldy()
+            _print(session.get_str() if args.dry_run else session.apply())
+        elif args.cmd == "bulk":
+            session.bulk(args.hue, args.saturation, args.value, args.types)
+            _print(session.get_str() if args.dry_run else session.apply())
+        elif args.cmd == "apply":
+            _print(session.apply())
+        elif args.cmd == "batch":
+            dispatcher = Dispatcher(session)
+            for line in sys.stdin:
+                if line.strip():
+                    out = dispatcher.handle_line(line)
+                    if out is not None:
+                        print(out, flush=True)
+            if session.status()["dirty"]:  # 응답들과 같은 한 줄 JSON (진행 메시지는 stderr)
+                print(json.dumps(session.apply(), ensure_ascii=False), flush=True)
+        elif args.cmd == "serve":
+            server = make_server(session, args.port, args.unix)
+            where = args.unix or "127.0.0.1:%d" % args.port
+            print(f"[serve] {session.save_dir} on {where} (send {{\"method\": \"shutdown\"}} to stop)", file=sys.stderr, flush=True)
+            with server:
+                try:
+                    server.serve_forever()
+                except KeyboardInterrupt:
+                    pass
+            if args.unix:
+                Path(args.unix).unlink(missing_ok=True)
+    except (OSError, ValueError, RuntimeError) as e:
+        print("[ERROR]", e, file=sys.stderr)
+        return 1
+    finally:
+        Uesave.get().close()
+    return 0
+
+
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()  # apply-all의 작업 프로세스 (PyInstaller exe)
+    sys.exit(main())
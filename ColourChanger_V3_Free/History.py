@@ -0,0 +1,228 @@
+# History.py
+from __future__ import annotations
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from Update_json import build_str, style_model
+
+'''
+Description:
+Undo / redo over the parsed Str model (order, blocks, tail)
+Str are parsed through the shared style_model() --> a Str the GUI already read is not parsed again
+
+#1) Steps store only what changed:
+Step.changes = {type: (block before, block after)} (None = block didn't exist)
+Blocks that did not change are not copied --> every point in history shares them with the current state
+(Python strings are immutable, so "sharing" is just keeping the same str objects)
+
+#2) Undo / redo:
+Apply one step backwards / forwards to the current state --> cost depends on the size of that step only,
+not on how long the history is. The Str of the current point is built once (join) and kept until the next step
+
+#3) Memory budget:
+Sum of the stored block texts; when it goes over max_bytes the OLDEST steps are dropped
+(you can't undo that far anymore, everything else keeps working)
+
+#4) Points and diff:
+Point = number of steps applied since the beginning (0 = first state). Points stay valid after eviction.
+diff(a, b) --> only the blocks that differ between the two points
+'''
+
+MAX_BYTES = 4 * 1024 * 1024
+Change = Tuple[Optional[str], Optional[str]]  # (before, after)
+
+
+class Step(NamedTuple):
+    label: str
+    changes: Dict[str, Change]
+    order: Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]]  # 순서가 바뀐 경우만 (before, after)
+    tail: Optional[Tuple[str, str]]                          # tail이 바뀐 경우만 (before, after)
+
+    @property
+    def size(self) -> int:
+        n = sum(len(a or "") + len(b or "") for a, b in self.changes.values())
+        if self.tail is not None:
+            n += len(self.tail[0]) + len(self.tail[1])
+        if self.order is not None:
+            n += sum(len(t) for t in self.order[0] + self.order[1])
+        return n
+
+
+class StyleHistory:
+    def __init__(self, s: str, max_bytes: int = MAX_BYTES):
+        model = style_model(s)
+        self.order: Tuple[str, ...] = tuple(model.order)
+        self.blocks: Dict[str, str] = model.blocks_text()
+        self.tail = model.tail
+        self._str: Optional[str] = s  # 현재 지점의 Str (단계를 적용하면 None → current()에서 다시 만듦)
+        self.max_bytes = max_bytes
+        self._steps: Deque[Step] = deque()
+        self._base = 0       # _steps[0] 이전 지점의 번호 (오래된 단계를 버리면 증가)
+        self._cursor = 0     # _steps 중 적용된 개수
+        self._bytes = 0
+
+    # ---- 상태 ----
+    @property
+    def point(self) -> int:
+        """현재 지점 번호"""
+        return self._base + self._cursor
+
+    @property
+    def oldest(self) -> int:
+        return self._base
+
+    @property
+    def newest(self) -> int:
+        return self._base + len(self._steps)
+
+    @property
+    def can_undo(self) -> bool:
+        return self._cursor > 0
+
+    @property
+    def can_redo(self) -> bool:
+        return self._cursor < len(self._steps)
+
+    def current(self) -> str:
+        if self._str is None:
+            self._str = build_str(list(self.order), self.blocks, self.tail)
+        return self._str
+
+    def labels(self) -> List[str]:
+        return [st.label for st in self._steps]
+
+    # ---- 기록 ----
+    def record(self, s: str, label: str = "") -> bool:
+        """새 Str을 기록. 현재와 같으면 아무것도 안 하고 False. redo 가지는 버린다."""
+        if s == self._str:
+            return False
+        model = style_model(s)
+        blocks, tail = model.blocks_text(), model.tail
+        changes: Dict[str, Change] = {}
+        for typ, text in blocks.items():
+            old = self.blocks.get(typ)
+            if old != text:
+                changes[typ] = (old, text)
+        for typ, old in self.blocks.items():
+            if typ not in blocks:
+                changes[typ] = (old, None)
+        new_order = tuple(model.order)
+        step = Step(
+            label, changes,
+            (self.order, new_order) if new_order != self.order else None,
+            (self.tail, tail) if tail != self.tail else None,
+        )
+        if not changes and step.order is None and step.tail is None:
+            return False
+        self._push(step)
+        self._str = s
+        return True
+
+    def _push(self, step: Step) -> None:
+        while len(self._steps) > self._cursor:  # redo 가지 버림
+            self._bytes -= self._steps.pop().size
+        self._apply(step, forward=True)
+        self._steps.append(step)
+        self._cursor += 1
+        self._bytes += step.size
+        # 예산 초과 → 가장 오래된 단계부터 (방금 넣은 단계는 남김)
+        while self._bytes > self.max_bytes and len(self._steps) > 1:
+            self._bytes -= self._steps.popleft().size
+            self._base += 1
+            self._cursor -= 1
+
+    def _apply(self, step: Step, forward: bool) -> None:
+        for typ, (before, after) in step.changes.items():
+            value = after if forward else before
+            if value is None:
+                self.blocks.pop(typ, None)
+            else:
+                self.blocks[typ] = value
+        if step.order is not None:
+            self.order = step.order[1] if forward else step.order[0]
+        if step.tail is not None:
+            self.tail = step.tail[1] if forward else step.tail[0]
+        self._str = None
+
+    # ---- 되돌리기 ----
+    def undo(self) -> Optional[str]:
+        """한 단계 뒤로 → 그 지점의 Str (더 갈 곳이 없으면 None)"""
+        if not self.can_undo:
+            return None
+        self._cursor -= 1
+        self._apply(self._steps[self._cursor], forward=False)
+        return self.current()
+
+    def redo(self) -> Optional[str]:
+        if not self.can_redo:
+            return None
+        self._apply(self._steps[self._cursor], forward=True)
+        self._cursor += 1
+        return self.current()
+
+    # ---- 비교 ----
+    def diff(self, a: int, b: int) -> Dict[str, Change]:
+        """지점 a → b 사이에 바뀐 블록만: {type: (a의 블록, b의 블록)} (None = 그 지점에 없음)"""
+        for p in (a, b):
+            if not self.oldest <= p <= self.newest:
+                raise IndexError(f"history point {p} not in [{self.oldest}, {self.newest}]")
+        forward = b >= a
+        lo, hi = sorted((a - self._base, b - self._base))
+        steps = [self._steps[i] for i in range(lo, hi)]
+        if not forward:
+            steps.reverse()
+        out: Dict[str, Change] = {}
+        for st in steps:
+            for typ, (before, after) in st.changes.items():
+                if not forward:
+                    before, after = after, before
+                first = out[typ][0] if typ in out else before
+                out[typ] = (first, after)
+        return {t: c for t, c in out.items() if c[0] != c[1]}
+
+
+# -------------------------
+# Testing
+# -------------------------
+if __name__ == "__main__":
+    from Update_json import replace_last_field
+
+    def blk(t: str, c: str) -> str:
+        return f"definitionid:{t}_1;color:{c};type:{t};"
+
+    s0 = "".join(blk(t, "(R=0.1,G=0.1,B=0.1,A=1.000000)") for t in ("Skin", "Hair", "Eyes")) + "version:2"
+    h = StyleHistory(s0)
+    states = [s0]
+    for i in range(1, 6):
+        m = style_model(states[-1])
+        order, blocks, tail = list(m.order), m.blocks_text(), m.tail
+        typ = ("Skin", "Hair")[i % 2]
+        blocks[typ] = replace_last_field(blocks[typ], "color", f"(R=0.{i}5,G=0.1,B=0.1,A=1.000000)")
+        states.append(build_str(order, blocks, tail))
+        assert h.record(states[-1], f"edit {i}")
+    assert not h.record(states[-1])  # 같은 내용 → 단계 없음
+
+    for i in range(4, -1, -1):
+        assert h.undo() == states[i]
+    assert h.undo() is None
+    for i in range(1, 6):
+        assert h.redo() == states[i]
+
+    d = h.diff(0, 5)
+    assert set(d) == {"Skin", "Hair"} and d["Skin"][1] == style_model(states[5]).block_text("Skin")
+    assert h.diff(5, 0)["Hair"][1] == style_model(s0).block_text("Hair")
+    assert h.diff(2, 2) == {}
+
+    # 분기: undo 후 새 기록 → redo 불가
+    h.undo(); h.undo()
+    assert h.record(s0, "reset") and not h.can_redo and h.current() == s0
+
+    # 예산: 오래된 단계부터 버려지고 지점 번호는 유지
+    small = StyleHistory(s0, max_bytes=200)
+    for st in states[1:]:
+        small.record(st)
+    assert small.oldest > 0 and small.point == 5 and small.current() == states[5]
+    while small.undo() is not None:
+        pass
+    assert small.current() == states[small.oldest]
+    print("ok, kept", len(small.labels()), "of 5 steps under", small.max_bytes, "bytes")
@@ -0,0 +1,205 @@
+# JsonSplice.py
+from __future__ import annotations
+from typing import Optional, Sequence, Tuple
+import json
+import re
+
+'''
+Description:
+Fast path for the ONE value we care about in the uesave JSON:
+    ["root"]["properties"]["AllStyleValues_0"]["Str"]
+
+#1) find_value_span():
+Walks the raw JSON bytes along the key path and SKIPS every other value
+(nested objects/arrays are jumped over with a regex, nothing is decoded)
+--> returns the byte span [start, end) of the wanted value
+
+#2) read_str() / splice_str():
+Only the Str literal is decoded, and on write only that span is replaced
+--> every byte outside the span stays exactly as it was (no json.load / json.dump of the whole tree)
+
+#3) Small files:
+Below SMALL_BYTES the C json parser beats a Python-level walk, so the value is read with json.loads
+and its span is found with one regex over the bytes (`"AllStyleValues_0": {"Str": "..."`),
+accepted only if exactly one match decodes to that value.
+
+If the JSON doesn't have the expected shape, the functions return None
+so the caller can fall back to the normal json.load path.
+'''
+
+STR_PATH: Tuple[str, ...] = ("root", "properties", "AllStyleValues_0", "Str")
+
+_WS = re.compile(rb"[ \t\r\n]*")
+_SCALAR = re.compile(rb"-?[0-9][0-9.eE+-]*|true|false|null")
+_STRUCT = re.compile(rb'["{}\[\]]')
+
+SMALL_BYTES = 32 * 1024
+
+
+def _ws(buf: bytes, pos: int) -> int:
+    return _WS.match(buf, pos).end()
+
+
+def _string_end(buf: bytes, pos: int) -> Optional[int]:
+    """pos의 '"'로 시작하는 문자열 리터럴의 끝(닫는 '"' 다음) 위치. bytes.find로 따옴표만 건너뛴다."""
+    if buf[pos:pos + 1] != b'"':
+        return None
+    i = pos + 1
+    while True:
+        j = buf.find(b'"', i)
+        if j < 0:
+            return None
+        k = j
+        while buf[k - 1] == 0x5C:  # '\\' 개수가 홀수면 이스케이프된 따옴표
+            k -= 1
+        if (j - k) % 2 == 0:
+            return j + 1
+        i = j + 1
+
+
+def _skip_value(buf: bytes, pos: int) -> Optional[int]:
+    """pos에서 시작하는 JSON 값 하나를 건너뛰고 끝 위치 반환 (모양이 이상하면 None)"""
+    c = buf[pos:pos + 1]
+    if c == b'"':
+        return _string_end(buf, pos)
+    if c in (b"{", b"["):
+        depth = 0
+        while True:
+            m = _STRUCT.search(buf, pos)
+            if not m:
+                return None
+            ch = m.group()
+            if ch == b'"':
+                end = _string_end(buf, m.start())
+                if end is None:
+                    return None
+                pos = end
+                continue
+            depth += 1 if ch in (b"{", b"[") else -1
+            pos = m.end()
+            if depth == 0:
+                return pos
+    m = _SCALAR.match(buf, pos)
+    return m.end() if m else None
+
+
+def find_value_span(buf: bytes, path: Sequence[str] = STR_PATH) -> Optional[Tuple[int, int]]:
+    """path를 따라 내려가 해당 값의 [start, end) 바이트 범위. 못 찾으면 None."""
+    try:
+        pos = _ws(buf, 0)
+        for key in path:
+            if buf[pos:pos + 1] != b"{":
+                return None
+            pos = _ws(buf, pos + 1)
+            while True:
+                k_end = _string_end(buf, pos)
+                if k_end is None:
+                    return None
+                k = buf[pos:k_end]
+                k = json.loads(k) if b"\\" in k else k[1:-1].decode("utf-8")
+                pos = _ws(buf, k_end)
+                if buf[pos:pos + 1] != b":":
+                    return None
+                pos = _ws(buf, pos + 1)
+                if k == key:
+                    break
+                end = _skip_value(buf, pos)
+                if end is None:
+                    return None
+                pos = _ws(buf, end)
+                if buf[pos:pos + 1] != b",":
+                    return None  # '}' → key not in this object
+                pos = _ws(buf, pos + 1)
+        end = _skip_value(buf, pos)
+        return None if end is None else (pos, end)
+    except ValueError:
+        return None
+
+
+def _read_str_small(buf: bytes, path: Sequence[str]) -> Optional[Tuple[str, int, int]]:
+    """작은 파일: json.loads로 값을 읽고, 정규식 한 번으로 그 값의 리터럴 위치를 찾는다"""
+    try:
+        node = json.loads(buf.decode("utf-8"))
+        for key in path:
+            node = node[key]
+    except (ValueError, KeyError, TypeError):
+        return None
+    if not isinstance(node, str) or len(path) < 2:
+        return None
+    key = json.dumps(path[-2]).encode()
+    after = re.compile(rb"\s*:\s*\{\s*" + re.escape(json.dumps(path[-1]).encode()) + rb"\s*:\s*")
+    hits = []
+    i = buf.find(key)
+    while i >= 0:
+        m = after.match(buf, i + len(key))
+        end = _string_end(buf, m.end()) if m else None
+        if end is not None and json.loads(buf[m.end():end].decode("utf-8")) == node:
+            hits.append((m.end(), end))
+        i = buf.find(key, i + 1)
+    if len(hits) != 1:
+        return None
+    return node, hits[0][0], hits[0][1]
+
+
+def read_str(buf: bytes, path: Sequence[str] = STR_PATH) -> Optional[Tuple[str, int, int]]:
+    """(Str 값, start, end). Str이 문자열이 아니거나 못 찾으면 None."""
+    if len(buf) < SMALL_BYTES:
+        hit = _read_str_small(buf, path)
+        if hit is not None:
+            return hit
+    span = find_value_span(buf, path)
+    if span is None or buf[span[0]:span[0] + 1] != b'"':
+        return None
+    start, end = span
+    return json.loads(buf[start:end].decode("utf-8")), start, end
+
+
+def encode_str(s: str) -> bytes:
+    """json.dump(..., ensure_ascii=False)가 쓰는 것과 같은 문자열 리터럴"""
+    return json.dumps(s, ensure_ascii=False).encode("utf-8")
+
+
+def splice_str(buf: bytes, start: int, end: int, new_str: str) -> bytes:
+    """[start, end)만 새 문자열 리터럴로 교체, 나머지 바이트는 그대로"""
+    return buf[:start] + encode_str(new_str) + buf[end:]
+
+
+# -------------------------
+# Testing / benchmark: large multi-property save JSON
+# -------------------------
+if __name__ == "__main__":
+    import time
+
+    style = ";".join(f"definitionid:Item_{i};color:(R=0.5,G=0.5,B=0.5,A=1.000000);type:T{i}" for i in range(200))
+    props = {f"Prop_{i}": {"Array": {"Base": {"Int": list(range(2000))}}} for i in range(100)}
+    props["Name_0"] = {"Str": 'tricky "AllStyleValues_0": {"Str": "no"}'}
+    props["AllStyleValues_0"] = {"Str": style}
+    doc = {"header": {"magic": 1396790855}, "root": {"save_game_type": "x", "properties": props}, "extra": [0, 0, 0, 0]}
+    raw = json.dumps(doc, ensure_ascii=False, indent=2).encode("utf-8")
+
+    hit = read_str(raw)
+    assert hit is not None and hit[0] == style
+    new = style.replace("0.5", "0.25", 1)
+    spliced = splice_str(raw, hit[1], hit[2], new)
+    doc["root"]["properties"]["AllStyleValues_0"]["Str"] = new
+    assert spliced == json.dumps(doc, ensure_ascii=False, indent=2).encode("utf-8")
+
+    def bench(fn, n=20):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        return (time.perf_counter() - t0) / n * 1000
+
+    def full():
+        d = json.loads(raw.decode("utf-8"))
+        d["root"]["properties"]["AllStyleValues_0"]["Str"] = new
+        json.dumps(d, ensure_ascii=False, indent=2).encode("utf-8")
+
+    def fast():
+        s, a, b = read_str(raw)
+        splice_str(raw, a, b, new)
+
+    print(f"json size: {len(raw) / 1e6:.1f} MB")
+    t_full, t_fast = bench(full), bench(fast)
+    print(f"full load+dump: {t_full:8.2f} ms")
+    print(f"scan+splice   : {t_fast:8.2f} ms  ({t_full / t_fast:.1f}x)")
@@ -0,0 +1,55 @@
+# LastState.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, Optional
+import json
+import os
+import sys
+
+'''
+Description:
+What the app saw last time --> the window can be drawn right away on the next launch
+
+#1) File:
+%APPDATA%/LVColorChanger/state.json (~/LVColorChanger/state.json elsewhere)
+{"save_dir": "...", "values": {"Skin": {"color": ...}, "Hair": {"color": ...}}}
+
+#2) Use:
+Startup paints from "values" (and skips the folder dialog if save_dir still has the .sav),
+then the real .sav is read in the background and the display is reconciled.
+The snapshot is only a hint: it is never written back to the game.
+'''
+
+APP_DIR = Path(os.environ.get("APPDATA") or Path.home()) / "LVColorChanger"
+STATE_FILE = APP_DIR / "state.json"
+
+
+def load_state(path: Path = STATE_FILE) -> Dict[str, Any]:
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(save_dir: Optional[Path], values: Optional[Dict[str, Dict[str, str]]],
+               path: Path = STATE_FILE) -> None:
+    """실패해도 프로그램 동작에는 영향 없음 (다음 시작이 조금 느려질 뿐)"""
+    data = {"save_dir": str(save_dir) if save_dir else None, "values": values}
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        tmp.replace(path)
+    except OSError as e:
+        print("[state] write failed:", e, file=sys.stderr)
+
+
+def snapshot_values(state: Dict[str, Any]) -> Optional[Dict[str, Dict[str, str]]]:
+    """state의 Skin/Hair 값 (모양이 이상하면 None)"""
+    values = state.get("values")
+    try:
+        return {part: {"color": str(values[part]["color"])} for part in ("Skin", "Hair")}
+    except (KeyError, TypeError):
+        return None
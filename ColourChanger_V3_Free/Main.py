@@ -2,38 +2,61 @@
 
 from __future__ import annotations
 
+import time
+_T0 = time.perf_counter()  # 첫 화면까지 걸린 시간 기준점 (import 포함)
+
+import colorsys
 import re
+import sys
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, Future
 import tkinter as tk
-from tkinter import messagebox, colorchooser, filedialog
-from typing import Optional, Tuple, Dict
+from tkinter import messagebox, ttk  # colorchooser / filedialog 는 처음 쓸 때 import
+from typing import Any, Callable, Optional, Tuple, Dict
 
 # ---- 외부 모듈 ---------------------------------------------------------------
-from Create_json import create_json
+from Create_json import create_json, JSON_DEBUG, STYLE_SAV
 from Update_json import (
-    read_json_str, parse_str, get_last_field,
-    update_skin_rgb, update_hair_rgb, set_baldy_mode,
+    style_source, style_model, StyleDocument, rgba_str_from_255,
 )
-from SaveApply import apply_json_to_sav
+from SaveApply import PendingEdits, apply_json_to_sav, write_behind, flush_pending, discard_pending, WRITE_BEHIND_S
+from SaveWatcher import SaveWatcher
+from History import StyleHistory
+from LastState import load_state, save_state, snapshot_values
+import Procs
+import Profiler
+import Uesave
 
 # ---- 상수 / 정규식 -----------------------------------------------------------
 # 고정 경로 삭제! 시작 시 유저가 선택 -> 아래 전역 변수에 주입
 SAVE_DIR: Optional[Path] = None
-JSON_FILE: Optional[Path] = None
+SAV_FILE: Optional[Path] = None
+JSON_FILE: Optional[Path] = None  # JSON_DEBUG일 때만 사용 (평소에는 .json 없이 sav를 메모리에서 직접 편집)
+
+WATCH_POLL_MS = 500  # sav 변경 감시 주기 (자동 새로고침)
+PRESET_COUNT = 10    # 프리셋 창에 보여줄 가까운 색 개수
+FRAME_MS = 16        # 색 편집 중 화면 갱신 간격 (~60fps, 그 사이의 슬라이더 이벤트는 모아서 한 번에)
 
 RGBA_RE = re.compile(r"\(R=([0-9.]+),G=([0-9.]+),B=([0-9.]+),A=[0-9.]+\)")
 
 # ---- 유틸 함수 ---------------------------------------------------------------
 def ensure_json_exists() -> None:
-    """sav -> json 변환 시도 (json 이미 있으면 그대로 둠)"""
-    if not SAVE_DIR:
+    """(JSON_DEBUG) sav -> json 변환 시도 (json 이미 있으면 그대로 둠)"""
+    if not SAVE_DIR or not JSON_DEBUG:
         return
     try:
-        create_json(str(SAVE_DIR))
+        create_json(str(SAVE_DIR), pattern=STYLE_SAV)
+    except Procs.Cancelled:
+        raise
     except Exception as e:
         print("[WARN] create_json failed:", e)
 
 
+def source_file() -> Optional[Path]:
+    """값을 읽고 쓰는 파일: 평소에는 sav, JSON_DEBUG면 json"""
+    return JSON_FILE if JSON_DEBUG else SAV_FILE
+
+
 def rgba_str_to_rgb255(rgba: str) -> Optional[Tuple[int, int, int]]:
     """'(R=...,G=...,B=...,A=...)' -> (r,g,b) 0~255. 실패 시 None."""
     m = RGBA_RE.match(rgba or "")
@@ -51,37 +74,260 @@ def rgb255_to_rgba_str(rgb: Tuple[int, int, int]) -> str:
     return f"(R={round(r/255,6)},G={round(g/255,6)},B={round(b/255,6)},A=1.000000)"
 
 
+def read_current_str() -> str:
+    """sav(또는 JSON_DEBUG면 JSON)의 AllStyleValues_0 Str (파일이 그대로면 캐시된 모델의 Str)"""
+    src = source_file()
+    if not src:
+        return ""
+    return style_source(src).model.str
+
+
 def read_current_values() -> Dict[str, Dict[str, str]]:
     """
-    JSON에서 현재 값 읽기 (배포용: Hat 정보는 다루지 않음)
+    sav(또는 JSON_DEBUG면 JSON)에서 현재 값 읽기 (배포용: Hat 정보는 다루지 않음)
     반환: {"Skin":{"color":...}, "Hair":{"color":...}}
     """
-    if not JSON_FILE:
-        return {"Skin": {"color": ""}, "Hair": {"color": ""}}
-    s, _ = read_json_str(JSON_FILE)
-    _, blocks, _ = parse_str(s)
-    vals = {"Skin": {"color": ""}, "Hair": {"color": ""}}
-    if "Skin" in blocks:
-        vals["Skin"]["color"] = get_last_field(blocks["Skin"], "color")
-    if "Hair" in blocks:
-        vals["Hair"]["color"] = get_last_field(blocks["Hair"], "color")
-    return vals
+    return values_from_str(read_current_str())
+
+
+def values_from_str(s: str) -> Dict[str, Dict[str, str]]:
+    # read_current_str이 돌려준 Str이면 이미 파싱된 모델을 그대로 씀
+    model = style_model(s)
+    return {part: {"color": model.get(part, "color")} for part in ("Skin", "Hair")}
 
 
 # ---- 소형 위젯: 컬러 미리보기 -------------------------------------------------
 class ColorPreview(tk.Canvas):
-    """(R,G,B,A) 문자열을 받아 사각형으로 미리보기 표시. 실패 시 '?' 표시."""
+    """
+    (R,G,B,A) 문자열 또는 (r,g,b)를 받아 사각형으로 미리보기 표시. 실패 시 '?' 표시.
+    사각형/글자는 한 번만 만들고 itemconfig로 색과 보이기만 바꾼다 (드래그 중 매 프레임 호출됨).
+    """
     def __init__(self, parent, width=40, height=40):
         super().__init__(parent, width=width, height=height, bd=1, relief="solid")
+        self._rect = self.create_rectangle(2, 2, 38, 38, fill="", outline="", state="hidden")
+        self._text = self.create_text(20, 20, text="?", font=("Segoe UI", 12))
+        self._shown: Optional[Tuple[int, int, int]] = None
 
-    def set_color_text(self, rgba_text: str) -> None:
-        self.delete("all")
-        rgb = rgba_str_to_rgb255(rgba_text)
+    def set_rgb(self, rgb: Optional[Tuple[int, int, int]]) -> None:
+        if rgb == self._shown:
+            return
+        self._shown = rgb
         if rgb is None:
-            self.create_text(20, 20, text="?", font=("Segoe UI", 12))
+            self.itemconfig(self._rect, state="hidden")
+            self.itemconfig(self._text, state="normal")
+        else:
+            self.itemconfig(self._rect, fill=f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}", state="normal")
+            self.itemconfig(self._text, state="hidden")
+
+    def set_color_text(self, rgba_text: str) -> None:
+        self.set_rgb(rgba_str_to_rgb255(rgba_text))
+
+
+# ---- 색 편집 패널 (HSV / RGB 슬라이더) ------------------------------------------
+class ColorEditor(tk.Frame):
+    """
+    Skin/Hair 색을 슬라이더로 편집 (모달 창 아님, 움직이는 동안 미리보기가 계속 바뀜).
+    - 슬라이더 이벤트는 숫자 상태(self.rgb, self.hsv)만 바꾸고 화면 갱신을 예약
+    - 화면 갱신(미리보기, 반대쪽 슬라이더, 표시 문자열)은 FRAME_MS마다 최대 한 번
+    - HSV를 따로 들고 있어서 채도/명도가 0이 되어도 색상(H)이 튀지 않음
+    """
+    SCALES = (("H", 359), ("S", 100), ("V", 100), ("R", 255), ("G", 255), ("B", 255))
+
+    def __init__(self, parent: tk.Misc, on_close: Callable[[], None]):
+        super().__init__(parent, bd=1, relief="groove")
+        self.on_close = on_close
+        self.title_label = tk.Label(self, font=("Segoe UI", 9, "bold"))
+        self.title_label.place(x=8, y=4)
+        tk.Button(self, text="Done", width=6, command=self.close).place(x=570, y=2)
+        tk.Button(self, text="Revert", width=6, command=self.revert).place(x=505, y=2)
+        tk.Button(self, text="Picker...", command=self._pick).place(x=430, y=2)
+
+        self.scales: Dict[str, tk.Scale] = {}
+        for i, (name, top) in enumerate(self.SCALES):
+            col, row = divmod(i, 3)
+            tk.Label(self, text=name, font=("Segoe UI", 9, "bold")).place(x=8 + col * 320, y=48 + row * 34)
+            sc = tk.Scale(self, from_=0, to=top, orient="horizontal", length=270, width=10,
+                          showvalue=True, highlightthickness=0,
+                          command=lambda v, n=name: self._on_scale(n, v))
+            sc.place(x=26 + col * 320, y=30 + row * 34)
+            self.scales[name] = sc
+
+        self.var: Optional[tk.StringVar] = None
+        self.preview: Optional[ColorPreview] = None
+        self.rgb: Tuple[int, int, int] = (0, 0, 0)
+        self.hsv: Tuple[float, float, float] = (0.0, 0.0, 0.0)
+        self._start = ""
+        self._shown: Dict[str, int] = {}   # 슬라이더에 마지막으로 set()한 값 (되돌아오는 이벤트 무시용)
+        self._redraw: Optional[str] = None  # 예약된 after id
+        self._sync = ""                     # 다음 갱신 때 맞출 슬라이더 묶음 ("RGB" / "HSV")
+
+    @property
+    def is_open(self) -> bool:
+        return self.var is not None
+
+    # --- 열기 / 닫기 ---
+    def open(self, part: str, var: tk.StringVar, preview: ColorPreview) -> None:
+        self.flush()
+        self.var, self.preview = var, preview
+        self.title_label.config(text=f"{part} colour")
+        self.reload()
+
+    def reload(self) -> None:
+        """표시값(var)이 밖에서 바뀌었을 때 (새로고침/프리셋 등) 다시 읽기"""
+        if self.var is None:
+            return
+        self._cancel_redraw()
+        self._start = self.var.get()
+        self._load(rgba_str_to_rgb255(self._start.strip()) or (128, 128, 128))
+
+    def close(self) -> None:
+        self.flush()
+        self.var = self.preview = None
+        self.on_close()
+
+    def revert(self) -> None:
+        if self.var is None:
+            return
+        self._cancel_redraw()
+        self.var.set(self._start)
+        self.preview.set_color_text(self._start)
+        self._load(rgba_str_to_rgb255(self._start.strip()) or (128, 128, 128))
+
+    def _pick(self) -> None:
+        """예전 RGB 선택 창도 그대로 쓸 수 있게"""
+        from tkinter import colorchooser
+        r, g, b = self.rgb
+        rgb, _ = colorchooser.askcolor(color=f"#{r:02x}{g:02x}{b:02x}", title="RGB Selector")
+        if rgb and self.var is not None:
+            self._load((int(rgb[0]), int(rgb[1]), int(rgb[2])))
+            self._apply()
+
+    # --- 숫자 상태 ---
+    def _load(self, rgb: Tuple[int, int, int]) -> None:
+        self.rgb = rgb
+        self.hsv = colorsys.rgb_to_hsv(rgb[0] / 255, rgb[1] / 255, rgb[2] / 255)
+        self._set_scales("HSVRGB")
+
+    def _set_scales(self, names: str) -> None:
+        h, s, v = self.hsv
+        values = {"H": round(h * 360) % 360, "S": round(s * 100), "V": round(v * 100),
+                  "R": self.rgb[0], "G": self.rgb[1], "B": self.rgb[2]}
+        for n in names:
+            if self._shown.get(n) != values[n]:
+                self._shown[n] = values[n]
+                self.scales[n].set(values[n])
+
+    def _on_scale(self, name: str, value: str) -> None:
+        v = int(float(value))
+        if self._shown.get(name) == v or self.var is None:
+            return  # set()으로 맞춘 값이 돌아온 것
+        self._shown[name] = v
+        if name in "HSV":
+            h = self._shown["H"] / 360
+            s = self._shown["S"] / 100
+            val = self._shown["V"] / 100
+            self.hsv = (h, s, val)
+            self.rgb = tuple(round(c * 255) for c in colorsys.hsv_to_rgb(h, s, val))
+            self._sync = "RGB"
         else:
-            hex_color = f"#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}"
-            self.create_rectangle(2, 2, 38, 38, fill=hex_color, outline="")
+            self.rgb = (self._shown["R"], self._shown["G"], self._shown["B"])
+            self.hsv = colorsys.rgb_to_hsv(self.rgb[0] / 255, self.rgb[1] / 255, self.rgb[2] / 255)
+            self._sync = "HSV"
+        if self._redraw is None:
+            self._redraw = self.after(FRAME_MS, self._apply)
+
+    # --- 화면 갱신 (프레임당 한 번) ---
+    def _cancel_redraw(self) -> None:
+        if self._redraw is not None:
+            self.after_cancel(self._redraw)
+            self._redraw = None
+
+    def flush(self) -> None:
+        """예약된 갱신이 있으면 지금 반영 (닫기/다른 항목 열기 전에)"""
+        if self._redraw is not None:
+            self._cancel_redraw()
+            self._apply()
+
+    def _apply(self) -> None:
+        self._redraw = None
+        if self.var is None:
+            return
+        if self._sync:
+            self._set_scales(self._sync)
+            self._sync = ""
+        self.preview.set_rgb(self.rgb)
+        self.var.set(rgb255_to_rgba_str(self.rgb))
+
+
+# ---- 백그라운드 작업 ----------------------------------------------------------
+class TaskRunner:
+    """
+    uesave 변환/JSON I/O를 Tk 메인 스레드 밖(작업 스레드 1개)에서 실행.
+    결과는 after() 폴링으로 메인 스레드에서 콜백에 전달 → 콜백 안에서는 위젯을 마음대로 만져도 됨.
+    한 번에 작업 하나만 실행하고, cancel()은 그 작업이 띄운 uesave만 종료시킨다 (작업마다 Procs.CancelToken).
+    """
+    def __init__(self, root: tk.Misc, poll_ms: int = 50):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="lvcc-job")
+        self._future: Optional[Future] = None
+        self._token: Optional[Procs.CancelToken] = None
+        self._callbacks: Dict[str, Optional[Callable]] = {}
+
+    @property
+    def busy(self) -> bool:
+        return self._future is not None
+
+    def submit(self, fn: Callable[..., Any], *args: Any,
+               on_done: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[Exception], None]] = None,
+               on_cancel: Optional[Callable[[], None]] = None,
+               on_finally: Optional[Callable[[], None]] = None) -> bool:
+        """작업 시작. 이미 실행 중이면 False."""
+        if self.busy:
+            return False
+        self._callbacks = {"done": on_done, "error": on_error, "cancel": on_cancel, "finally": on_finally}
+        self._token = Procs.CancelToken()
+        self._future = self._pool.submit(self._run, self._token, fn, *args)
+        self.root.after(self.poll_ms, self._poll)
+        return True
+
+    @staticmethod
+    def _run(token: Procs.CancelToken, fn: Callable[..., Any], *args: Any) -> Any:
+        with Procs.job(token):
+            return fn(*args)
+
+    def cancel(self) -> None:
+        if self.busy and self._token is not None:
+            self._token.cancel()
+
+    def shutdown(self) -> None:
+        self.cancel()
+        self._pool.shutdown(wait=False)
+
+    def _poll(self) -> None:
+        fut = self._future
+        if fut is None:
+            return
+        if not fut.done():
+            self.root.after(self.poll_ms, self._poll)
+            return
+        self._future = self._token = None
+        cb = self._callbacks
+        try:
+            result = fut.result()
+        except Procs.Cancelled:
+            if cb["cancel"]:
+                cb["cancel"]()
+        except Exception as e:
+            if cb["error"]:
+                cb["error"](e)
+        else:
+            if cb["done"]:
+                cb["done"](result)
+        finally:
+            if cb["finally"]:
+                cb["finally"]()
 
 
 # ---- 메인 앱 ------------------------------------------------------------------
@@ -91,17 +337,18 @@ class App(tk.Tk):
         self.title("Longvinter Color Changer [Free Edition] -Made By Unknown-")
         self.geometry("680x300")
 
-        # 1) 시작하자마자 저장 폴더 선택
-        self._pick_save_dir_at_start()
-
-        # 2) 데이터 확보
-        ensure_json_exists()
-        if not JSON_FILE or not JSON_FILE.exists():
-            messagebox.showerror("Error", f"JSON file not found:\n{JSON_FILE}")
-            self.destroy()
+        # 1) 지난번 폴더에 sav가 그대로 있으면 대화상자 없이 바로 사용
+        state = load_state()
+        if not self._use_saved_dir(state.get("save_dir")) and not self._pick_save_dir_at_start():
             return
 
-        self.initial = read_current_values()  # 원본 상태(비교/표시용)
+        # 2) 지난번에 읽은 값으로 먼저 그린다 (실제 sav는 아래에서 백그라운드로 읽고 맞춤)
+        #    다른 폴더를 골랐으면 그 값은 다른 캐릭터의 것 → 빈 값에서 시작
+        same_dir = state.get("save_dir") == str(SAVE_DIR)
+        self.initial = (same_dir and snapshot_values(state)) or {"Skin": {"color": ""}, "Hair": {"color": ""}}
+        # 저장/새로고침/되돌리기 기록 (바뀐 블록만 저장). 첫 읽기가 끝나야 생긴다.
+        self.history: Optional[StyleHistory] = None
+        self._palette = None  # 첫 Presets 클릭 때 DB/색인을 연다
 
         # 바인딩 변수
         self.skin_var = tk.StringVar(value=self.initial["Skin"]["color"])
@@ -110,19 +357,91 @@ class App(tk.Tk):
         # ➜ BALDY MODE: 즉시 저장 X, 저장 시에만 적용
         self.baldy_mode = tk.BooleanVar(value=False)
 
+        # 게임이 sav를 다시 쓰면 자동으로 다시 읽기 (편집 중인 값은 유지)
+        self.auto_refresh = tk.BooleanVar(value=True)
+        self._write_retrying = False  # 지연 기록이 일시적인 오류로 다시 시도 중 (한 번만 묻기 위해)
+
         # UI
         self._build_ui()
 
-    def _pick_save_dir_at_start(self) -> None:
-        """폴더 선택 대화상자 → SAVE_DIR/JSON_FILE 설정"""
-        global SAVE_DIR, JSON_FILE
+        # Save/Refresh는 작업 스레드에서 (창이 멈추지 않도록)
+        self.runner = TaskRunner(self)
+        self.protocol("WM_DELETE_WINDOW", self.on_exit)
+
+        self.watcher = SaveWatcher(SAV_FILE)  # 감시 시작(sav 해시)은 첫 화면 뒤 (_on_first_map)
+        self.after(WATCH_POLL_MS, self._watch_tick)
+
+        self.bind("<Map>", self._on_first_map)
+        self._reconcile()
+
+    @staticmethod
+    def _set_save_dir(path: Path) -> None:
+        global SAVE_DIR, SAV_FILE, JSON_FILE
+        SAVE_DIR = path
+        SAV_FILE = SAVE_DIR / STYLE_SAV
+        JSON_FILE = SAVE_DIR / "characterStyle-1.0.json"
+
+    def _use_saved_dir(self, path: Optional[str]) -> bool:
+        """state.json 의 폴더에 sav가 아직 있으면 그대로 사용"""
+        if not path or not (Path(path) / STYLE_SAV).is_file():
+            return False
+        self._set_save_dir(Path(path))
+        return True
+
+    def _pick_save_dir_at_start(self) -> bool:
+        """폴더 선택 대화상자 → SAVE_DIR/JSON_FILE 설정 (취소하면 창을 닫고 False)"""
+        from tkinter import filedialog
         path = filedialog.askdirectory(title="Select Longvinter Save Folder")
         if not path:
             messagebox.showwarning("Select Folder", "Save 폴더를 선택하지 않아 종료합니다.")
             self.destroy()
+            return False
+        self._set_save_dir(Path(path))
+        return True
+
+    def _on_first_map(self, event: tk.Event) -> None:
+        """창이 처음 화면에 나타난 시점 = 첫 화면 (자식 위젯의 Map 이벤트는 무시)"""
+        if event.widget is not self:
             return
-        SAVE_DIR = Path(path)
-        JSON_FILE = SAVE_DIR / "characterStyle-1.0.json"
+        self.unbind("<Map>")
+        ms = (time.perf_counter() - _T0) * 1000
+        print(f"[startup] first frame: {ms:.0f} ms")
+        Profiler.record("first_frame", ms, from_snapshot=bool(self.initial["Skin"]["color"]))
+        self.watcher.start()
+
+    def _reconcile(self) -> None:
+        """시작 시 실제 sav 읽기 → 스냅샷과 다르면 표시 갱신 (아직 편집하지 않은 항목만)"""
+        def done(s: str) -> None:
+            self._record(s, "open")
+            self._merge_values(values_from_str(s))
+            self._remember_state()
+
+        if self.runner.submit(
+            self._refresh_job,
+            on_done=done,
+            on_error=lambda e: messagebox.showerror("Error", str(e)),
+            on_cancel=lambda: self.busy_label.config(text="Not loaded (press Refresh)"),
+            on_finally=lambda: self._set_busy(None),
+        ):
+            self._set_busy("Loading save...")
+
+    @property
+    def palette(self):
+        if self._palette is None:
+            from Palette import PaletteLibrary
+            self._palette = PaletteLibrary()
+        return self._palette
+
+    def _record(self, s: str, label: str) -> None:
+        """디스크에서 본 Str을 기록 (첫 기록이면 기록 시작점)"""
+        if self.history is None:
+            self.history = StyleHistory(s)
+        else:
+            self.history.record(s, label)
+
+    def _remember_state(self) -> None:
+        """다음 실행 때 바로 그릴 수 있도록 폴더 + 마지막으로 읽은/쓴 값 저장"""
+        save_state(SAVE_DIR, self.initial)
 
     # --- UI 빌드 ---
     def _build_ui(self) -> None:
@@ -134,53 +453,116 @@ class App(tk.Tk):
         self.baldy_status = tk.Label(self, text="BALDY MODE: OFF (Toggle)", fg="#a00", font=("Segoe UI", 9, "bold"))
         self.baldy_status.place(x=16, y=y-6)
 
+        # 되돌리기 (저장된 sav 기준: Undo/Redo 하면 sav에 바로 기록)
+        self.undo_btn = tk.Button(self, text="Undo", width=6, command=lambda: self._step_history(back=True))
+        self.undo_btn.place(x=500, y=y-10)
+        self.redo_btn = tk.Button(self, text="Redo", width=6, command=lambda: self._step_history(back=False))
+        self.redo_btn.place(x=570, y=y-10)
+        self.bind("<Control-z>", lambda _e: self._step_history(back=True))
+        self.bind("<Control-y>", lambda _e: self._step_history(back=False))
+        self._update_history_buttons()
+
         bar = tk.Frame(self)
         bar.pack(side="bottom", fill="x", pady=8)
 
         self.baldy_btn = tk.Button(bar, text="BALDY MODE: OFF (Toggle)", command=self.on_toggle_baldy)
         self.baldy_btn.pack(side="left", padx=8)
 
-        tk.Button(bar, text="Save (JSON → SAV)", command=self.on_save).pack(side="left", padx=8)
-        tk.Button(bar, text="Refresh", command=self.on_refresh).pack(side="left", padx=8)
-        tk.Button(bar, text="Exit", command=self.destroy).pack(side="right", padx=8)
+        self.save_btn = tk.Button(bar, text="Save (JSON → SAV)", command=self.on_save)
+        self.save_btn.pack(side="left", padx=8)
+        self.refresh_btn = tk.Button(bar, text="Refresh", command=self.on_refresh)
+        self.refresh_btn.pack(side="left", padx=8)
+        tk.Checkbutton(bar, text="Auto-refresh", variable=self.auto_refresh).pack(side="left", padx=4)
+        tk.Button(bar, text="Exit", command=self.on_exit).pack(side="right", padx=8)
+
+        # 작업 중 표시 + 취소
+        self.cancel_btn = tk.Button(bar, text="Cancel", command=self.on_cancel, state="disabled")
+        self.cancel_btn.pack(side="right", padx=8)
+        self.busy_bar = ttk.Progressbar(bar, mode="indeterminate", length=80)
+        self.busy_label = tk.Label(bar, text="", fg="#666", font=("Segoe UI", 8))
+        self.busy_label.pack(side="right")
+
+        # Edit 누르면 아래에 펼쳐지는 색 편집 패널 (창도 그만큼 늘어남)
+        self.editor = ColorEditor(self, on_close=self._close_editor)
 
     def _build_skin_row(self, y: int) -> None:
         frm = tk.Frame(self); frm.place(x=14, y=y, width=630, height=80)
         tk.Label(frm, text="Skin Colour", font=("Segoe UI", 10, "bold")).place(x=0, y=0)
 
         # 읽기 전용 표시
-        tk.Entry(frm, textvariable=self.skin_var, width=64, state="readonly").place(x=0, y=26)
+        tk.Entry(frm, textvariable=self.skin_var, width=56, state="readonly").place(x=0, y=26)
 
         # 미리보기 + 선택
         self.skin_preview = ColorPreview(frm); self.skin_preview.place(x=540, y=14)
         self.skin_preview.set_color_text(self.skin_var.get())
-        tk.Button(frm, text="Edit", command=lambda: self._choose_color(self.skin_var, self.skin_preview)).place(x=470, y=23)
+        self.skin_edit_btn = tk.Button(frm, text="Edit", command=lambda: self._choose_color(self.skin_var, self.skin_preview))
+        self.skin_edit_btn.place(x=470, y=23)
+        tk.Button(frm, text="Presets", command=lambda: self._choose_preset("skin", self.skin_var, self.skin_preview)).place(x=405, y=23)
 
-        tk.Label(frm, text="Pick a colour with the RGB selector. ⚠️ If you don't change it, the original is kept.",
+        tk.Label(frm, text="Edit the colour with the HSV/RGB sliders. ⚠️ If you don't change it, the original is kept.",
                  fg="#666", font=("Segoe UI", 8), justify="left", wraplength=480).place(x=0, y=52)
 
     def _build_hair_row(self, y: int) -> None:
         frm = tk.Frame(self); frm.place(x=14, y=y, width=630, height=80)
         tk.Label(frm, text="Hair Colour", font=("Segoe UI", 10, "bold")).place(x=0, y=0)
 
-        tk.Entry(frm, textvariable=self.hair_var, width=64, state="readonly").place(x=0, y=26)
+        tk.Entry(frm, textvariable=self.hair_var, width=56, state="readonly").place(x=0, y=26)
 
         self.hair_preview = ColorPreview(frm); self.hair_preview.place(x=540, y=14)
         self.hair_preview.set_color_text(self.hair_var.get())
-        tk.Button(frm, text="Edit", command=lambda: self._choose_color(self.hair_var, self.hair_preview)).place(x=470, y=23)
+        self.hair_edit_btn = tk.Button(frm, text="Edit", command=lambda: self._choose_color(self.hair_var, self.hair_preview))
+        self.hair_edit_btn.place(x=470, y=23)
+        tk.Button(frm, text="Presets", command=lambda: self._choose_preset("hair", self.hair_var, self.hair_preview)).place(x=405, y=23)
 
-        tk.Label(frm, text="Pick a colour with the RGB selector. ⚠️ If you don't change it, the original is kept.",
+        tk.Label(frm, text="Edit the colour with the HSV/RGB sliders. ⚠️ If you don't change it, the original is kept.",
                  fg="#666", font=("Segoe UI", 8), justify="left", wraplength=480).place(x=0, y=52)
 
     # --- 이벤트 핸들러 ---
     def _choose_color(self, var: tk.StringVar, preview: ColorPreview) -> None:
-        """RGB 선택기 -> (R,G,B,A) 문자열로 표시값만 갱신"""
-        rgb, _ = colorchooser.askcolor(title="RGB Selector")
-        if not rgb:
+        """색 편집 패널 열기 -> 슬라이더를 움직이는 동안 표시값/미리보기만 갱신"""
+        if not self.editor.is_open:
+            self.geometry("680x460")
+            self.editor.place(x=14, y=218, width=650, height=150)
+        self.editor.open("Skin" if var is self.skin_var else "Hair", var, preview)
+
+    def _close_editor(self) -> None:
+        self.editor.place_forget()
+        self.geometry("680x300")
+
+    def _choose_preset(self, kind: str, var: tk.StringVar, preview: ColorPreview) -> None:
+        """현재 색과 가까운 프리셋 목록 → 더블클릭/OK로 표시값만 갱신"""
+        current = rgba_str_to_rgb255(var.get().strip()) or (128, 128, 128)
+        try:
+            hits = self.palette.nearest(current, k=PRESET_COUNT, kind=kind)
+        except Exception as e:
+            messagebox.showerror("Error", f"Preset library unavailable:\n{e}")
             return
-        rgba_text = rgb255_to_rgba_str((int(rgb[0]), int(rgb[1]), int(rgb[2])))
-        var.set(rgba_text)
-        preview.set_color_text(rgba_text)
+
+        win = tk.Toplevel(self)
+        win.title(f"{kind.title()} presets (closest first)")
+        win.transient(self)
+        lst = tk.Listbox(win, width=40, height=len(hits) or 1, font=("Segoe UI", 9), activestyle="none")
+        lst.pack(padx=8, pady=8, fill="both", expand=True)
+        for i, (p, de) in enumerate(hits):
+            lst.insert("end", f"{p.name}   (ΔE {de:.1f})")
+            # 밝기에 따라 글자색을 바꿔 읽을 수 있게
+            fg = "#000" if 0.299 * p.r + 0.587 * p.g + 0.114 * p.b > 140 else "#fff"
+            lst.itemconfig(i, background=f"#{p.r:02x}{p.g:02x}{p.b:02x}", foreground=fg, selectforeground=fg)
+
+        def apply(_event=None) -> None:
+            sel = lst.curselection()
+            if not sel:
+                return
+            rgba_text = rgb255_to_rgba_str(hits[sel[0]][0].rgb)
+            var.set(rgba_text)
+            preview.set_color_text(rgba_text)
+            if self.editor.var is var:
+                self.editor.reload()
+            win.destroy()
+
+        lst.bind("<Double-Button-1>", apply)
+        tk.Button(win, text="OK", command=apply).pack(side="left", padx=8, pady=(0, 8))
+        tk.Button(win, text="Cancel", command=win.destroy).pack(side="right", padx=8, pady=(0, 8))
 
     def on_toggle_baldy(self) -> None:
         """BALDY MODE 토글: 즉시 저장하지 않고 플래그만 바꿈"""
@@ -193,69 +575,332 @@ class App(tk.Tk):
             self.baldy_btn.config(text="BALDY MODE: OFF (Toggle)", relief="raised")
             self.baldy_status.config(text="BALDY MODE: OFF (Toggle)", fg="#a00")
 
-    def on_refresh(self) -> None:
-        """디스크의 최신 JSON 값을 다시 읽어 표시 (대기 중인 변경은 초기화)"""
-        ensure_json_exists()
-        if not JSON_FILE or not JSON_FILE.exists():
-            messagebox.showerror("Error", f"JSON file not found:\n{JSON_FILE}")
+    def _set_busy(self, text: Optional[str]) -> None:
+        """작업 중이면 버튼 잠금 + 진행 표시, None이면 원상복구"""
+        busy = text is not None
+        state = "disabled" if busy else "normal"
+        for btn in (self.save_btn, self.refresh_btn, self.baldy_btn, self.skin_edit_btn, self.hair_edit_btn):
+            btn.config(state=state)
+        self.cancel_btn.config(state="normal" if busy else "disabled")
+        self.busy_label.config(text=text or "")
+        if busy:
+            self.busy_bar.pack(side="right", padx=4)
+            self.busy_bar.start(15)
+        else:
+            self.busy_bar.stop()
+            self.busy_bar.pack_forget()
+        self._update_history_buttons(busy)
+
+    def _update_history_buttons(self, busy: bool = False) -> None:
+        h = self.history
+        self.undo_btn.config(state="normal" if h is not None and h.can_undo and not busy else "disabled")
+        self.redo_btn.config(state="normal" if h is not None and h.can_redo and not busy else "disabled")
+
+    def _reset_baldy(self) -> None:
+        self.baldy_mode.set(False)
+        self.baldy_btn.config(text="BALDY MODE: OFF (Toggle)", relief="raised")
+        self.baldy_status.config(text="BALDY MODE: OFF (Toggle)", fg="#a00")
+
+    def on_cancel(self) -> None:
+        """실행 중인 uesave를 종료 (sav를 쓰기 전 단계라면 저장도 취소됨)"""
+        self.busy_label.config(text="Cancelling...")
+        self.runner.cancel()
+
+    def on_exit(self) -> None:
+        self.watcher.stop()
+        # 지연 기록 중인 Save는 창을 닫기 전에 기록 (작업 취소보다 먼저: 취소가 이 기록의 uesave까지 막지 않도록)
+        try:
+            flush_pending()
+        except Exception as e:
+            messagebox.showerror("Error", f"Pending save could not be written:\n{e}")
+        self.runner.shutdown()
+        Uesave.get().close()  # batch worker가 떠 있으면 종료
+        if self._palette is not None:
+            self._palette.close()
+        self._remember_state()
+        self.destroy()
+
+    # --- sav 변경 감시 (자동 새로고침) ---
+    def _watch_tick(self) -> None:
+        self.after(WATCH_POLL_MS, self._watch_tick)
+        if WRITE_BEHIND_S > 0:
+            self._check_writes()
+            if write_behind().busy:
+                return  # 지연 기록이 남았거나 쓰는 중 (우리 자신의 저장)
+        # 작업 중에는 보류 (우리 자신의 저장일 수도 있음) → 작업이 끝난 뒤 다음 tick에서 판단
+        if not self.auto_refresh.get() or self.runner.busy:
             return
+        if self.watcher.poll():
+            def done(s: str) -> None:
+                self._record(s, "game")
+                self._merge_values(values_from_str(s))
+
+            if self.runner.submit(
+                self._refresh_job,
+                on_done=done,
+                on_error=lambda e: print("[WARN] auto-refresh failed:", e),
+                on_finally=lambda: self._set_busy(None),
+            ):
+                self._set_busy("Save changed, reloading...")
+
+    def _merge_values(self, values: Dict[str, Dict[str, str]]) -> None:
+        """
+        디스크의 새 값을 반영하되, 사용자가 바꿔 놓고 아직 저장하지 않은 항목은 건드리지 않음.
+        (표시값 == 마지막으로 읽은 값 이면 '편집 안 됨'으로 판단)
+        """
+        for part, var, preview in (("Skin", self.skin_var, self.skin_preview),
+                                   ("Hair", self.hair_var, self.hair_preview)):
+            new = values[part]["color"]
+            if var.get() == self.initial[part]["color"] and new != var.get():
+                var.set(new)
+                preview.set_color_text(new)
+                if self.editor.var is var:
+                    self.editor.reload()
+        self.initial = values
+
+    # --- 작업 스레드에서 실행되는 부분 (위젯 접근 금지) ---
+    @staticmethod
+    def _flush_before_read() -> None:
+        """지연 기록 중인 Save가 있으면 먼저 (안 그러면 옛 값을 읽음). 실패는 _check_writes가 알리고 읽기는 계속."""
+        try:
+            flush_pending()
+        except Procs.Cancelled:
+            raise
+        except Exception:
+            pass
+
+    @staticmethod
+    def _refresh_job() -> str:
+        with Profiler.span("refresh"):
+            App._flush_before_read()
+            ensure_json_exists()
+            src = source_file()
+            if not src or not src.exists():
+                raise FileNotFoundError(f"File not found:\n{src}")
+            return read_current_str()
 
-        self.initial = read_current_values()
+    @staticmethod
+    def _open_document() -> StyleDocument:
+        """
+        평소: sav를 메모리로 읽어 바로 sav에 기록 (중간 .json 없음, uesave는 stdin 파이프)
+        JSON_DEBUG: 예전처럼 .json(indent=2)을 고친 뒤 sav로 변환 (commit 후 apply_json_to_sav 필요)
+        """
+        ensure_json_exists()
+        src = source_file()
+        if not src or not src.exists():
+            raise FileNotFoundError(f"File not found:\n{src}")
+        return StyleDocument(JSON_FILE) if JSON_DEBUG else StyleDocument.from_sav(SAV_FILE)
+
+    @staticmethod
+    def _save_job(skin_rgb: Optional[Tuple[int, int, int]],
+                  hair_rgb: Optional[Tuple[int, int, int]], baldy: bool) -> str:
+        with Profiler.span("save"):
+            return App._save_steps(skin_rgb, hair_rgb, baldy)
+
+    @staticmethod
+    def _restore_job(s: str) -> None:
+        """Undo/Redo: Str 전체를 s로 되돌려 기록"""
+        with Profiler.span("restore"):
+            App._flush_before_read()
+            doc = App._open_document()
+            with doc:
+                doc.replace_str(s)
+                Procs.check_cancelled()
+            # Str 전체를 썼으므로 실패해서 남은 지연 기록은 이제 옛 수정 → 나중에 덮어쓰지 않도록 버림
+            discard_pending(source_file())
+            if JSON_DEBUG:
+                apply_json_to_sav(SAVE_DIR)
+
+    @staticmethod
+    def _save_steps(skin_rgb: Optional[Tuple[int, int, int]],
+                    hair_rgb: Optional[Tuple[int, int, int]], baldy: bool) -> str:
+        # Skin / Hair / BALDY: 한 번 읽고 한 번에 기록
+        doc = App._open_document()
+        with doc:
+            if skin_rgb is not None:
+                doc.set_rgb("Skin", *skin_rgb)
+            if hair_rgb is not None:
+                doc.set_rgb("Hair", *hair_rgb)
+            # ➜ BALDY MODE (저장 시에만 적용)
+            if baldy:
+                doc.set_baldy()
+            # 마지막 기회: 여기서 취소되면 sav는 그대로 (예외 → commit 안 함)
+            Procs.check_cancelled()
+
+        if JSON_DEBUG:
+            apply_json_to_sav(SAVE_DIR)
+        return doc.to_str()
+
+    # --- 이벤트 핸들러 (메인 스레드) ---
+    def _show_values(self, values: Dict[str, Dict[str, str]]) -> None:
+        """디스크 값을 그대로 표시 (대기 중인 변경은 초기화)"""
+        self.initial = values
         self.skin_var.set(self.initial["Skin"]["color"])
         self.hair_var.set(self.initial["Hair"]["color"])
 
         self.skin_preview.set_color_text(self.skin_var.get())
         self.hair_preview.set_color_text(self.hair_var.get())
+        self.editor.reload()
 
         # BALDY 플래그도 초기화
-        self.baldy_mode.set(False)
-        self.baldy_btn.config(text="BALDY MODE: OFF (Toggle)", relief="raised")
-        self.baldy_status.config(text="BALDY MODE: OFF (Toggle)", fg="#a00")
+        self._reset_baldy()
+
+    def on_refresh(self) -> None:
+        """디스크의 최신 값을 다시 읽어 표시 (대기 중인 변경은 초기화)"""
+        def done(s: str) -> None:
+            self._record(s, "refresh")
+            self._show_values(values_from_str(s))
+            self._remember_state()
+
+        if self.runner.submit(
+            self._refresh_job,
+            on_done=done,
+            on_error=lambda e: messagebox.showerror("Error", str(e)),
+            on_cancel=lambda: messagebox.showwarning("Cancelled", "Refresh cancelled."),
+            on_finally=lambda: self._set_busy(None),
+        ):
+            self._set_busy("Reading save...")
 
     def on_save(self) -> None:
         """
         변경 사항 저장(일괄 적용):
         - Skin/Hair: 선택한 색상 적용
         - BALDY MODE가 ON이면 Hair.definitionid를 빈 값으로 설정
-        이후 SAV로 반영.
+        이후 SAV로 반영. (변환/쓰기는 작업 스레드에서)
         """
-        try:
-            ensure_json_exists()
-            if not JSON_FILE or not JSON_FILE.exists():
-                messagebox.showerror("Error", f"JSON file not found:\n{JSON_FILE}")
-                return
+        if not SAVE_DIR:
+            messagebox.showwarning("Select Folder", "Save 폴더를 먼저 선택해 주세요.")
+            return
 
-            # Skin
-            skin_rgb = rgba_str_to_rgb255(self.skin_var.get().strip())
-            if skin_rgb is not None:
-                update_skin_rgb(JSON_FILE, *skin_rgb)
+        # 위젯 값은 메인 스레드에서 미리 읽어 넘긴다 (편집 패널에 남은 갱신부터 반영)
+        # 바꾸지 않은 항목은 보내지 않음 → 그 사이 게임이 바꾼 값을 덮어쓰지 않는다 (StyleDocument 병합)
+        self.editor.flush()
+        skin_rgb = self._edited_rgb("Skin", self.skin_var)
+        hair_rgb = self._edited_rgb("Hair", self.hair_var)
+        if WRITE_BEHIND_S > 0 and self.history is not None:  # 아직 한 번도 못 읽었으면 바로 기록
+            self._save_later(skin_rgb, hair_rgb, self.baldy_mode.get())
+            return
 
-            # Hair
-            hair_rgb = rgba_str_to_rgb255(self.hair_var.get().strip())
-            if hair_rgb is not None:
-                update_hair_rgb(JSON_FILE, *hair_rgb)
+        def done(s: str) -> None:
+            self._record(s, "save")
+            # 실제로 쓴 값이 새 기준값 (자동 새로고침이 이 저장을 게임의 변경으로 보지 않도록)
+            # 저장 완료 후 BALDY 플래그도 꺼짐
+            self._show_values(values_from_str(s))
+            self._remember_state()
+            self.watcher.sync()
+            messagebox.showinfo("Done", "Skin/Hair updated.\nRejoin the server to see changes.")
 
-            # ➜ BALDY MODE (저장 시에만 적용)
-            if self.baldy_mode.get():
-                set_baldy_mode(JSON_FILE)
+        if self.runner.submit(
+            self._save_job, skin_rgb, hair_rgb, self.baldy_mode.get(),
+            on_done=done,
+            on_error=lambda e: messagebox.showerror("Error", f"Save failed:\n{e}"),
+            on_cancel=lambda: messagebox.showwarning("Cancelled", "Save cancelled."),
+            on_finally=lambda: self._set_busy(None),
+        ):
+            self._set_busy("Saving...")
 
-            # SAV 반영
-            if SAVE_DIR:
-                apply_json_to_sav(SAVE_DIR)
-            else:
-                messagebox.showwarning("Select Folder", "Save 폴더를 먼저 선택해 주세요.")
-                return
 
-            # 저장 완료 후 BALDY 플래그 끔
-            self.baldy_mode.set(False)
-            self.baldy_btn.config(text="BALDY MODE: OFF (Toggle)", relief="raised")
-            self.baldy_status.config(text="BALDY MODE: OFF (Toggle)", fg="#a00")
-
-            messagebox.showinfo("Done", "Skin/Hair updated.\nRejoin the server to see changes.")
-        except Exception as e:
+    def _save_later(self, skin_rgb: Optional[Tuple[int, int, int]],
+                    hair_rgb: Optional[Tuple[int, int, int]], baldy: bool) -> None:
+        """
+        지연 기록 모드 (LVCC_WRITE_BEHIND=<초>): 수정은 메모리에만 쌓고 표시/기록(History)은 바로.
+        sav는 그 시간 동안 새 Save가 없을 때 마지막 상태로 한 번만 쓰인다 (SaveApply.WriteBehind).
+        표시할 Str은 파일을 다시 읽지 않고 History의 현재 Str(앞서 쌓인 수정 포함) 위에 이번 수정만 얹어 만든다.
+        """
+        edits = PendingEdits()
+        edits.fields = {(part, "color"): rgba_str_from_255(*rgb)
+                        for part, rgb in (("Skin", skin_rgb), ("Hair", hair_rgb)) if rgb is not None}
+        if baldy:
+            edits.fields[("Hair", "definitionid")] = ""
+        try:
+            s = edits.render(self.history.current())  # 없는 블록 등 → 큐에 넣기 전에 실패
+        except ValueError as e:
             messagebox.showerror("Error", f"Save failed:\n{e}")
+            return
+        fields = edits.fields
+        if fields:
+            write_behind().set_fields(source_file(), fields)
+        self._record(s, "save")
+        self._show_values(values_from_str(s))
+        self._remember_state()
+        if fields:
+            self.busy_label.config(text="Saved (writing shortly)")
+
+    def _check_writes(self) -> None:
+        """
+        지연 기록이 끝났으면 우리 쓰기를 게임의 변경으로 보지 않도록 sync, 실패는 한 번씩 알림.
+        - 다시 시도 중(일시적인 오류): 처음 한 번 "계속 시도 / 버리기"를 묻는다
+        - 버려짐(영구적인 오류, 횟수 초과): 알리고 디스크 내용을 다시 읽는다
+        """
+        done = write_behind().take_done()
+        if not done:
+            return
+        self.watcher.sync()
+        failed = [(e, keep) for _, e, keep in done if e is not None]
+        if not failed:
+            self._write_retrying = False
+            self.busy_label.config(text="Skin/Hair updated. Rejoin the server to see changes.")
+            return
+        err, keep = failed[-1]
+        if keep:
+            self.busy_label.config(text="Save failed, retrying...")
+            if not self._write_retrying:
+                self._write_retrying = True
+                if not messagebox.askyesno("Error", f"Save failed:\n{err}\n\nKeep the change and try again?\n(No = discard it)"):
+                    discard_pending()
+                    self._write_retrying = False
+                    self.on_refresh()
+            return
+        self._write_retrying = False
+        self.busy_label.config(text="")
+        messagebox.showerror("Error", f"Save failed:\n{err}\n\nThe change could not be written and was discarded.")
+        self.on_refresh()
+
+    def _edited_rgb(self, part: str, var: tk.StringVar) -> Optional[Tuple[int, int, int]]:
+        """마지막으로 읽은 값에서 바뀐 항목만 (r,g,b), 아니면 None"""
+        text = var.get()
+        return None if text == self.initial[part]["color"] else rgba_str_to_rgb255(text.strip())
+
+    def _step_history(self, back: bool) -> None:
+        """Undo(back=True) / Redo: 기록된 지점의 Str을 sav에 다시 쓰고 표시 (대기 중인 변경은 초기화)"""
+        if self.runner.busy or self.history is None:
+            return
+        s = self.history.undo() if back else self.history.redo()
+        if s is None:
+            return
+
+        def revert() -> None:
+            # 쓰기 실패/취소 → 기록 위치도 원래대로
+            if back:
+                self.history.redo()
+            else:
+                self.history.undo()
+
+        def failed(e: Exception) -> None:
+            revert()
+            messagebox.showerror("Error", f"{'Undo' if back else 'Redo'} failed:\n{e}")
+
+        def done(_: None) -> None:
+            self.watcher.sync()
+            self._show_values(values_from_str(s))
+
+        if self.runner.submit(
+            self._restore_job, s,
+            on_done=done,
+            on_error=failed,
+            on_cancel=revert,
+            on_finally=lambda: self._set_busy(None),
+        ):
+            self._set_busy("Undoing..." if back else "Redoing...")
+        else:
+            revert()
 
 
 # ---- 엔트리 포인트 ------------------------------------------------------------
 if __name__ == "__main__":
+    # python Main.py --profile [file]  --> 단계별 시간 기록 (Profiler.py 참고)
+    if "--profile" in sys.argv:
+        i = sys.argv.index("--profile")
+        arg = sys.argv[i + 1] if i + 1 < len(sys.argv) and not sys.argv[i + 1].startswith("-") else None
+        print("[profile] writing to", Profiler.enable(arg))
     App().mainloop()
@@ -0,0 +1,299 @@
+# Palette.py
+from __future__ import annotations
+from array import array
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import heapq
+import sqlite3
+import threading
+
+from Update_json import rgba_str_from_255
+from LastState import APP_DIR
+
+'''
+Description:
+Preset library of named skin / hair colours + nearest-colour search
+
+#1) Storage:
+SQLite file (DEFAULT_DB, one row per preset: name, kind, r, g, b and the precomputed CIELAB L, a, b)
+Nothing is read until the first query --> startup pays nothing
+
+#2) Index:
+k-d tree over CIELAB (D65), kept in flat arrays (array('d') / array('i'), no node objects)
+One tree per kind ("skin", "hair", all), built on first use and dropped when presets change
+
+#3) Distance:
+Euclidean distance in Lab = CIE76 delta E (~2.3 is "just noticeable")
+
+Usage:
+    lib = PaletteLibrary()
+    for preset, de in lib.nearest((200, 150, 120), k=5, kind="skin"):
+        print(preset.name, round(de, 1), preset.rgba_str)
+'''
+
+DEFAULT_DB = APP_DIR / "palette.sqlite3"
+KINDS = ("skin", "hair")
+
+BUILTIN_PRESETS: Tuple[Tuple[str, str, Tuple[int, int, int]], ...] = (
+    ("Porcelain", "skin", (255, 224, 210)),
+    ("Ivory", "skin", (250, 220, 190)),
+    ("Beige", "skin", (240, 200, 160)),
+    ("Warm Sand", "skin", (224, 172, 125)),
+    ("Honey", "skin", (198, 134, 66)),
+    ("Caramel", "skin", (168, 110, 70)),
+    ("Chestnut", "skin", (141, 85, 36)),
+    ("Mocha", "skin", (110, 70, 45)),
+    ("Espresso", "skin", (70, 45, 30)),
+    ("Zombie", "skin", (150, 190, 130)),
+    ("Jet Black", "hair", (20, 20, 20)),
+    ("Soft Black", "hair", (45, 40, 38)),
+    ("Dark Brown", "hair", (70, 50, 35)),
+    ("Chestnut Brown", "hair", (110, 70, 40)),
+    ("Auburn", "hair", (145, 60, 35)),
+    ("Copper", "hair", (185, 95, 50)),
+    ("Golden Blonde", "hair", (220, 180, 110)),
+    ("Platinum", "hair", (235, 230, 215)),
+    ("Silver", "hair", (190, 190, 195)),
+    ("Pastel Pink", "hair", (245, 170, 200)),
+    ("Electric Blue", "hair", (40, 110, 230)),
+    ("Mint", "hair", (150, 230, 190)),
+)
+
+
+class Preset(NamedTuple):
+    id: int
+    name: str
+    kind: str
+    r: int
+    g: int
+    b: int
+
+    @property
+    def rgb(self) -> Tuple[int, int, int]:
+        return self.r, self.g, self.b
+
+    @property
+    def rgba_str(self) -> str:
+        """게임 Str에 들어가는 (R=..,G=..,B=..,A=1.000000) 형식"""
+        return rgba_str_from_255(self.r, self.g, self.b)
+
+
+# -------- sRGB (0~255) -> CIELAB (D65) --------
+def _lin(c: int) -> float:
+    c = c / 255
+    return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+
+def _f(t: float) -> float:
+    return t ** (1 / 3) if t > 216 / 24389 else (24389 / 27 * t + 16) / 116
+
+
+def rgb_to_lab(rgb: Sequence[int]) -> Tuple[float, float, float]:
+    r, g, b = (_lin(max(0, min(255, int(c)))) for c in rgb)
+    x = (0.4124564 * r + 0.3575761 * g + 0.1804375 * b) / 0.95047
+    y = 0.2126729 * r + 0.7151522 * g + 0.0721750 * b
+    z = (0.0193339 * r + 0.1191920 * g + 0.9503041 * b) / 1.08883
+    fx, fy, fz = _f(x), _f(y), _f(z)
+    return 116 * fy - 16, 500 * (fx - fy), 200 * (fy - fz)
+
+
+# -------- k-d tree (배열 기반) --------
+class LabKDTree:
+    """
+    점 n개를 '중앙값이 가운데 오도록' 재배열한 암시적 k-d tree.
+    구간 [lo, hi)의 노드는 mid=(lo+hi)//2, 분할 축은 깊이 % 3, 자식은 [lo, mid), [mid+1, hi).
+    """
+
+    def __init__(self, points: Sequence[Tuple[float, float, float]], ids: Sequence[int]):
+        order = list(range(len(points)))
+        self._build(points, order, 0, len(order), 0)
+        self.xyz = array("d")
+        for i in order:
+            self.xyz.extend(points[i])
+        self.ids = array("i", (ids[i] for i in order))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @staticmethod
+    def _build(points, order: List[int], lo: int, hi: int, axis: int) -> None:
+        stack = [(lo, hi, axis)]
+        while stack:
+            lo, hi, axis = stack.pop()
+            if hi - lo <= 1:
+                continue
+            order[lo:hi] = sorted(order[lo:hi], key=lambda i: points[i][axis])
+            mid = (lo + hi) // 2
+            nxt = (axis + 1) % 3
+            stack.append((lo, mid, nxt))
+            stack.append((mid + 1, hi, nxt))
+
+    def nearest(self, q: Sequence[float], k: int = 1) -> List[Tuple[float, int]]:
+        """(거리², id) 가까운 순으로 k개"""
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return []
+        xyz, ids = self.xyz, self.ids
+        q0, q1, q2 = q
+        best: List[Tuple[float, int]] = []  # (-거리², 위치) 최대 힙
+        worst = float("inf")
+        stack = [(0, len(ids), 0, 0.0)]  # lo, hi, axis, 분할면까지 거리²(하한)
+        while stack:
+            lo, hi, axis, bound = stack.pop()
+            if bound >= worst or lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            j = mid * 3
+            d0, d1, d2 = xyz[j] - q0, xyz[j + 1] - q1, xyz[j + 2] - q2
+            dist = d0 * d0 + d1 * d1 + d2 * d2
+            if len(best) < k:
+                heapq.heappush(best, (-dist, mid))
+                if len(best) == k:
+                    worst = -best[0][0]
+            elif dist < worst:
+                heapq.heapreplace(best, (-dist, mid))
+                worst = -best[0][0]
+            diff = (d0, d1, d2)[axis]  # 노드 - 질의
+            nxt = (axis + 1) % 3
+            near, far = ((lo, mid), (mid + 1, hi)) if diff > 0 else ((mid + 1, hi), (lo, mid))
+            # 먼 쪽을 먼저 넣고 가까운 쪽을 나중에 → 가까운 쪽부터 탐색
+            stack.append((far[0], far[1], nxt, diff * diff))
+            stack.append((near[0], near[1], nxt, 0.0))
+        return sorted((-nd, ids[pos]) for nd, pos in best)
+
+
+# -------- 라이브러리 --------
+class PaletteLibrary:
+    """SQLite 프리셋 저장소 + kind별 k-d tree (첫 검색 때 생성)"""
+
+    def __init__(self, db_path: str | Path = DEFAULT_DB, seed: bool = True):
+        self.db_path = Path(db_path)
+        self.seed = seed
+        self._db: Optional[sqlite3.Connection] = None
+        self._trees: dict = {}  # kind(None=전체) -> LabKDTree
+        self._lock = threading.Lock()
+
+    # ---- DB ----
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            if str(self.db_path) != ":memory:":
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS presets ("
+                " id INTEGER PRIMARY KEY, name TEXT NOT NULL, kind TEXT NOT NULL,"
+                " r INTEGER NOT NULL, g INTEGER NOT NULL, b INTEGER NOT NULL,"
+                " lab_l REAL NOT NULL, lab_a REAL NOT NULL, lab_b REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS presets_kind ON presets(kind)")
+            self._db = db
+            if self.seed and db.execute("SELECT COUNT(*) FROM presets").fetchone()[0] == 0:
+                self._insert(BUILTIN_PRESETS)
+        return self._db
+
+    def _insert(self, rows: Iterable[Tuple[str, str, Sequence[int]]]) -> List[int]:
+        db = self._conn()
+        ids = []
+        with db:
+            for name, kind, rgb in rows:
+                r, g, b = (max(0, min(255, int(c))) for c in rgb)
+                cur = db.execute(
+                    "INSERT INTO presets (name, kind, r, g, b, lab_l, lab_a, lab_b) VALUES (?,?,?,?,?,?,?,?)",
+                    (name, kind, r, g, b, *rgb_to_lab((r, g, b))),
+                )
+                ids.append(cur.lastrowid)
+        self._trees.clear()
+        return ids
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ---- 편집 ----
+    def add(self, name: str, kind: str, rgb: Sequence[int]) -> int:
+        with self._lock:
+            return self._insert([(name, kind, rgb)])[0]
+
+    def add_many(self, rows: Iterable[Tuple[str, str, Sequence[int]]]) -> List[int]:
+        """(name, kind, (r,g,b)) 여러 개를 트랜잭션 하나로"""
+        with self._lock:
+            return self._insert(rows)
+
+    def remove(self, preset_id: int) -> bool:
+        with self._lock:
+            db = self._conn()
+            with db:
+                n = db.execute("DELETE FROM presets WHERE id = ?", (preset_id,)).rowcount
+            self._trees.clear()
+            return n > 0
+
+    # ---- 조회 ----
+    def get(self, preset_id: int) -> Optional[Preset]:
+        row = self._conn().execute(
+            "SELECT id, name, kind, r, g, b FROM presets WHERE id = ?", (preset_id,)
+        ).fetchone()
+        return Preset(*row) if row else None
+
+    def presets(self, kind: Optional[str] = None) -> List[Preset]:
+        sql = "SELECT id, name, kind, r, g, b FROM presets"
+        rows = self._conn().execute(sql + " WHERE kind = ? ORDER BY id" if kind else sql + " ORDER BY id",
+                                    (kind,) if kind else ()).fetchall()
+        return [Preset(*row) for row in rows]
+
+    def _tree(self, kind: Optional[str]) -> LabKDTree:
+        tree = self._trees.get(kind)
+        if tree is None:
+            sql = "SELECT id, lab_l, lab_a, lab_b FROM presets"
+            rows = self._conn().execute(sql + " WHERE kind = ?" if kind else sql,
+                                        (kind,) if kind else ()).fetchall()
+            tree = self._trees[kind] = LabKDTree([row[1:] for row in rows], [row[0] for row in rows])
+        return tree
+
+    def nearest(self, rgb: Sequence[int], k: int = 5, kind: Optional[str] = None) -> List[Tuple[Preset, float]]:
+        """rgb(0~255)와 가장 가까운 프리셋 k개: [(Preset, delta E)], 가까운 순"""
+        with self._lock:
+            hits = self._tree(kind).nearest(rgb_to_lab(rgb), k)
+        if not hits:
+            return []
+        by_id = {p.id: p for p in self._fetch([pid for _, pid in hits])}
+        return [(by_id[pid], d2 ** 0.5) for d2, pid in hits]
+
+    def _fetch(self, ids: List[int]) -> List[Preset]:
+        marks = ",".join("?" * len(ids))
+        rows = self._conn().execute(f"SELECT id, name, kind, r, g, b FROM presets WHERE id IN ({marks})", ids)
+        return [Preset(*row) for row in rows]
+
+
+# -------------------------
+# Testing: brute force check + timing with 50k presets
+# -------------------------
+if __name__ == "__main__":
+    import random
+    import time
+
+    rnd = random.Random(7)
+    lib = PaletteLibrary(":memory:")
+    lib.add_many((f"p{i}", rnd.choice(KINDS), (rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)))
+                 for i in range(50_000))
+    print("presets:", len(lib.presets()))
+
+    t0 = time.perf_counter()
+    lib.nearest((0, 0, 0), kind="skin")
+    print(f"index build (skin): {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    everything = [(p, rgb_to_lab(p.rgb)) for p in lib.presets("skin")]
+    for _ in range(200):
+        q = (rnd.randrange(256), rnd.randrange(256), rnd.randrange(256))
+        ql = rgb_to_lab(q)
+        brute = sorted(sum((a - b) ** 2 for a, b in zip(lab, ql)) for _, lab in everything)[:5]
+        got = [de * de for _, de in lib.nearest(q, k=5, kind="skin")]
+        assert all(abs(a - b) < 1e-6 for a, b in zip(brute, got)), (q, brute, got)
+
+    n = 2000
+    qs = [(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)) for _ in range(n)]
+    t0 = time.perf_counter()
+    for q in qs:
+        lib.nearest(q, k=5, kind="skin")
+    print(f"nearest k=5: {(time.perf_counter() - t0) / n * 1000:.3f} ms / query")
+    print("e.g.", [(p.name, round(de, 2), p.rgba_str) for p, de in lib.nearest((200, 150, 120), k=2)])
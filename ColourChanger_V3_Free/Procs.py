@@ -0,0 +1,196 @@
+# Procs.py
+from __future__ import annotations
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import subprocess
+import threading
+import math
+import os
+import sys
+
+import Profiler
+
+'''
+Description:
+Every uesave launch goes through here, so that
+
+#1) each call has a timeout (TIMEOUT seconds, env LVCC_UESAVE_TIMEOUT, 0 = no limit)
+--> a hung uesave is killed instead of hanging the program
+
+#2) each job has its own CancelToken (the GUI "Cancel" button cancels only the running job)
+--> token.cancel() kills the processes THAT job started and the waiting call raises Cancelled;
+    other threads (write-behind, Headless sessions) are not affected
+--> popen(token=...) or, for code that doesn't pass it along, the token of `with job(token):` on this thread
+'''
+
+def env_seconds(name: str, default: float) -> float:
+    """환경 변수의 초 값 (비었으면 default, 숫자가 아니거나 음수면 경고하고 default → 시작을 막지 않음)"""
+    raw = os.environ.get(name, "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError:
+        value = -1.0
+    if not math.isfinite(value) or value < 0:
+        print(f"[env] {name}={raw!r} ignored (expected seconds, e.g. 2 or 0.5), using {default:g}", file=sys.stderr)
+        return default
+    return value
+
+
+TIMEOUT: Optional[float] = env_seconds("LVCC_UESAVE_TIMEOUT", 120) or None
+
+
+class Cancelled(Exception):
+    """CancelToken.cancel() 로 작업이 취소됨"""
+
+
+class ProcTimeout(RuntimeError):
+    """제한 시간 안에 끝나지 않아 종료시킴"""
+
+
+class CancelToken:
+    """작업 하나의 취소 상태와 그 작업이 띄운 프로세스들"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._live: Dict[subprocess.Popen, List[str]] = {}  # 프로세스 → ["", "timeout", "cancel"] 중 종료 사유
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """이 작업의 uesave를 모두 종료하고, 이후 check()가 Cancelled를 던지게 함"""
+        with self._lock:
+            self._event.set()
+            for proc, reason in self._live.items():
+                reason[0] = reason[0] or "cancel"
+                _kill(proc)
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise Cancelled("cancelled")
+
+    def _add(self, proc: subprocess.Popen, reason: List[str]) -> None:
+        with self._lock:
+            self._live[proc] = reason
+            if self._event.is_set():  # 실행 직전에 취소됨
+                reason[0] = reason[0] or "cancel"
+                _kill(proc)
+
+    def _remove(self, proc: subprocess.Popen) -> None:
+        with self._lock:
+            self._live.pop(proc, None)
+
+
+_local = threading.local()
+
+
+def current() -> Optional[CancelToken]:
+    """이 스레드에서 실행 중인 작업의 토큰 (없으면 None → 취소되지 않음)"""
+    return getattr(_local, "token", None)
+
+
+@contextmanager
+def job(token: Optional[CancelToken]) -> Iterator[Optional[CancelToken]]:
+    """with 블록 안에서 이 스레드의 popen/check_cancelled가 token을 씀 (작업 스레드, 변환 풀 스레드)"""
+    prev = current()
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = prev
+
+
+def check_cancelled(token: Optional[CancelToken] = None) -> None:
+    """작업 단계 사이에서 호출 --> 취소됐으면 Cancelled"""
+    token = token or current()
+    if token is not None:
+        token.check()
+
+
+def _kill(proc: subprocess.Popen) -> None:
+    try:
+        proc.kill()
+    except OSError:
+        pass
+
+
+def _expire(proc: subprocess.Popen, reason: List[str]) -> None:
+    reason[0] = reason[0] or "timeout"
+    _kill(proc)
+
+
+@contextmanager
+def popen(cmd: List[str], timeout: Optional[float] = None, token: Optional[CancelToken] = None,
+          **kwargs) -> Iterator[subprocess.Popen]:
+    '''
+    #1) subprocess.Popen() registered in the job's token (`token`, default: current()) --> its cancel() can reach it
+    #2) threading.Timer kills it after `timeout` (default: TIMEOUT) --> works even while we block on a pipe
+    #3) on exit: killed by timer --> ProcTimeout, killed by cancel --> Cancelled
+    '''
+    token = token or current()
+    check_cancelled(token)
+    limit = TIMEOUT if timeout is None else timeout
+    proc = subprocess.Popen(cmd, **kwargs)
+    Profiler.count_subprocess()
+    reason = [""]
+    timer = threading.Timer(limit, _expire, (proc, reason)) if limit else None
+    if token is not None:
+        token._add(proc, reason)
+    if timer:
+        timer.daemon = True
+        timer.start()
+    try:
+        yield proc
+    finally:
+        if timer:
+            timer.cancel()
+        if token is not None:
+            token._remove(proc)
+        if proc.poll() is None:
+            _kill(proc)
+        proc.wait()
+        if reason[0] == "timeout":
+            raise ProcTimeout(f"{Path(cmd[0]).name} timed out after {limit:g}s: {' '.join(cmd[1:])}")
+        if reason[0] == "cancel":
+            raise Cancelled(" ".join(cmd))
+
+
+@contextmanager
+def attach(proc: subprocess.Popen, token: Optional[CancelToken] = None) -> Iterator[List[str]]:
+    '''
+    An already running process (uesave batch worker) belongs to the job only while it works for it:
+    registered in `token` (default: current()) for the with block --> cancel() kills it.
+    Yields the reason list (["cancel"] after a cancel) so the caller can raise Cancelled.
+    '''
+    token = token or current()
+    check_cancelled(token)
+    reason = [""]
+    if token is not None:
+        token._add(proc, reason)
+    try:
+        yield reason
+    finally:
+        if token is not None:
+            token._remove(proc)
+
+
+def check_output(cmd: List[str], timeout: Optional[float] = None) -> bytes:
+    """subprocess.check_output() + timeout/cancel"""
+    with popen(cmd, timeout, stdout=subprocess.PIPE) as proc:
+        out, _ = proc.communicate()
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, out)
+    return out
+
+
+def check_call(cmd: List[str], timeout: Optional[float] = None) -> None:
+    """subprocess.check_call() + timeout/cancel"""
+    with popen(cmd, timeout) as proc:
+        proc.wait()
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
@@ -0,0 +1,146 @@
+# Profiler.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+
+'''
+Description:
+Lightweight per-stage timing for the conversion pipeline (to-json, json load/dump, parse, from-json ...)
+
+#1) Turning it on:
+env LVCC_PROFILE=1            --> records go to ./lvcc_profile.jsonl
+env LVCC_PROFILE=<file path>  --> records go to that file
+python Main.py --profile [file]
+
+#2) Usage in code:
+    with span("uesave_to_json", sav=str(sav)) as sp:
+        out = ...
+        sp.set(bytes_out=len(out))
+
+#3) Record (one JSON object per line):
+{"id": 7, "parent": 3, "stage": "uesave_to_json", "start": <unix time>, "ms": 41.2,
+ "bytes_in": ..., "bytes_out": ..., "subprocs": 1, "thread": "lvcc-job_0", "error": null, ...}
+"subprocs" counts uesave launches inside the span (nested spans included).
+
+#4) Disabled (default):
+span() returns one shared no-op object --> a global check and a method call, nothing else
+'''
+
+ENABLED = False
+_path: Optional[Path] = None
+_lock = threading.Lock()
+_ids = itertools.count(1)
+_local = threading.local()
+
+
+def enable(path: Optional[str | Path] = None) -> Path:
+    """기록 시작. path가 없으면 ./lvcc_profile.jsonl"""
+    global ENABLED, _path
+    _path = Path(path) if path else Path.cwd() / "lvcc_profile.jsonl"
+    ENABLED = True
+    return _path
+
+
+def disable() -> None:
+    global ENABLED
+    ENABLED = False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def set(self, **attrs: Any) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+def _stack() -> List["_Span"]:
+    st = getattr(_local, "stack", None)
+    if st is None:
+        st = _local.stack = []
+    return st
+
+
+class _Span:
+    __slots__ = ("rec", "_t0")
+
+    def __init__(self, stage: str, attrs: Dict[str, Any]):
+        self.rec: Dict[str, Any] = {"id": next(_ids), "parent": None, "stage": stage,
+                                    "bytes_in": None, "bytes_out": None, "subprocs": 0, **attrs}
+        self._t0 = 0.0
+
+    def set(self, **attrs: Any) -> None:
+        self.rec.update(attrs)
+
+    def __enter__(self) -> "_Span":
+        st = _stack()
+        if st:
+            self.rec["parent"] = st[-1].rec["id"]
+        st.append(self)
+        self.rec["start"] = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.rec["ms"] = round((time.perf_counter() - self._t0) * 1000, 3)
+        self.rec["thread"] = threading.current_thread().name
+        self.rec["error"] = f"{exc_type.__name__}: {exc}" if exc_type else None
+        st = _stack()
+        if st and st[-1] is self:
+            st.pop()
+        _write(self.rec)
+
+
+def span(stage: str, **attrs: Any):
+    """stage 하나의 시간 측정 (꺼져 있으면 아무 일도 안 하는 공용 객체)"""
+    if not ENABLED:
+        return _NOOP
+    return _Span(stage, attrs)
+
+
+def record(stage: str, ms: float, **attrs: Any) -> None:
+    """with 블록으로 감쌀 수 없는 구간 (예: 프로세스 시작 → 첫 화면)을 직접 기록"""
+    if not ENABLED:
+        return
+    _write({"id": next(_ids), "parent": None, "stage": stage, "bytes_in": None, "bytes_out": None,
+            "subprocs": 0, "start": time.time() - ms / 1000, "ms": round(ms, 3),
+            "thread": threading.current_thread().name, "error": None, **attrs})
+
+
+def count_subprocess() -> None:
+    """uesave 실행 1회 → 현재 스레드에서 열려 있는 모든 span에 +1"""
+    if not ENABLED:
+        return
+    for sp in _stack():
+        sp.rec["subprocs"] += 1
+
+
+def _write(rec: Dict[str, Any]) -> None:
+    if _path is None:
+        return
+    line = json.dumps(rec, ensure_ascii=False, default=str)
+    with _lock:
+        try:
+            with _path.open("a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print("[profile] write failed:", e, file=sys.stderr)
+
+
+_env = os.environ.get("LVCC_PROFILE", "")
+if _env and _env != "0":
+    enable(None if _env == "1" else _env)
@@ -1,61 +1,188 @@
 # SaveApply.py
 from __future__ import annotations
 from pathlib import Path
-from datetime import datetime
-import subprocess
+from typing import Dict, List, Optional, Tuple
+import json
+import mmap
 import sys
-import os
-BACKUP_ON_SAVE = False  # ← 백업 비활성화
-# Create_json.py 에서 uesave 경로를 그대로 가져와 재사용
-try:
-    from Create_json import UESAVE  # BASE / ("uesave.exe" or "uesave")
-except Exception:
-    # 백업: 같은 폴더/현재 작업 디렉토리에서 uesave를 찾아본다
-    HERE = Path(__file__).resolve().parent
-    UESAVE = (
-        HERE / "uesave.exe" if os.name == "nt" else HERE / "uesave"
-    )
-    if not UESAVE.exists():
-        UESAVE = Path("uesave.exe" if os.name == "nt" else "uesave")  # PATH 의존
-
-
-def _backup(file: Path) -> Path | None:
-    """기존 sav가 있으면 안전하게 백업 파일로 이름 변경"""
-    if not BACKUP_ON_SAVE:
+import threading
+import time
+from GvasCodec import write_sav, GvasUnsupported, find_str_property, encode_fstring, patch_str
+from ConvCache import ConversionCache
+from BackupStore import BackupStore
+import Procs
+import Uesave
+from Profiler import span
+from Create_json import USE_NATIVE_GVAS
+BACKUP_ON_SAVE = True  # 내용 해시 기준 중복 없는 백업 (<SaveGames>/.lvcc_backups, BackupStore.py)
+USE_STR_PATCH = True   # Str만 바뀐 저장은 sav의 문자열 바이트만 교체 (patch_str_in_sav)
+# >0: Save를 바로 쓰지 않고 모아 두었다가, 이 시간(초) 동안 새 Save가 없으면 마지막 상태만 기록 (WriteBehind)
+WRITE_BEHIND_S = Procs.env_seconds("LVCC_WRITE_BEHIND", 0)
+WRITE_RETRIES = 3     # 일시적인 오류(파일 잠김 등)로 실패한 지연 기록을 다시 시도하는 횟수 (그 뒤에는 버림)
+WRITE_RETRY_S = 2.0   # 다시 시도하기 전 대기 (실패할 때마다 늘어남)
+# uesave 실행(경로, 인자 스타일, 시간 초과, 오류 메시지)은 모두 Uesave.py
+
+
+def _backup(file: Path, link: bool = False) -> Path | None:
+    """
+    덮어쓰기 직전의 sav를 BackupStore에 보관 → 보관된 파일 경로 (없거나 실패하면 None).
+    기본은 clone 또는 복사: 게임이 sav를 제자리에 덮어쓰면 하드링크 백업도 같이 바뀌므로
+    link=True 는 명시적으로 요청할 때만.
+    백업 실패는 저장을 막지 않는다.
+    """
+    if not BACKUP_ON_SAVE or not file.exists():
         return None
-    if not file.exists():
+    try:
+        with span("backup", bytes_in=file.stat().st_size):
+            store = BackupStore(file.parent)
+            digest = store.snapshot(file, sha256=ConversionCache(file.parent).known_hash(file), link=link)
+        return store.object_path(digest) if digest else None
+    except OSError as e:
+        print("[backup] failed:", e, file=sys.stderr)
         return None
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    bak = file.with_suffix(file.suffix + f".bak.{ts}")
-    file.rename(bak)
-    print(f"[backup] {file.name} -> {bak.name}")
-    return bak
+
+
+def _tmp_target(out_sav: Path) -> Path:
+    """uesave 출력용 임시 경로 (끝나면 _replace_target으로 교체)"""
+    tmp = out_sav.with_name(out_sav.name + ".tmp")
+    tmp.unlink(missing_ok=True)
+    return tmp
+
+
+def _replace_target(tmp: Path, out_sav: Path) -> None:
+    if not tmp.exists():
+        raise RuntimeError("SAV write failed (file not created).")
+    tmp.replace(out_sav)
 
 
 def _from_json_to_sav(json_path: Path, out_sav: Path) -> None:
     """
-    uesave를 사용해 JSON -> SAV 변환.
-    uesave 빌드마다 인자 스타일이 달 수 있어 두 가지 시도.
+    uesave를 사용해 JSON -> SAV 변환 (tmp에 쓰고 교체 → 실패해도 기존 sav는 그대로).
+    인자 스타일은 Uesave가 바이너리마다 한 번 확인해 두므로 실패한 실행을 반복하지 않음.
+    (시간 초과/취소는 Procs.ProcTimeout/Cancelled, uesave 오류는 Uesave.UesaveError)
     """
-    cmds = [
-        [str(UESAVE), "from-json", "--input", str(json_path), "--output", str(out_sav)],
-        [str(UESAVE), "from-json", str(json_path), str(out_sav)],
-    ]
-    last_err = None
-    for cmd in cmds:
+    tmp = _tmp_target(out_sav)
+    try:
+        with span("uesave_from_json", bytes_in=json_path.stat().st_size):
+            Uesave.get().from_json(json_path, tmp)
+        _replace_target(tmp, out_sav)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _json_to_sav(json_path: Path, out_sav: Path) -> None:
+    """
+    JSON -> SAV. GvasCodec(프로세스 실행 없음)로 먼저 쓰고,
+    모르는 property 타입/문서 모양이면 uesave로 대체.
+    """
+    if USE_NATIVE_GVAS:
         try:
-            print("[exec]", " ".join(cmd))
-            subprocess.check_call(cmd)
+            with span("gvas_write", bytes_in=json_path.stat().st_size) as sp:
+                with json_path.open("r", encoding="utf-8") as f:
+                    doc = json.load(f)
+                write_sav(doc, out_sav)
+                sp.set(bytes_out=out_sav.stat().st_size)
+            print("[gvas] wrote:", out_sav, file=sys.stderr)
             return
-        except subprocess.CalledProcessError as e:
-            last_err = e
-    raise RuntimeError(f"from-json failed with uesave: {last_err}")
+        except GvasUnsupported as e:
+            print("[gvas] fallback to uesave:", e, file=sys.stderr)
+    _from_json_to_sav(json_path, out_sav)
+
+
+def _stream_doc_to_sav(doc: dict, out_sav: Path) -> None:
+    """
+    메모리의 문서를 uesave from-json 의 stdin 으로 바로 흘려보냄 (json 파일 없음).
+    stdin("-")을 지원하지 않는 uesave 빌드면 임시 파일로 (Uesave가 기억해 두고 다음부터는 바로 파일로).
+    """
+    tmp = _tmp_target(out_sav)
+    try:
+        with span("uesave_from_json_stream"):
+            Uesave.get().from_json_doc(doc, tmp)
+        _replace_target(tmp, out_sav)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def apply_document_to_sav(doc: dict, sav_path: str | Path) -> Path:
+    """
+    스트리밍 모드: 메모리의 문서(dict)를 바로 sav로 기록. 중간 json 파일을 남기지 않음.
+    - GvasCodec 우선, 모르는 모양이면 uesave stdin 파이프
+    - 반환: 새로 쓴 sav 경로
+    """
+    sav_path = Path(sav_path)
+    _backup(sav_path)
+    if USE_NATIVE_GVAS:
+        try:
+            with span("gvas_write") as sp:
+                write_sav(doc, sav_path)
+                sp.set(bytes_out=sav_path.stat().st_size)
+            print(f"[ok] wrote: {sav_path}", file=sys.stderr)
+            return sav_path
+        except GvasUnsupported as e:
+            print("[gvas] fallback to uesave:", e, file=sys.stderr)
+    _stream_doc_to_sav(doc, sav_path)
+    if not sav_path.exists():
+        raise RuntimeError("SAV write failed (file not created).")
+    print(f"[ok] wrote: {sav_path}", file=sys.stderr)
+    return sav_path
+
+
+def patch_str_in_sav(sav_path: str | Path, value: str, prop: str = "AllStyleValues_0") -> str:
+    """
+    sav를 mmap으로 열어 StrProperty `prop`의 값만 교체 (to-json/from-json 없음).
+    - 인코딩된 길이가 같으면: 그 바이트만 제자리에 덮어씀 ("in-place", 백업은 링크 없이)
+    - 다르면: size/길이 접두사 + 문자열 + 뒤쪽 바이트를 한 번 밀어 tmp에 쓰고 replace ("shift")
+    - 내용이 같으면 아무것도 안 씀 ("unchanged")
+    모르는 구조(앞쪽에 지원하지 않는 property 등)면 GvasUnsupported → 호출한 쪽이 전체 쓰기로.
+    """
+    sav_path = Path(sav_path)
+    body = encode_fstring(value)
+    with sav_path.open("r+b") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0)
+        except ValueError as e:  # 빈 파일
+            raise GvasUnsupported(f"{sav_path.name}: {e}") from e
+        with mm:
+            slot = find_str_property(mm, prop)
+            if len(body) == slot.end - slot.start:
+                if mm[slot.start:slot.end] == body:
+                    return "unchanged"
+                _backup(sav_path)
+                mm[slot.start:slot.end] = body
+                mm.flush()
+                return "in-place"
+            data = patch_str(mm, slot, value)
+    # mmap을 닫은 뒤 교체 (Windows는 매핑된 파일을 replace 할 수 없음)
+    _backup(sav_path)
+    tmp = _tmp_target(sav_path)
+    tmp.write_bytes(data)
+    _replace_target(tmp, sav_path)
+    return "shift"
+
+
+def apply_str_to_sav(doc: dict, sav_path: str | Path, prop: str = "AllStyleValues_0") -> Path:
+    """
+    문서에서 Str(prop) 하나만 바뀐 경우의 저장 (StyleDocument.commit):
+    sav의 해당 문자열만 교체하고, 안 되면 apply_document_to_sav (GvasCodec 전체 쓰기 → uesave)
+    """
+    sav_path = Path(sav_path)
+    if USE_STR_PATCH and USE_NATIVE_GVAS and sav_path.exists():
+        value = doc["root"]["properties"][prop]["Str"]
+        try:
+            with span("str_patch", bytes_in=len(value)) as sp:
+                how = patch_str_in_sav(sav_path, value, prop)
+                sp.set(method=how)
+            print(f"[ok] wrote: {sav_path} ({how})", file=sys.stderr)
+            return sav_path
+        except GvasUnsupported as e:
+            print("[patch] fallback to full write:", e, file=sys.stderr)
+    return apply_document_to_sav(doc, sav_path)
 
 
 def apply_json_to_sav(save_dir: str | Path, basename: str = "characterStyle-1.0") -> Path:
     """
     SaveGames 디렉터리에서 <basename>.json 을 읽어 같은 이름의 <basename>.sav 로 덮어쓰기.
-    - 기존 sav는 자동 백업 (*.sav.bak.YYYYMMDD_HHMMSS)
+    - 기존 sav는 자동 백업 (BackupStore, 같은 내용은 한 번만)
     - 반환: 새로 쓴 sav 경로
     """
     save_dir = Path(save_dir)
@@ -65,14 +192,18 @@ def apply_json_to_sav(save_dir: str | Path, basename: str = "characterStyle-1.0"
     if not json_path.exists():
         raise FileNotFoundError(f"JSON not found: {json_path}")
 
-    
+    # 덮어쓰기 전 백업 (같은 내용이면 새로 저장하지 않음)
+    _backup(sav_path)
 
     # 변환 실행
-    _from_json_to_sav(json_path, sav_path)
+    with span("apply_json_to_sav", sav=str(sav_path)):
+        _json_to_sav(json_path, sav_path)
     if not sav_path.exists():
         raise RuntimeError("SAV write failed (file not created).")
 
-    print(f"[ok] wrote: {sav_path}")
+    # 방금 쓴 sav는 json과 같은 내용 → 다음 create_json은 변환 생략
+    ConversionCache(sav_path.parent).record(sav_path, json_path)
+    print(f"[ok] wrote: {sav_path}", file=sys.stderr)
     return sav_path
 
 
@@ -88,17 +219,256 @@ def apply_json_file(json_path: str | Path) -> Path:
     sav_path = json_path.with_suffix(".sav")
 
     _backup(sav_path)
-    _from_json_to_sav(json_path, sav_path)
+    _json_to_sav(json_path, sav_path)
     if not sav_path.exists():
         raise RuntimeError("SAV write failed (file not created).")
 
-    print(f"[ok] wrote: {sav_path}")
+    # 방금 쓴 sav는 json과 같은 내용 → 다음 create_json은 변환 생략
+    ConversionCache(sav_path.parent).record(sav_path, json_path)
+    print(f"[ok] wrote: {sav_path}", file=sys.stderr)
     return sav_path
 
 
+# -------- 지연 기록: 연달아 누른 Save는 한 번만 쓴다 --------
+class PendingEdits:
+    """
+    파일 하나에 쌓인 기록 대기 상태. 나중 값이 같은 필드의 이전 값을 덮어쓰므로
+    중간 상태는 변환/기록되지 않고 버려진다. replace_str(되돌리기)은 그 전의 필드 수정을 지운다.
+    """
+    __slots__ = ("replace", "fields", "saves", "failures")
+
+    def __init__(self):
+        self.replace: Optional[str] = None
+        self.fields: Dict[Tuple[str, str], str] = {}
+        self.saves = 0  # 합쳐진 Save 횟수 (로그용)
+        self.failures = 0  # 일시적인 오류로 실패한 횟수
+
+    def set_field(self, typ: str, field: str, value: str) -> None:
+        self.fields[(typ, field)] = value
+
+    def replace_str(self, s: str) -> None:
+        self.replace = s
+        self.fields.clear()
+
+    def keep_under(self, newer: "PendingEdits") -> None:
+        """
+        기록에 실패한 self를 그 사이 새로 쌓인 newer 밑으로 되돌림 (같은 필드는 newer가 이김).
+        newer가 replace_str이면 그 전의 수정은 원래도 버려지는 것이라 그대로 둔다.
+        """
+        if newer.replace is None:
+            newer.replace = self.replace
+            newer.fields = {**self.fields, **newer.fields}
+        newer.saves += self.saves
+        newer.failures = max(newer.failures, self.failures)
+
+    def render(self, s: str) -> str:
+        """
+        s 위에 이 수정을 얹은 Str (파일을 읽지 않음 → GUI 스레드에서 미리보기/검사용).
+        없는 블록을 고치면 StyleDocument.set_field와 같은 ValueError.
+        """
+        from Update_json import build_str, parse_blocks, style_model
+        order, blocks, tail = parse_blocks(self.replace) if self.replace is not None else style_model(s).blocks()
+        for (typ, field), value in self.fields.items():
+            if typ not in blocks:
+                raise ValueError(f"{typ} 블록이 없습니다.")
+            blocks[typ].set(field, value)
+        return build_str(order, blocks, tail)
+
+    def apply_to(self, doc) -> None:
+        """StyleDocument에 대기 중인 수정을 쌓는다 (기록은 doc.commit)"""
+        if self.replace is not None:
+            doc.replace_str(self.replace)
+        for (typ, field), value in self.fields.items():
+            doc.set_field(typ, field, value)
+
+
+def _retryable(e: BaseException) -> bool:
+    """
+    다시 쓰면 될 수도 있는 오류: 파일 잠김/디스크 (OSError), 취소, 시간 초과.
+    나머지(없어진 블록의 ValueError, GvasUnsupported, uesave 오류 ...)는 몇 번을 다시 해도 같다.
+    """
+    return isinstance(e, (OSError, Procs.Cancelled, Procs.ProcTimeout))
+
+
+def _open_style_document(path: Path):
+    # Update_json이 이 모듈을 import 하므로 여기서 (순환 import 방지)
+    from Update_json import StyleDocument
+    return StyleDocument(path) if path.suffix.lower() == ".json" else StyleDocument.from_sav(path)
+
+
+class WriteBehind:
+    """
+    Save → 메모리의 PendingEdits에만 반영 → `quiet`초 동안 조용하면 백그라운드 스레드가 한 번 기록.
+    기록 때 파일을 새로 열어 대기 중인 수정만 얹으므로 (StyleDocument.commit) 그 사이 게임이 쓴 내용과도 병합된다.
+    .json (JSON_DEBUG)이면 json에 쓴 뒤 apply_json_to_sav까지 한다.
+
+    flush(): 대기 중인 것을 지금 (부른 스레드에서) 기록 → 종료, 새로고침, 되돌리기 전에
+    take_done(): 끝난 기록들 [(path, 오류 또는 None, 다시 시도할지)] → GUI의 after() 루프에서 확인
+    discard(): 대기 중인 수정을 버림 (GUI에서 실패한 수정을 포기할 때)
+
+    실패: 일시적인 오류(_retryable)만 대기 상태로 되돌려 WRITE_RETRY_S 뒤에 다시 (최대 WRITE_RETRIES번),
+    영구적인 오류와 횟수를 넘긴 것은 버리고 take_done()으로 한 번 알린다 → busy가 계속 True로 남지 않음
+    """
+
+    def __init__(self, quiet: float = WRITE_BEHIND_S):
+        self.quiet = quiet
+        self._pending: Dict[Path, PendingEdits] = {}
+        self._due: Optional[float] = None  # 다음 기록 시각 (None: 대기 중인 것 없음)
+        self._done: List[Tuple[Path, Optional[BaseException], bool]] = []
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()  # 백그라운드 기록과 flush()가 동시에 쓰지 않도록
+        self._writing = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="write-behind", daemon=True)
+        self._thread.start()
+
+    # ---- 쌓기 ----
+    def _edit(self, path: Path) -> PendingEdits:
+        """호출하는 쪽이 _cond를 잡고 있어야 함. 조용한 시간을 다시 센다."""
+        edits = self._pending.setdefault(Path(path), PendingEdits())
+        self._due = time.monotonic() + self.quiet
+        self._cond.notify()
+        return edits
+
+    def set_fields(self, path: str | Path, fields: Dict[Tuple[str, str], str]) -> None:
+        """Save 한 번 = 필드 여러 개 ({(type, field): value})"""
+        with self._cond:
+            edits = self._edit(Path(path))
+            edits.fields.update(fields)
+            edits.saves += 1
+
+    def replace_str(self, path: str | Path, s: str) -> None:
+        with self._cond:
+            edits = self._edit(Path(path))
+            edits.replace_str(s)
+            edits.saves += 1
+
+    def discard(self, path: str | Path | None = None) -> int:
+        """대기 중인 수정을 버림 (path=None: 전부) → 버린 Save 수. 이미 쓰는 중인 것은 끝까지 쓰인다."""
+        with self._cond:
+            if path is None:
+                dropped, self._pending = list(self._pending.values()), {}
+            else:
+                edits = self._pending.pop(Path(path), None)
+                dropped = [edits] if edits is not None else []
+            if not self._pending:
+                self._due = None
+        return sum(e.saves for e in dropped)
+
+    @property
+    def busy(self) -> bool:
+        """기록 대기 중이거나 쓰는 중"""
+        with self._cond:
+            return bool(self._pending) or self._writing
+
+    # ---- 기록 ----
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                wait = self._due - time.monotonic() if self._due is not None else 0
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+            try:
+                self.flush()
+            except Exception:
+                pass  # 오류는 take_done()으로 전달됨
+
+    def flush(self) -> None:
+        """
+        대기 중인 것을 모두 지금 기록하고 끝날 때까지 기다림 (첫 오류는 다시 raise).
+        일시적인 오류로 실패한 파일의 수정은 대기 상태로 되돌려 잠시 뒤 다시 (WRITE_RETRIES번까지),
+        그 밖의 실패는 버린다. 어느 쪽이든 take_done()에 한 번 남는다.
+        """
+        first: Optional[BaseException] = None
+        with self._write_lock:
+            with self._cond:
+                items, self._pending = self._pending, {}
+                self._due = None
+                self._writing = bool(items)
+            try:
+                for path, edits in items.items():
+                    err = None
+                    try:
+                        with span("write_behind", path=str(path), saves=edits.saves):
+                            self._commit(path, edits)
+                    except Exception as e:
+                        err = e
+                        first = first or e
+                    if err is not None and not isinstance(err, Procs.Cancelled):
+                        edits.failures += 1
+                    keep = err is not None and _retryable(err) and edits.failures < WRITE_RETRIES
+                    with self._cond:
+                        if keep:
+                            newer = self._pending.get(path)
+                            if newer is None:
+                                self._pending[path] = edits
+                            else:
+                                edits.keep_under(newer)
+                            retry = time.monotonic() + max(self.quiet, WRITE_RETRY_S) * max(1, edits.failures)
+                            self._due = retry if self._due is None else min(self._due, retry)
+                            self._cond.notify()
+                        self._done.append((path, err, keep))
+            finally:
+                with self._cond:
+                    self._writing = False
+        if first is not None:
+            raise first
+
+    @staticmethod
+    def _commit(path: Path, edits: PendingEdits) -> None:
+        doc = _open_style_document(path)
+        with doc:
+            edits.apply_to(doc)
+        if path.suffix.lower() == ".json":
+            apply_json_to_sav(path.parent, path.stem)
+
+    def take_done(self) -> List[Tuple[Path, Optional[BaseException], bool]]:
+        with self._cond:
+            done, self._done = self._done, []
+        return done
+
+    def close(self) -> None:
+        """남은 것을 기록하고 스레드 종료"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self.flush()
+
+
+_WRITER: Optional[WriteBehind] = None
+_WRITER_LOCK = threading.Lock()
+
+
+def write_behind() -> WriteBehind:
+    """프로그램 전체에서 하나 (처음 부를 때 스레드 시작)"""
+    global _WRITER
+    with _WRITER_LOCK:
+        if _WRITER is None:
+            _WRITER = WriteBehind()
+        return _WRITER
+
+
+def flush_pending() -> None:
+    """지연 기록을 쓰고 있으면 지금 기록 (안 쓰면 아무것도 안 함)"""
+    if _WRITER is not None:
+        _WRITER.flush()
+
+
+def discard_pending(path: str | Path | None = None) -> int:
+    """지연 기록 대기 중인 수정을 버림 → 버린 Save 수"""
+    return _WRITER.discard(path) if _WRITER is not None else 0
+
+
 if __name__ == "__main__":
     # 예시 실행
-    SAVE_DIR = r"C:\Users\PC\AppData\Local\Longvinter\Saved\SaveGames"
+    # 명령줄 도구는 Headless.py (python Headless.py --dir <SaveGames> apply)
+    SAVE_DIR = sys.argv[1] if len(sys.argv) > 1 else r"C:\Users\PC\AppData\Local\Longvinter\Saved\SaveGames"
     try:
         apply_json_to_sav(SAVE_DIR, "characterStyle-1.0")
         print("SAV 갱신 완료. 게임을 재실행해 적용을 확인하세요.")
@@ -0,0 +1,141 @@
+# SaveWatcher.py
+from __future__ import annotations
+from pathlib import Path
+from typing import Optional, Tuple
+import threading
+import time
+import os
+import sys
+
+from ConvCache import sha256_file
+
+# watchdog(선택): 있으면 OS 알림(inotify / ReadDirectoryChangesW), 없으면 mtime 폴링
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+'''
+Description:
+Watches characterStyle-1.0.sav in SAVE_DIR and tells the GUI when the game rewrote it
+
+#1) Change detection:
+watchdog events if the package is installed, otherwise os.stat() (size, mtime) every poll
+
+#2) Debounce:
+The game may write the file several times in a row --> wait until nothing changed for `debounce` seconds
+
+#3) Content check:
+Only a different sha256 counts as a change (touch / same bytes rewritten --> ignored)
+
+#4) Start:
+The constructor does no I/O. start() (the GUI calls it after the first frame) takes the stat,
+starts the events and hashes the .sav on a background thread --> poll() is False until that hash is there
+
+poll() is cheap and has no side effects on the GUI, call it from Tk's after() loop.
+'''
+
+
+class _Handler(FileSystemEventHandler):
+    def __init__(self, watcher: "SaveWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event) -> None:
+        paths = (getattr(event, "src_path", ""), getattr(event, "dest_path", ""))
+        if any(p and Path(p).name == self.watcher.sav.name for p in paths):
+            self.watcher._mark()
+
+
+class SaveWatcher:
+    def __init__(self, sav: str | Path, debounce: float = 0.8, use_events: bool = True):
+        self.sav = Path(sav)
+        self.debounce = debounce
+        self._lock = threading.Lock()
+        self.use_events = use_events
+        self._changed_at: Optional[float] = None  # 마지막 변경 감지 시각 (monotonic)
+        self._stat: Optional[Tuple[int, int]] = None
+        self._hash: Optional[str] = None
+        self._ready = threading.Event()  # 기준 해시가 정해짐
+        self._started = False
+        self._observer = None
+
+    def start(self) -> None:
+        """감시 시작 (기준 해시는 백그라운드 스레드에서 → 창을 막지 않음)"""
+        if self._started:
+            return
+        self._started = True
+        self._stat = self._stat_now()
+        threading.Thread(target=self._baseline, name="lvcc-watch-hash", daemon=True).start()
+        if self.use_events and Observer is not None:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_Handler(self), str(self.sav.parent), recursive=False)
+                self._observer.daemon = True
+                self._observer.start()
+            except Exception as e:  # 알림을 못 쓰면 폴링으로
+                print("[watch] events unavailable, polling:", e, file=sys.stderr)
+                self._observer = None
+
+    @property
+    def mode(self) -> str:
+        return "events" if self._observer is not None else "polling"
+
+    def _stat_now(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.sav)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def _hash_now(self) -> Optional[str]:
+        try:
+            return sha256_file(self.sav)
+        except OSError:
+            return None
+
+    def _baseline(self) -> None:
+        digest = self._hash_now()
+        with self._lock:
+            if not self._ready.is_set():  # 그 사이 sync()가 정했으면 그대로
+                self._hash = digest
+                self._ready.set()
+
+    def _mark(self) -> None:
+        with self._lock:
+            self._changed_at = time.monotonic()
+
+    def poll(self) -> bool:
+        """내용이 실제로 바뀌었고, 쓰기가 debounce 동안 잠잠하면 True (변경 1회당 한 번)"""
+        if not self._ready.is_set():
+            return False  # start() 전이거나 기준 해시를 아직 계산 중 (감지된 변경은 남겨 둠)
+        if self._observer is None:
+            st = self._stat_now()
+            if st != self._stat:
+                self._stat = st
+                self._mark()
+        with self._lock:
+            changed_at = self._changed_at
+            if changed_at is None or time.monotonic() - changed_at < self.debounce:
+                return False
+            self._changed_at = None
+        new_hash = self._hash_now()
+        if new_hash is None or new_hash == self._hash:
+            return False
+        self._hash = new_hash
+        return True
+
+    def sync(self) -> None:
+        """우리가 직접 sav를 쓴 뒤 호출 --> 자기 자신의 저장을 '게임의 변경'으로 보지 않음"""
+        stat, digest = self._stat_now(), self._hash_now()
+        with self._lock:
+            self._changed_at = None
+            self._stat, self._hash = stat, digest
+            self._ready.set()
+
+    def stop(self) -> None:
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
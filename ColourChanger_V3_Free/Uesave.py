@@ -0,0 +1,474 @@
+# Uesave.py
+from __future__ import annotations
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+import subprocess
+import tempfile
+import threading
+import shutil
+import json
+import io
+import os
+import re
+import sys
+
+import Procs
+from LastState import APP_DIR
+from Profiler import span
+
+'''
+Description:
+The one place that knows how to run uesave (the external .sav <-> JSON converter)
+
+#1) Which binary:
+env LVCC_UESAVE --> <Create_json.BASE (_MEIPASS or this folder)>/uesave(.exe) --> uesave on PATH
+
+#2) Probe once, remember on disk:
+"--version" and "from-json --help" tell the version and the argument style
+(--input/--output flags or positional).
+Saved in %APPDATA%/LVColorChanger/uesave.json, keyed by the binary path + size + mtime
+--> a new uesave build is probed again, the same one never is.
+What the help text does not say is learned from the first real call and saved the same way
+(style: first style that works; stdin: whether "--input -" works).
+
+#3) Every call:
+goes through Procs (timeout LVCC_UESAVE_TIMEOUT, Cancel button), stderr is captured
+--> a failure raises UesaveError with uesave's own message instead of just an exit code
+
+#4) Batch worker (opt-in: env LVCC_UESAVE_BATCH=1, and only if the binary lists a "batch" subcommand):
+a few long-lived "uesave batch" processes, one JSON request per line on stdin, one JSON reply per line:
+    {"cmd": "to-json", "input": <sav>}                      --> {"ok": true, "json": {...}}
+    {"cmd": "from-json", "doc": {...}, "output": <sav>}     --> {"ok": true}
+    {"cmd": "from-json", "input": <json>, "output": <sav>}  --> {"ok": true}
+    failure                                                 --> {"ok": false, "error": "..."}
+--> no process launch per conversion. Off by default: current uesave releases have no batch mode,
+and "--help" (the batch probe) is only run once the option is turned on.
+A worker belongs to no job; while it serves a request it is tied to that job's CancelToken (Procs.attach).
+'''
+
+EXE_NAME = "uesave.exe" if os.name == "nt" else "uesave"
+CAPS_FILE = APP_DIR / "uesave.json"
+PROBE_TIMEOUT = 10.0
+STYLES = ("flags", "positional")
+USE_BATCH = os.environ.get("LVCC_UESAVE_BATCH", "") not in ("", "0")
+BATCH_WORKERS = min(4, os.cpu_count() or 1)
+_STDERR_TAIL = 600        # 오류 메시지에 붙일 stderr 끝부분 길이
+# 명령줄 문법 오류 (clap): 이때만 다른 인자 스타일 / stdin 대신 파일로 다시 시도할 가치가 있다
+_USAGE_EXIT = 2
+_USAGE_MARKERS = ("unexpected argument", "unrecognized", "required arguments were not provided", "usage:")
+_NO_INPUT_MARKERS = ("no such file", "cannot find the file", "os error 2")  # "-"를 파일 이름으로 열려고 함
+
+T = TypeVar("T")
+
+
+class UesaveError(subprocess.CalledProcessError):
+    """uesave가 실패함 (stderr 끝부분을 메시지에 포함)"""
+
+    def __str__(self) -> str:
+        msg = super().__str__()
+        err = self.stderr_text.strip()
+        return f"{msg}\n{err[-_STDERR_TAIL:]}" if err else msg
+
+    @property
+    def stderr_text(self) -> str:
+        err = self.stderr
+        return err.decode("utf-8", "replace") if isinstance(err, bytes) else (err or "")
+
+    @property
+    def usage_error(self) -> bool:
+        """명령줄을 못 알아들음 (종료 코드 2 또는 clap의 문법 오류 메시지) ↔ 문서/파일/디스크 문제"""
+        err = self.stderr_text.lower()
+        return self.returncode == _USAGE_EXIT or any(m in err for m in _USAGE_MARKERS)
+
+
+def resolve_binary() -> Path:
+    """사용할 uesave 경로 (아무것도 없으면 번들 위치를 반환 → 오류 메시지에 그 경로가 보임)"""
+    from Create_json import BASE  # Create_json이 이 모듈을 import 하므로 여기서
+    env = os.environ.get("LVCC_UESAVE")
+    if env:
+        return Path(env)
+    for cand in (BASE / EXE_NAME, Path(__file__).resolve().parent / EXE_NAME):
+        if cand.exists():
+            return cand
+    found = shutil.which("uesave")
+    return Path(found) if found else BASE / EXE_NAME
+
+
+def _file_sig(path: Path) -> Optional[List[int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+
+# -------- batch 모드 worker --------
+class _BatchWorker:
+    """'uesave batch' 프로세스 하나 (요청 한 줄 → 응답 한 줄)"""
+
+    def __init__(self, path: Path):
+        self._stack = ExitStack()
+        # 어느 작업에도 속하지 않음 (job(None)) + timeout=0: 수명 전체에는 제한 없음 (요청마다 따로 건다)
+        with Procs.job(None):
+            self.proc = self._stack.enter_context(
+                Procs.popen([str(path), "batch"], timeout=0, stdin=subprocess.PIPE, stdout=subprocess.PIPE))
+        self._expired = False
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def _expire(self) -> None:
+        self._expired = True
+        self.proc.kill()
+
+    def request(self, msg: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        timer = threading.Timer(timeout, self._expire) if timeout else None
+        with Procs.attach(self.proc) as reason:  # 이 요청 동안만 부른 작업의 Cancel이 worker를 종료
+            if timer:
+                timer.daemon = True
+                timer.start()
+            try:
+                try:
+                    self.proc.stdin.write(json.dumps(msg, ensure_ascii=False).encode("utf-8") + b"\n")
+                    self.proc.stdin.flush()
+                    line = self.proc.stdout.readline()
+                except OSError:
+                    line = b""
+            finally:
+                if timer:
+                    timer.cancel()
+        if not line:
+            self.close()
+            if reason[0] == "cancel":
+                raise Procs.Cancelled("cancelled")
+            if self._expired:
+                raise Procs.ProcTimeout(f"uesave batch timed out after {timeout:g}s: {msg.get('cmd')}")
+            raise OSError(f"uesave batch worker exited (code {self.proc.returncode})")
+        resp = json.loads(line)
+        if not resp.get("ok"):
+            raise UesaveError(1, ["uesave", "batch", str(msg.get("cmd"))],
+                              stderr=str(resp.get("error", "")).encode("utf-8"))
+        return resp
+
+    def close(self) -> None:
+        try:
+            if self.alive:
+                self.proc.stdin.close()  # EOF → 정상 종료
+                self.proc.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        try:
+            self._stack.close()  # 남아 있으면 kill + wait
+        except (Procs.Cancelled, Procs.ProcTimeout):
+            pass
+
+
+class _WorkerPool:
+    """놀고 있는 worker를 재사용, 동시에 필요한 만큼만 (최대 size개) 띄움"""
+
+    def __init__(self, path: Path, size: int):
+        self.path = path
+        self.size = size
+        self._idle: List[_BatchWorker] = []
+        self._lock = threading.Lock()
+
+    def request(self, msg: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        with self._lock:
+            worker = self._idle.pop() if self._idle else None
+        if worker is None:
+            worker = _BatchWorker(self.path)
+        try:
+            return worker.request(msg, timeout)
+        finally:
+            with self._lock:
+                if worker.alive and len(self._idle) < self.size:
+                    self._idle.append(worker)
+                    worker = None
+            if worker is not None:
+                worker.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for w in idle:
+            w.close()
+
+
+# -------- 어댑터 --------
+class Uesave:
+    """uesave 바이너리 하나. caps()는 처음 쓸 때 한 번만 확인 (디스크 캐시)."""
+
+    def __init__(self, path: str | Path, cache_file: Optional[Path] = CAPS_FILE,
+                 timeout: Optional[float] = None):
+        self.path = Path(path)
+        self.cache_file = cache_file
+        self.timeout = timeout  # None --> Procs.TIMEOUT
+        self._caps: Optional[Dict[str, Any]] = None
+        self._lock = threading.RLock()
+        self._pool: Optional[_WorkerPool] = None
+        self._batch_off = False  # 이번 실행에서 batch worker가 죽음 → 프로세스 실행으로
+
+    # ---- 기능 확인 ----
+    def caps(self) -> Dict[str, Any]:
+        """{"version", "style", "stdin", "batch"} (None이면 아직 모름, batch는 USE_BATCH일 때만 확인)"""
+        with self._lock:
+            if self._caps is None:
+                self._caps = self._cached()
+                if self._caps is None:  # 처음 보는 바이너리 (동시에 불려도 확인은 한 번)
+                    self._caps = self._probe()
+                    self._save_caps()
+            return self._caps
+
+    def _key(self) -> str:
+        return str(self.path.resolve())
+
+    def _read_cache(self) -> Dict[str, Any]:
+        if self.cache_file is None:
+            return {}
+        try:
+            with self.cache_file.open("r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _cached(self) -> Optional[Dict[str, Any]]:
+        entry = self._read_cache().get(self._key())
+        if isinstance(entry, dict) and entry.get("sig") == _file_sig(self.path):
+            return entry
+        return None
+
+    def _save_caps(self) -> None:
+        if self.cache_file is None:
+            return
+        data = self._read_cache()
+        data[self._key()] = self._caps
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_file.with_name(self.cache_file.name + ".tmp")
+            tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            tmp.replace(self.cache_file)
+        except OSError as e:
+            print("[uesave] caps cache write failed:", e, file=sys.stderr)
+
+    def _remember(self, **found: Any) -> None:
+        """실제 호출에서 알게 된 것 기록 (style, stdin, batch)"""
+        caps = self.caps()
+        with self._lock:
+            if all(caps.get(k) == v for k, v in found.items()):
+                return
+            caps.update(found)
+            self._save_caps()
+
+    def _probe_timeout(self) -> float:
+        """PROBE_TIMEOUT, 단 설정된 uesave 제한(LVCC_UESAVE_TIMEOUT / timeout=)이 더 짧으면 그것"""
+        limit = self.timeout if self.timeout is not None else Procs.TIMEOUT
+        return min(PROBE_TIMEOUT, limit) if limit else PROBE_TIMEOUT
+
+    def _help(self, *args: str) -> Optional[str]:
+        """짧은 정보 명령 실행 → 출력 텍스트 (실패/시간 초과면 None, 부른 작업이 취소되면 Cancelled)"""
+        cmd = [str(self.path), *args]
+        try:
+            with Procs.popen(cmd, self._probe_timeout(), token=Procs.current(),
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT) as proc:
+                out, _ = proc.communicate()
+        except (OSError, Procs.ProcTimeout):
+            return None
+        return out.decode("utf-8", "replace") if proc.returncode == 0 else None
+
+    def _probe(self) -> Dict[str, Any]:
+        self._require()
+        with span("uesave_probe", binary=str(self.path)):
+            version = self._help("--version")
+            sub = self._help("from-json", "--help")
+        style = None
+        if sub and "from-json" in sub.lower():
+            style = "flags" if "--input" in sub and "--output" in sub else "positional"
+        caps = {
+            "sig": _file_sig(self.path),
+            "version": version.strip() if version else None,
+            "style": style,
+            "stdin": None,
+            "batch": None,
+        }
+        print(f"[uesave] {self.path.name}: {caps['version'] or 'unknown version'}, style={style or '?'}", file=sys.stderr)
+        return caps
+
+    def _require(self) -> None:
+        if not self.path.exists():
+            raise FileNotFoundError(f"uesave not found: {self.path}")
+
+    # ---- 실행 ----
+    def _args(self, style: str, sub: str, src: str, dst: Optional[str] = None) -> List[str]:
+        if style == "positional":
+            return [str(self.path), sub, src] + ([dst] if dst else [])
+        return [str(self.path), sub, "--input", src] + (["--output", dst] if dst else [])
+
+    def _styled(self, run: Callable[[str], T]) -> T:
+        """
+        알려진 인자 스타일로 실행. 모르면 순서대로 시도하고, 성공한 스타일을 기록.
+        다음 스타일로 넘어가는 것은 문법 오류(usage_error)일 때만: 문서가 잘못됐거나 디스크가 가득 찬 경우는 바로 raise.
+        """
+        style = self.caps()["style"]
+        if style:
+            return run(style)
+        last: Optional[UesaveError] = None
+        for st in STYLES:
+            try:
+                out = run(st)
+            except UesaveError as e:
+                if not e.usage_error:
+                    raise
+                last = e
+                continue
+            self._remember(style=st)
+            return out
+        raise last  # type: ignore[misc]
+
+    def _run(self, cmd: List[str], stdin: Optional[Callable[[Any], None]] = None,
+             capture: bool = False) -> bytes:
+        """cmd 실행 (stdin 콜백이 있으면 파이프로 씀). 실패하면 UesaveError (stderr 포함)."""
+        self._require()
+        print("[exec]", " ".join(cmd), file=sys.stderr)
+        with tempfile.TemporaryFile() as err:  # PIPE 두 개를 같이 쓰면 막힐 수 있어 파일로
+            with Procs.popen(cmd, self.timeout,
+                             stdin=subprocess.PIPE if stdin else None,
+                             stdout=subprocess.PIPE if capture else None, stderr=err) as proc:
+                if stdin:
+                    try:
+                        stdin(proc.stdin)
+                    except BrokenPipeError:
+                        pass  # uesave가 먼저 종료됨 → 아래 returncode로 판단
+                out = proc.communicate()[0] if capture else b""
+                rc = proc.wait()
+            if rc:
+                err.seek(0)
+                raise UesaveError(rc, cmd, out, err.read())
+        return out or b""
+
+    def _batch(self) -> Optional[_WorkerPool]:
+        if not USE_BATCH or self._batch_off:
+            return None
+        caps = self.caps()
+        if caps.get("batch") is None:  # 켠 뒤 처음 → 최상위 도움말에 batch 명령이 있는지 (한 번, 디스크에 기록)
+            top = self._help("--help") or ""
+            self._remember(batch=bool(re.search(r"^\s+batch\b", top, re.M)))
+        if not caps["batch"]:
+            return None
+        with self._lock:
+            if self._pool is None:
+                self._pool = _WorkerPool(self.path, BATCH_WORKERS)
+            return self._pool
+
+    def _batch_request(self, msg: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """batch worker로 처리 (batch를 못 쓰면 None → 호출한 쪽이 프로세스 실행으로)"""
+        pool = self._batch()
+        if pool is None:
+            return None
+        try:
+            return pool.request(msg, self.timeout if self.timeout is not None else Procs.TIMEOUT)
+        except OSError as e:  # worker를 띄우지 못했거나 죽음 → 이번 실행에서는 쓰지 않음
+            print("[uesave] batch mode unavailable:", e, file=sys.stderr)
+            self._batch_off = True
+            return None
+
+    # ---- 공개 API ----
+    def to_json(self, sav: str | Path) -> bytes:
+        """sav --> JSON bytes (stdout)"""
+        resp = self._batch_request({"cmd": "to-json", "input": str(sav)})
+        if resp is not None:
+            return json.dumps(resp["json"], ensure_ascii=False).encode("utf-8")
+        return self._styled(lambda st: self._run(self._args(st, "to-json", str(sav)), capture=True))
+
+    def read_doc(self, sav: str | Path) -> dict:
+        """sav --> 문서(dict). stdout을 모아두지 않고 파이프에서 바로 json.load."""
+        resp = self._batch_request({"cmd": "to-json", "input": str(sav)})
+        if resp is not None:
+            return resp["json"]
+        return self._styled(lambda st: self._read_doc(self._args(st, "to-json", str(sav))))
+
+    def _read_doc(self, cmd: List[str]) -> dict:
+        self._require()
+        print("[exec]", " ".join(cmd), file=sys.stderr)
+        with tempfile.TemporaryFile() as err:
+            with Procs.popen(cmd, self.timeout, stdout=subprocess.PIPE, stderr=err) as proc:
+                try:
+                    with io.TextIOWrapper(proc.stdout, encoding="utf-8", errors="replace") as text:
+                        doc = json.load(text)
+                except ValueError:
+                    doc = None  # 실패해서 JSON이 아닌 출력 → returncode로 판단
+                rc = proc.wait()
+            if rc or doc is None:
+                err.seek(0)
+                raise UesaveError(rc or 1, cmd, None, err.read())
+        return doc
+
+    def from_json(self, json_path: str | Path, out_sav: str | Path) -> None:
+        """json 파일 --> out_sav (out_sav에 바로 씀: 교체는 호출한 쪽에서)"""
+        if self._batch_request({"cmd": "from-json", "input": str(json_path), "output": str(out_sav)}) is not None:
+            return
+        self._styled(lambda st: self._run(self._args(st, "from-json", str(json_path), str(out_sav))))
+
+    def from_json_doc(self, doc: dict, out_sav: str | Path) -> None:
+        """
+        메모리의 문서 --> out_sav. stdin("-")으로 흘려보내고,
+        그 uesave가 stdin을 못 받으면 임시 json 파일로 (한 번 알게 되면 기록해 두고 바로 파일로).
+        """
+        if self._batch_request({"cmd": "from-json", "doc": doc, "output": str(out_sav)}) is not None:
+            return
+        out_sav = Path(out_sav)
+        if self.caps()["stdin"] is not False:
+            def feed(pipe) -> None:
+                with io.TextIOWrapper(pipe, encoding="utf-8") as text:
+                    json.dump(doc, text, ensure_ascii=False, separators=(",", ":"))
+            try:
+                self._styled(lambda st: self._run(self._args(st, "from-json", "-", str(out_sav)), stdin=feed))
+                self._remember(stdin=True)
+                return
+            except UesaveError as e:
+                err = e.stderr_text.lower()
+                if self.caps()["stdin"] or not (e.usage_error or any(m in err for m in _NO_INPUT_MARKERS)):
+                    raise  # stdin은 된다고 알려져 있거나, "-"를 거부한 것이 아님 → 문서/파일 문제
+                print("[uesave] stdin input failed, retrying with a temp file:", e.returncode, file=sys.stderr)
+
+        fd, tmp = tempfile.mkstemp(suffix=".json", dir=out_sav.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(doc, f, ensure_ascii=False, separators=(",", ":"))
+            self.from_json(tmp, out_sav)
+        finally:
+            os.unlink(tmp)
+        self._remember(stdin=False)
+
+    def close(self) -> None:
+        """batch worker가 떠 있으면 종료 (없으면 아무것도 안 함)"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.close()
+
+
+# -------- 프로그램 전체에서 쓰는 인스턴스 --------
+_current: Optional[Uesave] = None
+_current_lock = threading.Lock()
+
+
+def get() -> Uesave:
+    global _current
+    with _current_lock:
+        if _current is None:
+            _current = Uesave(resolve_binary())
+        return _current
+
+
+def use(path: str | Path, cache_file: Optional[Path] = CAPS_FILE) -> Uesave:
+    """다른 uesave로 교체 (Headless --uesave, 벤치마크의 가짜 uesave)"""
+    global _current
+    new = Uesave(path, cache_file)
+    with _current_lock:
+        old, _current = _current, new
+    if old is not None:
+        old.close()
+    return new
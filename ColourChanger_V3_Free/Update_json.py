@@ -1,12 +1,28 @@
-# StrModel.py
+# Update_json.py
+import hashlib
 import json
 import re
+import sys
+import threading
 from pathlib import Path
-from typing import Dict, List, Tuple, Union
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from ConvCache import file_identity, sha256_file
+from Create_json import load_document, dumps_document
+from SaveApply import apply_str_to_sav
+from JsonSplice import read_str, splice_str
+from Profiler import span
 
 TYPE_RE = re.compile(r";type:([^;]+)")
+TYPE_TOKEN_RE = re.compile(r";type:[^;]+")
+FIELD_SEG_RE = re.compile(r"(?:^|;)([^;:]*):([^;]*)")  # ';'로 나뉜 조각 하나의 name:value
 FIELD_RE_TMPL = r"{name}:([^;]*)"
 
+@lru_cache(maxsize=64)
+def _field_re(field: str) -> "re.Pattern[str]":
+    """필드 이름별 정규식은 한 번만 컴파일"""
+    return re.compile(FIELD_RE_TMPL.format(name=re.escape(field)))
+
 # -------- 파서/빌더의 핵심: 원본 순서 + tail 보존 --------
 def parse_str(s: str) -> Tuple[List[str], Dict[str, str], str]:
     """
@@ -31,16 +47,189 @@ def parse_str(s: str) -> Tuple[List[str], Dict[str, str], str]:
     tail = s[prev_end:] if last_m else ""  # 마지막 type 뒤 tail 보존
     return order, blocks, tail
 
-def build_str(order: List[str], blocks: Dict[str, str], tail: str) -> str:
-    """원래 순서대로 블록을 이어 붙이고 tail을 덧붙여 Str 재구성"""
-    return "".join(blocks[t] for t in order if t in blocks) + tail
+def build_str(order: List[str], blocks: Dict[str, Union[str, "StyleBlock"]], tail: str) -> str:
+    """
+    원래 순서대로 블록을 이어 붙이고 tail을 덧붙여 Str 재구성.
+    StyleBlock이면 기록된 패치까지 반영 (전체를 join 한 번으로 만든다).
+    """
+    parts: List[str] = []
+    for t in order:
+        blk = blocks.get(t)
+        if blk is None:
+            continue
+        if isinstance(blk, str):
+            parts.append(blk)
+        else:
+            parts.extend(blk.pieces())
+    parts.append(tail)
+    return "".join(parts)
+
+# -------- 오프셋 인덱스 파서: 한 번 훑어서 블록 + 필드 위치까지 --------
+class StyleBlock:
+    """
+    parse_blocks가 만드는 블록 하나.
+    - text: 원본 블록 문자열 ('...;type:<TYPE>'까지, parse_str의 블록과 동일)
+    - fields: 필드 이름 → 마지막 값의 (start, end) 위치 (text 기준) → 읽기는 dict 조회 한 번
+      (블록을 처음 읽을 때 한 번만 만든다 → 건드리지 않는 블록은 인덱싱 비용 0)
+    - type_at: 블록을 끝내는 ';type:' 의 ';' 위치 (없는 필드를 넣을 자리)
+    수정은 _patches에 기록만 하고, pieces()/build_str 때 한 번에 이어 붙인다.
+    필드 이름은 ';'로 나뉜 조각의 ':' 앞부분과 정확히 같아야 한다 (get_last_field와 달리 부분 일치 X).
+    """
+    __slots__ = ("text", "typ", "type_at", "_fields", "_patches")
+
+    def __init__(self, text: str, typ: str, type_at: int):
+        self.text = text
+        self.typ = typ
+        self.type_at = type_at
+        self._fields: Optional[Dict[str, Tuple[int, int]]] = None
+        self._patches: Dict[str, str] = {}
+
+    @property
+    def fields(self) -> Dict[str, Tuple[int, int]]:
+        if self._fields is None:
+            self._fields = {m.group(1): m.span(2) for m in FIELD_SEG_RE.finditer(self.text)}
+        return self._fields
+
+    def get(self, field: str) -> str:
+        """get_last_field와 같은 값 (대기 중인 패치가 있으면 그 값)"""
+        if field in self._patches:
+            return self._patches[field]
+        span = self.fields.get(field)
+        return self.text[span[0]:span[1]].strip() if span else ""
+
+    def set(self, field: str, value: str) -> None:
+        self._patches[field] = value
+
+    @property
+    def patches(self) -> Dict[str, str]:
+        """대기 중인 수정 (field -> value). 읽기 전용으로 쓸 것"""
+        return self._patches
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._patches)
+
+    def pieces(self) -> Iterator[str]:
+        """
+        패치를 반영한 블록의 조각들 (replace_last_field를 순서대로 부른 결과와 같음).
+        - 있는 필드: 값 범위만 교체
+        - 없는 필드: ';type:' 앞에 'field:value;' 로 삽입
+        """
+        if not self._patches:
+            yield self.text
+            return
+        text = self.text
+        edits: List[Tuple[int, int, Optional[str]]] = [
+            (*self.fields[f], v) for f, v in self._patches.items() if f in self.fields]
+        inserts = "".join(f"{f}:{v};" for f, v in self._patches.items() if f not in self.fields)
+        if inserts:
+            # type 토큰이 없으면(비정상) 맨 끝에 추가
+            at = self.type_at if self.type_at >= 0 else len(text)
+            edits.append((at, at, None))
+        edits.sort(key=lambda e: e[0])
+
+        pos, prev = 0, ""  # prev: 마지막으로 내보낸 조각 (';' 보충 여부 판단)
+        for start, end, value in edits:
+            if start > pos:
+                prev = text[pos:start]
+                yield prev
+            if value is None:
+                if not prev.endswith(";"):
+                    yield ";"
+                prev = inserts
+                yield inserts
+            elif value:
+                prev = value
+                yield value
+            pos = end
+        yield text[pos:]
+
+    def render(self) -> str:
+        return "".join(self.pieces())
+
+    def commit(self) -> None:
+        """패치를 text에 반영하고 인덱스를 다시 만든다"""
+        if self._patches:
+            fresh = StyleBlock.from_text(self.render(), self.typ)
+            self.text, self.type_at, self._fields = fresh.text, fresh.type_at, None
+            self._patches.clear()
+
+    def discard(self) -> None:
+        self._patches.clear()
+
+    def copy(self) -> "StyleBlock":
+        """패치 없는 사본 (필드 인덱스는 공유: commit은 인덱스를 고치지 않고 새로 만든다)"""
+        blk = StyleBlock(self.text, self.typ, self.type_at)
+        blk._fields = self._fields
+        return blk
+
+    @classmethod
+    def from_text(cls, text: str, typ: str = "") -> "StyleBlock":
+        m = TYPE_TOKEN_RE.search(text)
+        return cls(text, typ, m.start() if m else -1)
+
+
+def parse_blocks(s: str) -> Tuple[List[str], Dict[str, StyleBlock], str]:
+    """
+    parse_str와 같은 (order, blocks, tail) 이지만 blocks는 StyleBlock.
+    블록 경계는 parse_str과 같은 정규식 한 번으로 찾고, 필드 위치는 블록별로 처음 읽을 때 만든다.
+    build_str(order, blocks, tail)은 parse_str → build_str 결과와 바이트 단위로 같다.
+    """
+    order: List[str] = []
+    blocks: Dict[str, StyleBlock] = {}
+
+    prev_end = 0
+    for m in TYPE_RE.finditer(s):
+        typ = m.group(1).strip()
+        order.append(typ)
+        blocks[typ] = StyleBlock(s[prev_end:m.end()], typ, m.start() - prev_end)
+        prev_end = m.end()
+
+    tail = s[prev_end:] if order else ""  # 마지막 type 뒤 tail 보존
+    return order, blocks, tail
+
+# -------- 공유 모델: 같은 Str은 한 번만 파싱 --------
+class StyleModel:
+    """
+    Str 하나를 파싱한 결과 (GetData / StyleDocument / Main이 같이 씀 → 읽기 전용).
+    수정이 필요하면 blocks()로 자기 StyleBlock 사본을 받는다.
+    """
+    __slots__ = ("str", "order", "tail", "_blocks")
+
+    def __init__(self, s: str):
+        self.str = s
+        self.order, self._blocks, self.tail = parse_blocks(s)
+
+    def has_block(self, typ: str) -> bool:
+        return typ in self._blocks
+
+    def get(self, typ: str, field: str) -> str:
+        blk = self._blocks.get(typ)
+        return blk.get(field) if blk is not None else ""
+
+    def block_text(self, typ: str) -> Optional[str]:
+        blk = self._blocks.get(typ)
+        return blk.text if blk is not None else None
+
+    def blocks_text(self) -> Dict[str, str]:
+        """type별 블록 문자열 (parse_str의 blocks와 같음)"""
+        return {t: blk.text for t, blk in self._blocks.items()}
+
+    def blocks(self) -> Tuple[List[str], Dict[str, StyleBlock], str]:
+        """parse_blocks(self.str)와 같은 (order, blocks, tail), 다시 파싱하지 않음"""
+        return list(self.order), {t: blk.copy() for t, blk in self._blocks.items()}, self.tail
+
+
+@lru_cache(maxsize=8)
+def style_model(s: str) -> StyleModel:
+    """같은 내용의 Str에는 같은 StyleModel"""
+    return StyleModel(s)
 
 # -------- 블록 내부의 필드 읽기/교체 --------
 def get_last_field(block: str, field: str) -> str:
     """block 내에서 field:VALUE 의 마지막 값을 읽어 반환. 없으면 빈 문자열."""
     last = ""
-    pattern = re.compile(FIELD_RE_TMPL.format(name=re.escape(field)))
-    for m in pattern.finditer(block):
+    for m in _field_re(field).finditer(block):
         last = m.group(1).strip()
     return last
 
@@ -49,14 +238,13 @@ def replace_last_field(block: str, field: str, new_value: str) -> str:
     block 내에서 field:VALUE 의 마지막 항목만 new_value로 교체.
     없으면 ;type:<TYPE> '앞'에 안전하게 삽입한다.
     """
-    pattern = re.compile(FIELD_RE_TMPL.format(name=re.escape(field)))
-    matches = list(pattern.finditer(block))
+    matches = list(_field_re(field).finditer(block))
     if matches:
         last = matches[-1]
         return block[:last.start()] + f"{field}:{new_value}" + block[last.end():]
 
     # 필드가 없으면 ;type:<TYPE> 바로 앞에 삽입
-    m_type = re.search(r";type:[^;]+", block)
+    m_type = TYPE_TOKEN_RE.search(block)
     if not m_type:  # 비정상: type 토큰이 없으면 맨 끝에 추가
         prefix = block if block.endswith(";") else (block + ";")
         return prefix + f"{field}:{new_value};"
@@ -78,54 +266,344 @@ def rgba_str_from_255(r: int, g: int, b: int) -> str:
 
 # -------- JSON I/O --------
 def read_json_str(json_path: Union[str, Path]) -> str:
-    with Path(json_path).open("r", encoding="utf-8") as f:
+    with span("json_load", path=str(json_path)) as sp, Path(json_path).open("r", encoding="utf-8") as f:
         data = json.load(f)
+        sp.set(bytes_in=f.buffer.tell())
     return data["root"]["properties"]["AllStyleValues_0"]["Str"], data
 
 def write_json_str(json_path: Union[str, Path], data: dict, new_str: str) -> None:
     data["root"]["properties"]["AllStyleValues_0"]["Str"] = new_str
-    with Path(json_path).open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    with span("json_dump", path=str(json_path)) as sp, Path(json_path).open("w", encoding="utf-8") as f:
+        f.write(dumps_document(data))
+        sp.set(bytes_out=f.tell())
+
+# -------- JSON I/O (빠른 경로): Str 값 범위만 찾아 읽고, 그 범위만 교체 --------
+def read_json_str_span(json_path: Union[str, Path]) -> Optional[Tuple[str, bytes, Tuple[int, int]]]:
+    """(Str, 원본 바이트, Str 리터럴의 바이트 범위). 예상한 모양이 아니면 None → read_json_str 사용."""
+    with span("json_str_scan", path=str(json_path)) as sp:
+        raw = Path(json_path).read_bytes()
+        hit = read_str(raw)
+        sp.set(bytes_in=len(raw), found=hit is not None)
+    if hit is None:
+        return None
+    s, start, end = hit
+    return s, raw, (start, end)
+
+def read_style_str(json_path: Union[str, Path]) -> str:
+    """Str만 필요할 때: 전체 JSON 트리를 만들지 않고 Str 리터럴만 디코딩"""
+    hit = read_json_str_span(json_path)
+    return hit[0] if hit is not None else read_json_str(json_path)[0]
+
+# -------- 파일별 캐시: 같은 세션에서 같은 파일은 한 번만 읽기 --------
+class StyleSource:
+    """
+    sav 또는 json 하나를 읽은 결과와 그때의 파일 정보 (style_source가 만들고 공유).
+    - data: 문서 (sav, 또는 json을 전체 로드한 경우). 공유되므로 고치지 말고 _with_str로 사본을 만든다.
+    - raw/span: json 빠른 경로의 원본 바이트와 Str 범위
+    - sha256: 읽은 내용의 해시 (우리가 방금 쓴 파일이면 None → 크기/mtime이 달라지면 다시 읽음)
+    """
+    __slots__ = ("path", "ident", "sha256", "model", "data", "raw", "span")
+
+    def __init__(self, path: Path, ident: Dict[str, int], sha256: Optional[str], model: StyleModel,
+                 data: Optional[dict] = None, raw: Optional[bytes] = None, span: Tuple[int, int] = (0, 0)):
+        self.path, self.ident, self.sha256, self.model = path, ident, sha256, model
+        self.data, self.raw, self.span = data, raw, span
+
+
+_SOURCES: Dict[Path, StyleSource] = {}
+_SOURCES_LOCK = threading.Lock()
+
+
+def style_source(path: Union[str, Path]) -> StyleSource:
+    """
+    path(.sav 또는 .json)의 StyleSource.
+    - 크기/mtime이 기록과 같으면 파일을 열지 않음
+    - 달라도 내용 해시가 같으면 (touch/복사) 기록만 갱신
+    - 아니면 다시 읽고 파싱 (Str이 같으면 파싱 결과는 style_model이 재사용)
+    """
+    path = Path(path).absolute()
+    with _SOURCES_LOCK:
+        src = _SOURCES.get(path)
+        ident = file_identity(path)
+        if src is not None and src.ident != ident and src.sha256 is not None \
+                and src.ident["size"] == ident["size"] and sha256_file(path) == src.sha256:
+            src.ident = ident
+        if src is None or src.ident != ident:
+            src = _SOURCES[path] = _load_source(path)
+        return src
+
+
+def _load_source(path: Path) -> StyleSource:
+    # 크기/mtime은 읽기 '전'에 잰다 → 읽는 사이 바뀌면 다음 조회에서 해시로 판단
+    ident = file_identity(path)
+    if path.suffix.lower() == ".json":
+        hit = read_json_str_span(path)
+        if hit is not None:
+            s, raw, rng = hit
+            return StyleSource(path, ident, hashlib.sha256(raw).hexdigest(), style_model(s), raw=raw, span=rng)
+    sha = sha256_file(path)
+    if path.suffix.lower() == ".json":
+        s, data = read_json_str(path)
+    else:
+        data = load_document(path)
+        s = data["root"]["properties"]["AllStyleValues_0"]["Str"]
+    return StyleSource(path, ident, sha, style_model(s), data=data)
+
+
+def remember_written(path: Union[str, Path], s: str, data: Optional[dict] = None,
+                     raw: Optional[bytes] = None, span: Tuple[int, int] = (0, 0)) -> None:
+    """우리가 방금 path에 s를 썼다 → 다시 읽지 않도록 캐시를 새 내용으로 교체"""
+    path = Path(path).absolute()
+    with _SOURCES_LOCK:
+        try:
+            _SOURCES[path] = StyleSource(path, file_identity(path), None, style_model(s), data, raw, span)
+        except OSError:
+            _SOURCES.pop(path, None)
+
+
+def forget_source(path: Union[str, Path, None] = None) -> None:
+    """캐시 버리기 (path가 None이면 전부)"""
+    with _SOURCES_LOCK:
+        if path is None:
+            _SOURCES.clear()
+        else:
+            _SOURCES.pop(Path(path).absolute(), None)
+
+
+def _with_str(data: dict, new_str: str) -> dict:
+    """Str만 바꾼 문서 (바뀌는 경로의 dict만 복사 → 공유 중인 원본은 그대로)"""
+    root = dict(data["root"])
+    props = root["properties"] = dict(root["properties"])
+    props["AllStyleValues_0"] = dict(props["AllStyleValues_0"], Str=new_str)
+    return dict(data, root=root)
+
+# -------- 트랜잭션: 한 번 읽고, 여러 필드 수정을 모아 한 번에 쓰기 --------
+class StyleDocument:
+    """
+    JSON을 한 번만 읽고(parse_str 1회), 여러 블록의 필드 수정을 큐에 모았다가
+    commit() 시 build_str 1회 + 파일 쓰기 1회로 반영한다.
+
+    사용 예:
+        with StyleDocument(json_path) as doc:
+            doc.set_rgb("Skin", 255, 200, 180)
+            doc.set_rgb("Hair", 10, 10, 10)
+            doc.set_field("Hair", "definitionid", "")
+        # with 블록이 예외 없이 끝나면 자동 commit
+
+    스트리밍 모드(StyleDocument.from_sav)는 중간 json 파일 없이 sav를 메모리로 읽고,
+    commit() 때 sav에 바로 기록한다.
+
+    읽은 뒤에 게임이 파일을 다시 썼으면 (commit 때 크기/mtime → 해시로 확인) 덮어쓰지 않고
+    새 내용 위에 우리 수정만 다시 얹는다 (_rebase: 블록/필드 단위 3-way 병합).
+    양쪽이 같은 필드(replace_str이면 같은 블록)를 바꿨으면 우리 값이 이기고 conflicts에 남는다.
+    """
+
+    def __init__(self, json_path: Union[str, Path, None] = None, *,
+                 sav_path: Union[str, Path, None] = None):
+        if (json_path is None) == (sav_path is None):
+            raise ValueError("json_path 또는 sav_path 중 하나만 지정하세요.")
+        self.json_path = Path(json_path) if json_path is not None else None
+        self.sav_path = Path(sav_path) if sav_path is not None else None
+        # 파일은 style_source가 읽고 캐시한다 (바뀌지 않았으면 읽지도 파싱하지도 않음)
+        # json 모드: Str 범위만 읽고(_raw/_span), 실패하면 전체 로드(data)
+        src = style_source(self.path)
+        self.data: Optional[dict] = src.data
+        self._raw: Optional[bytes] = src.raw
+        self._span: Tuple[int, int] = src.span
+        # 수정은 각 StyleBlock의 패치로 쌓인다. 같은 필드를 여러 번 바꾸면 마지막 값만 남는다.
+        with span("parse", bytes_in=len(src.model.str)):
+            self.order, self.blocks, self.tail = src.model.blocks()
+        self._source = src      # 병합의 기준 (읽을 때의 파일 정보 + 모델)
+        self._replaced = False  # replace_str() 로 Str 전체를 바꿨는지
+        self.merged = False     # 마지막 commit이 새 내용 위에 병합했는지
+        self.conflicts: List[str] = []  # 그때 양쪽이 같이 바꾼 "type.field" (replace_str이면 "type")
+
+    @classmethod
+    def from_sav(cls, sav_path: Union[str, Path]) -> "StyleDocument":
+        return cls(sav_path=sav_path)
+
+    @property
+    def path(self) -> Path:
+        return self.json_path if self.json_path is not None else self.sav_path
+
+    # ---- 읽기 ----
+    def has_block(self, typ: str) -> bool:
+        return typ in self.blocks
+
+    def get_field(self, typ: str, field: str) -> str:
+        """대기 중인 수정값이 있으면 그 값을, 없으면 원본 블록의 마지막 값을 반환."""
+        blk = self.blocks.get(typ)
+        return blk.get(field) if blk is not None else ""
+
+    @property
+    def dirty(self) -> bool:
+        return self._replaced or any(blk.dirty for blk in self.blocks.values())
+
+    # ---- 수정 (큐에만 쌓음) ----
+    def set_field(self, typ: str, field: str, value: str) -> "StyleDocument":
+        if typ not in self.blocks:
+            raise ValueError(f"{typ} 블록이 없습니다.")
+        self.blocks[typ].set(field, value)
+        return self
+
+    def set_rgb(self, typ: str, r: int, g: int, b: int) -> "StyleDocument":
+        return self.set_field(typ, "color", rgba_str_from_255(r, g, b))
+
+    def set_hat(self, color_str: Optional[str], fx_str: Optional[str]) -> "StyleDocument":
+        """None이면 현재 값을 그대로 유지 (update_hat과 같은 규칙)."""
+        color_final = color_str.strip() if color_str is not None else self.get_field("Hat", "color")
+        fx_final = fx_str.strip() if fx_str is not None else self.get_field("Hat", "fx")
+        self.set_field("Hat", "color", color_final)
+        return self.set_field("Hat", "fx", fx_final)
+
+    def set_baldy(self) -> "StyleDocument":
+        return self.set_field("Hair", "definitionid", "")
+
+    def replace_str(self, s: str) -> "StyleDocument":
+        """Str 전체를 s로 교체 (되돌리기 등). 대기 중인 필드 수정은 버린다."""
+        self.order, self.blocks, self.tail = parse_blocks(s)
+        self._replaced = True
+        return self
+
+    # ---- 반영 ----
+    def to_str(self) -> str:
+        """대기 중인 수정을 반영한 Str (파일은 건드리지 않음)"""
+        return build_str(self.order, self.blocks, self.tail)
+
+    @property
+    def source_str(self) -> str:
+        """마지막으로 읽은(또는 쓴) 파일의 Str: to_str()과 같으면 기록할 것이 없다"""
+        return self._source.model.str
+
+    def commit(self) -> bool:
+        """수정이 있으면 한 번에 써서 True, 없으면 아무것도 안 하고 False."""
+        if not self.dirty:
+            return False
+        with span("style_commit") as sp:
+            self.merged, self.conflicts = False, []
+            if not self._source_unchanged():
+                self._rebase(style_source(self.path))
+                sp.set(merged=self.merged, conflicts=len(self.conflicts))
+            new_str = build_str(self.order, self.blocks, self.tail)
+            sp.set(bytes_out=len(new_str))
+            self._write(new_str)
+        for blk in self.blocks.values():
+            blk.commit()
+        self._replaced = False
+        return True
+
+    def _write(self, new_str: str) -> None:
+        if self._raw is not None:
+            # Str 범위 밖의 바이트는 그대로 유지
+            start, end = self._span
+            old_len = len(self._raw)
+            self._raw = splice_str(self._raw, start, end, new_str)
+            self._span = (start, end + len(self._raw) - old_len)
+            self.json_path.write_bytes(self._raw)
+        elif self.json_path is not None:
+            self.data = _with_str(self.data, new_str)
+            write_json_str(self.json_path, self.data, new_str)
+        else:
+            self.data = _with_str(self.data, new_str)
+            apply_str_to_sav(self.data, self.sav_path)  # Str 바이트만 교체, 안 되면 전체 쓰기
+        remember_written(self.path, new_str, self.data, self._raw, self._span)
+        self._source = style_source(self.path)
+
+    # ---- 읽은 뒤 파일이 바뀐 경우 ----
+    def _source_unchanged(self) -> bool:
+        """읽을 때와 같은 파일인지: 크기/mtime이 같으면 바로 True, 다르면 해시 비교"""
+        src = self._source
+        try:
+            ident = file_identity(self.path)
+        except OSError:
+            return True  # 지워졌으면 병합할 상대가 없음 (쓰기가 새로 만든다)
+        if ident == src.ident:
+            return True
+        return src.sha256 is not None and ident["size"] == src.ident["size"] \
+            and sha256_file(self.path) == src.sha256
+
+    def _rebase(self, fresh: StyleSource) -> None:
+        """
+        base(읽었던 내용) → ours(이 문서) / theirs(fresh) 3-way 병합.
+        - 필드 수정: theirs의 블록에 우리가 바꾼 필드만 다시 set (theirs에서 블록이 사라졌으면 버림)
+        - replace_str: 블록 단위. 우리가 안 바꾼 블록은 theirs, theirs가 안 바꾼 블록은 우리 것
+        """
+        base = self._source.model
+        order, blocks, tail = fresh.model.blocks()
+        conflicts: List[str] = []
+        if self._replaced:
+            for t in self.order:
+                mine = self.blocks[t].render()
+                old = base.block_text(t)
+                if mine == old:
+                    continue
+                if t in blocks:
+                    if blocks[t].text not in (old, mine):
+                        conflicts.append(t)
+                else:
+                    if old is not None:
+                        conflicts.append(t)  # theirs가 지운 블록을 우리가 바꿈 → 우리 것을 살림
+                    order.append(t)
+                blocks[t] = StyleBlock.from_text(mine, t)
+            for t in base.order:
+                # 우리가 지운 블록: theirs가 건드리지 않았을 때만 지움
+                if t not in self.blocks and t in blocks and blocks[t].text == base.block_text(t):
+                    del blocks[t]
+                    order.remove(t)
+            if self.tail != base.tail:
+                tail = self.tail
+        else:
+            for t, blk in self.blocks.items():
+                for field, value in blk.patches.items():
+                    if t not in blocks:
+                        conflicts.append(f"{t}.{field}")
+                        continue
+                    theirs = blocks[t].get(field)
+                    if theirs != base.get(t, field) and theirs != value:
+                        conflicts.append(f"{t}.{field}")
+                    blocks[t].set(field, value)
+        self.order, self.blocks, self.tail = order, blocks, tail
+        self.data, self._raw, self._span = fresh.data, fresh.raw, fresh.span
+        self._source = fresh
+        self.merged, self.conflicts = fresh.model.str != base.str, conflicts  # 내용이 같았으면 병합할 것도 없음
+        if conflicts:
+            print("[merge] changed on both sides (ours kept):", ", ".join(conflicts), file=sys.stderr)
+
+    def discard(self) -> None:
+        """대기 중인 수정을 모두 버림 (replace_str로 바꾼 Str도 읽을 때의 내용으로)"""
+        if self._replaced:
+            self.order, self.blocks, self.tail = self._source.model.blocks()
+            self._replaced = False
+        for blk in self.blocks.values():
+            blk.discard()
+
+    def __enter__(self) -> "StyleDocument":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+
 
 # -------- 고수준 API: Hat/Skin/Hair만 수정, 나머지는 그대로 --------
+# 모두 StyleDocument 위의 얇은 래퍼. 여러 필드를 바꿀 때는 StyleDocument를 직접 쓰는 편이 빠르다.
 def update_skin_rgb(json_path: Union[str, Path], r: int, g: int, b: int) -> None:
-    s, data = read_json_str(json_path)
-    order, blocks, tail = parse_str(s)
-    if "Skin" not in blocks:
-        raise ValueError("Skin 블록이 없습니다.")
-    blocks["Skin"] = replace_last_field(blocks["Skin"], "color", rgba_str_from_255(r, g, b))
-    write_json_str(json_path, data, build_str(order, blocks, tail))
+    with StyleDocument(json_path) as doc:
+        doc.set_rgb("Skin", r, g, b)
 
 def update_hair_rgb(json_path: Union[str, Path], r: int, g: int, b: int) -> None:
-    s, data = read_json_str(json_path)
-    order, blocks, tail = parse_str(s)
-    if "Hair" not in blocks:
-        raise ValueError("Hair 블록이 없습니다.")
-    blocks["Hair"] = replace_last_field(blocks["Hair"], "color", rgba_str_from_255(r, g, b))
-    write_json_str(json_path, data, build_str(order, blocks, tail))
+    with StyleDocument(json_path) as doc:
+        doc.set_rgb("Hair", r, g, b)
 
 def update_hat(json_path: Union[str, Path], color_str: str, fx_str: str) -> None:
     """
     Hat의 color는 '문자열 그대로', fx는 'fx:값;'의 값 부분만 교체.
     둘 중 하나만 바꾸고 싶으면 기존 값을 읽어서 그대로 넘기면 됨.
     """
-    s, data = read_json_str(json_path)
-    order, blocks, tail = parse_str(s)
-    if "Hat" not in blocks:
-        raise ValueError("Hat 블록이 없습니다.")
-    blk = blocks["Hat"]
-    cur_color = get_last_field(blk, "color")
-    cur_fx    = get_last_field(blk, "fx")
-
-    # 인자가 빈 문자열이면 그대로 유지하고 싶을 수 있으니, 호출부에서 명시적으로 cur_*를 넘기면 됨
-    color_final = color_str.strip() if color_str is not None else cur_color
-    fx_final    = fx_str.strip() if fx_str is not None else cur_fx
-
-    blk = replace_last_field(blk, "color", color_final)
-    blk = replace_last_field(blk, "fx", fx_final)
-    blocks["Hat"] = blk
-
-    write_json_str(json_path, data, build_str(order, blocks, tail))
+    with StyleDocument(json_path) as doc:
+        doc.set_hat(color_str, fx_str)
 
 
 def set_baldy_mode(json_path: Union[str, Path]) -> None:
@@ -133,11 +611,5 @@ def set_baldy_mode(json_path: Union[str, Path]) -> None:
     Hair 블록의 definitionid 값을 비워서 "definitionid:;" 상태로 만듭니다.
     다른 필드는 건드리지 않습니다.
     """
-    s, data = read_json_str(json_path)
-    order, blocks, tail = parse_str(s)
-    if "Hair" not in blocks:
-        raise ValueError("Hair 블록이 없습니다.")
-    blk = blocks["Hair"]
-    blk = replace_last_field(blk, "definitionid", "")
-    blocks["Hair"] = blk
-    write_json_str(json_path, data, build_str(order, blocks, tail))
+    with StyleDocument(json_path) as doc:
+        doc.set_baldy()
@@ -0,0 +1,313 @@
+# bench_hotpath.py
+'''
+Description:
+Benchmarks for the parse / update / round-trip hot path
+
+#1) Payloads:
+Synthetic AllStyleValues_0 Str values, from a realistic one (6 types) to very large ones
+(hundreds of types, thousands of fields), wrapped in a multi-property save.
+
+#2) uesave:
+bench/fake_uesave.py stands in for the real binary, so the subprocess stages can be measured anywhere.
+
+#3) Output:
+Machine-readable JSON (ops/sec, mean ms, peak traced memory) --> compare files across versions.
+Peak memory is Python allocations in this process (tracemalloc), not the uesave child process.
+
+Usage:
+    python bench/bench_hotpath.py                     # JSON to stdout
+    python bench/bench_hotpath.py --out bench_output.json
+    python bench/bench_hotpath.py --quick --filter update
+'''
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent))
+
+import Create_json  # noqa: E402
+import SaveApply  # noqa: E402
+import Uesave  # noqa: E402
+from GvasCodec import write_sav  # noqa: E402
+from Update_json import (  # noqa: E402
+    parse_str, build_str, parse_blocks, replace_last_field, rgba_str_from_255,
+    read_json_str, write_json_str, read_json_str_span, StyleDocument,
+    update_skin_rgb, update_hair_rgb, set_baldy_mode,
+)
+
+# name -> (types, extra fields per block)
+PAYLOADS: Dict[str, Tuple[int, int]] = {
+    "realistic": (6, 0),
+    "large": (200, 10),
+    "huge": (1000, 20),
+}
+BASE_TYPES = ("Skin", "Hat", "Hair", "Eyes", "Top", "Bottom")
+
+
+def make_style_str(n_types: int, n_fields: int) -> str:
+    parts = []
+    for i in range(n_types):
+        typ = BASE_TYPES[i] if i < len(BASE_TYPES) else f"Type{i}"
+        c = (i % 255) / 255
+        fields = [f"definitionid:{typ}_Default", f"color:(R={c:.6f},G=0.5,B=0.25,A=1.000000)"]
+        fields += [f"extra{j}:value{j}" for j in range(n_fields)]
+        if typ == "Hat":
+            fields.append("fx:None")
+        parts.append(";".join(fields) + f";type:{typ};")
+    return "".join(parts) + "version:2"
+
+
+def make_document(style: str) -> Dict[str, Any]:
+    props: Dict[str, Any] = {f"Counter_{i}": {"Int": i} for i in range(20)}
+    props["SlotName_0"] = {"Str": "characterStyle-1.0"}
+    props["AllStyleValues_0"] = {"Str": style}
+    return {
+        "header": {
+            "magic": 1396790855, "save_game_version": 2, "package_version": 522,
+            "engine_version_major": 4, "engine_version_minor": 27, "engine_version_patch": 2,
+            "engine_version_build": 18319896, "engine_version": "++UE4+Release-4.27",
+            "custom_format_version": 3,
+            "custom_format": [["22d5549c-be4f-26a8-4607-2194d082b461", 43]],
+        },
+        "root": {"save_game_type": "/Script/Longvinter.CharacterStyleSave", "properties": props},
+        "extra": [0, 0, 0, 0],
+    }
+
+
+def make_stub_uesave(tmp: Path) -> Path:
+    """fake_uesave.py를 UESAVE 자리에 넣을 수 있는 실행 파일로 감싼다"""
+    script = HERE / "fake_uesave.py"
+    if os.name == "nt":
+        stub = tmp / "uesave.cmd"
+        stub.write_text(f'@"{sys.executable}" "{script}" %*\r\n', encoding="utf-8")
+    else:
+        stub = tmp / "uesave"
+        stub.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n', encoding="utf-8")
+        stub.chmod(0o755)
+    return stub
+
+
+def measure(fn: Callable[[], Any], min_time: float) -> Dict[str, float]:
+    fn()  # warm-up
+    n = 0
+    t0 = time.perf_counter()
+    while True:
+        fn()
+        n += 1
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time:
+            break
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "ops": n,
+        "ops_per_sec": round(n / elapsed, 3),
+        "mean_ms": round(elapsed / n * 1000, 4),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def legacy_update(json_path: Path, typ: str, field: str, value: str) -> None:
+    """
+    The pre-StyleDocument update functions, pinned here as the baseline:
+    full json.load --> parse_str --> replace_last_field --> build_str --> json.dump(indent=2), per edit.
+    (update_skin_rgb & co. in Update_json are now thin StyleDocument wrappers.)
+    """
+    with json_path.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+    props = data["root"]["properties"]["AllStyleValues_0"]
+    order, blocks, tail = parse_str(props["Str"])
+    blocks[typ] = replace_last_field(blocks[typ], field, value)
+    props["Str"] = build_str(order, blocks, tail)
+    with json_path.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def set_backend(native: bool, stub: Path) -> None:
+    for mod in (Create_json, SaveApply):
+        mod.USE_NATIVE_GVAS = native
+    if Uesave.get().path != stub:
+        Uesave.use(stub, cache_file=stub.with_name("uesave_caps.json"))
+
+
+def cases(style: str, work: Path, stub: Path) -> List[Tuple[str, Callable[[], Any]]]:
+    order, blocks, tail = parse_str(style)
+    idx = parse_blocks(style)
+    hair = blocks["Hair"]
+    new_color = rgba_str_from_255(10, 20, 30)
+
+    save_dir = work / "SaveGames"
+    save_dir.mkdir()
+    sav = save_dir / "characterStyle-1.0.sav"
+    write_sav(make_document(style), sav)
+    pristine = sav.read_bytes()
+    set_backend(True, stub)
+    jpath = Create_json.create_json(save_dir, use_cache=False)[0]
+    _, data = read_json_str(jpath)
+    scratch = work / "scratch.json"
+    shutil.copy(jpath, scratch)
+
+    def styleblock_set_render():
+        blk = idx[1]["Hair"]
+        blk.set("color", new_color)
+        blk.render()
+        blk.discard()
+
+    def update_chain_legacy():
+        legacy_update(scratch, "Skin", "color", rgba_str_from_255(1, 2, 3))
+        legacy_update(scratch, "Hair", "color", rgba_str_from_255(4, 5, 6))
+        legacy_update(scratch, "Hair", "definitionid", "")
+
+    def update_chain_wrappers():
+        update_skin_rgb(scratch, 1, 2, 3)
+        update_hair_rgb(scratch, 4, 5, 6)
+        set_baldy_mode(scratch)
+
+    def update_chain_document():
+        with StyleDocument(scratch) as doc:
+            doc.set_rgb("Skin", 1, 2, 3).set_rgb("Hair", 4, 5, 6).set_baldy()
+
+    def backend(native: bool, fn: Callable[[], Any]) -> Callable[[], Any]:
+        def run():
+            set_backend(native, stub)
+            return fn()
+        return run
+
+    def to_json():
+        Create_json.create_json(save_dir, use_cache=False)
+
+    def from_json():
+        SaveApply.apply_json_to_sav(save_dir)
+
+    def roundtrip():
+        sav.write_bytes(pristine)
+        Create_json.create_json(save_dir, use_cache=False)
+        with StyleDocument(jpath) as doc:
+            doc.set_rgb("Skin", 1, 2, 3).set_rgb("Hair", 4, 5, 6).set_baldy()
+        SaveApply.apply_json_to_sav(save_dir)
+
+    def roundtrip_stream():
+        sav.write_bytes(pristine)
+        with StyleDocument.from_sav(sav) as doc:
+            doc.set_rgb("Skin", 1, 2, 3).set_rgb("Hair", 4, 5, 6).set_baldy()
+
+    # 저장만 (문서는 이미 메모리에): sav 전체 쓰기 vs Str 바이트만 교체
+    sav_doc = make_document(style)
+    props = sav_doc["root"]["properties"]["AllStyleValues_0"]
+    variants = [style.replace(hair, replace_last_field(hair, "color", c))
+                for c in (new_color, rgba_str_from_255(40, 50, 60), rgba_str_from_255(1, 2, 3))]
+    turn = [0]
+
+    def next_str() -> None:
+        turn[0] += 1
+        props["Str"] = variants[turn[0] % len(variants)]
+
+    def save_full_write():
+        next_str()
+        SaveApply.apply_document_to_sav(sav_doc, sav)
+
+    def save_str_patch():
+        next_str()
+        SaveApply.apply_str_to_sav(sav_doc, sav)
+
+    return [
+        ("parse_str", lambda: parse_str(style)),
+        ("build_str", lambda: build_str(order, blocks, tail)),
+        ("parse_blocks", lambda: parse_blocks(style)),
+        ("replace_last_field", lambda: replace_last_field(hair, "color", new_color)),
+        ("styleblock_set_render", styleblock_set_render),
+        ("read_json_str", lambda: read_json_str(jpath)),
+        ("read_json_str_span", lambda: read_json_str_span(jpath)),
+        ("write_json_str", lambda: write_json_str(scratch, data, style)),
+        ("update_chain_legacy", update_chain_legacy),
+        ("update_chain_wrappers", update_chain_wrappers),
+        ("update_chain_document", update_chain_document),
+        ("to_json_native", backend(True, to_json)),
+        ("to_json_uesave", backend(False, to_json)),
+        ("from_json_native", backend(True, from_json)),
+        ("from_json_uesave", backend(False, from_json)),
+        ("roundtrip_native", backend(True, roundtrip)),
+        ("roundtrip_uesave", backend(False, roundtrip)),
+        ("roundtrip_stream_native", backend(True, roundtrip_stream)),
+        ("roundtrip_stream_uesave", backend(False, roundtrip_stream)),
+        ("save_full_write", backend(True, save_full_write)),
+        ("save_str_patch", backend(True, save_str_patch)),
+    ]
+
+
+def _git_rev() -> str:
+    try:
+        out = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                      stderr=subprocess.DEVNULL)
+        return out.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", help="write JSON results here instead of stdout")
+    ap.add_argument("--filter", default="", help="only cases whose name contains this")
+    ap.add_argument("--payload", action="append", choices=sorted(PAYLOADS), help="payload(s) to run")
+    ap.add_argument("--min-time", type=float, default=0.5, help="seconds per case")
+    ap.add_argument("--quick", action="store_true", help="--min-time 0.05")
+    args = ap.parse_args(argv)
+    min_time = 0.05 if args.quick else args.min_time
+
+    results = []
+    saved = (Create_json.USE_NATIVE_GVAS, SaveApply.USE_NATIVE_GVAS, Uesave.get())
+    try:
+        for payload in args.payload or list(PAYLOADS):
+            n_types, n_fields = PAYLOADS[payload]
+            style = make_style_str(n_types, n_fields)
+            with tempfile.TemporaryDirectory() as tmp:
+                work = Path(tmp)
+                stub = make_stub_uesave(work)
+                # 모듈들이 찍는 진행 메시지가 JSON 출력에 섞이지 않도록
+                with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):
+                    todo = [(n, fn) for n, fn in cases(style, work, stub) if args.filter in n]
+                for name, fn in todo:
+                    with open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet):
+                        stats = measure(fn, min_time)
+                    res = {"case": name, "payload": payload, "str_len": len(style),
+                           "types": n_types, **stats}
+                    results.append(res)
+                    print(f"{payload:>9} {name:<24} {res['ops_per_sec']:>12.1f} ops/s "
+                          f"{res['mean_ms']:>10.3f} ms {res['peak_kb']:>10.1f} KiB", file=sys.stderr)
+    finally:
+        Create_json.USE_NATIVE_GVAS, SaveApply.USE_NATIVE_GVAS, ue = saved
+        Uesave.use(ue.path, ue.cache_file)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "git": _git_rev(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "min_time": min_time,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(text, encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,129 @@
+# fake_uesave.py
+'''
+Description:
+Stand-in for the uesave binary (benchmarks / machines without uesave.exe)
+
+Accepts the same command lines the program uses and emits/accepts the same JSON shape:
+    fake_uesave.py to-json --input <sav>
+    fake_uesave.py from-json --input <json | -> --output <sav>
+    fake_uesave.py from-json <json> <sav>
+    fake_uesave.py --version / --help / from-json --help      (what Uesave.py probes)
+    fake_uesave.py batch                                       (JSON lines, see Uesave.py #4)
+
+Knobs (env) to imitate other uesave builds:
+    FAKE_UESAVE_STYLE=flags|positional   only accept that argument style (default: both)
+    FAKE_UESAVE_BATCH=1                  list and accept the "batch" subcommand
+
+The GVAS work itself is done by GvasCodec, so only simple property types are supported.
+'''
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from GvasCodec import read_sav, encode_sav, GvasUnsupported  # noqa: E402
+
+VERSION = "uesave 0.0.0-fake"
+STYLE = os.environ.get("FAKE_UESAVE_STYLE", "")
+BATCH = os.environ.get("FAKE_UESAVE_BATCH", "") not in ("", "0")
+
+
+def _help() -> str:
+    cmds = ["  to-json    Convert binary save to plain text JSON",
+            "  from-json  Convert JSON back to binary save"]
+    if BATCH:
+        cmds.append("  batch      Convert many files, one JSON request per line on stdin")
+    return "Usage: uesave <COMMAND>\n\nCommands:\n" + "\n".join(cmds) + "\n"
+
+
+def _sub_help(cmd: str) -> str:
+    if STYLE == "positional":
+        return f"Usage: uesave {cmd} <INPUT> [OUTPUT]\n"
+    return f"Usage: uesave {cmd} [OPTIONS] --input <INPUT>\n\nOptions:\n  -i, --input <INPUT>\n  -o, --output <OUTPUT>\n"
+
+
+def _io(args):
+    """(input, output) 또는 이 빌드가 받지 않는 스타일이면 None"""
+    if "--input" in args:
+        if STYLE == "positional":
+            return None
+        i = args.index("--input")
+        out = args[args.index("--output") + 1] if "--output" in args else None
+        return args[i + 1], out
+    if STYLE == "flags" or not args:
+        return None
+    return args[0], (args[1] if len(args) > 1 else None)
+
+
+def _to_json(src: str) -> dict:
+    return read_sav(Path(src))
+
+
+def _from_json(doc: dict, dst: str) -> None:
+    Path(dst).write_bytes(encode_sav(doc))
+
+
+def _batch() -> int:
+    for line in sys.stdin.buffer:
+        try:
+            req = json.loads(line)
+            if req["cmd"] == "to-json":
+                resp = {"ok": True, "json": _to_json(req["input"])}
+            elif req["cmd"] == "from-json":
+                if "doc" in req:
+                    doc = req["doc"]
+                else:
+                    with open(req["input"], "r", encoding="utf-8") as f:
+                        doc = json.load(f)
+                _from_json(doc, req["output"])
+                resp = {"ok": True}
+            else:
+                resp = {"ok": False, "error": f"unknown command: {req['cmd']}"}
+        except (OSError, ValueError, KeyError, GvasUnsupported) as e:
+            resp = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        sys.stdout.write(json.dumps(resp, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+    return 0
+
+
+def main(argv):
+    if not argv or argv[0] in ("-h", "--help"):
+        print(_help())
+        return 0 if argv else 2
+    if argv[0] in ("-V", "--version"):
+        print(VERSION)
+        return 0
+    cmd, args = argv[0], argv[1:]
+    if cmd in ("to-json", "from-json") and args[:1] in (["-h"], ["--help"]):
+        print(_sub_help(cmd))
+        return 0
+    if cmd == "batch" and BATCH:
+        return _batch()
+    if cmd not in ("to-json", "from-json"):
+        print(f"error: unrecognized subcommand '{cmd}'", file=sys.stderr)
+        return 2
+    io = _io(args)
+    if io is None or (cmd == "from-json" and io[1] is None):
+        print(f"error: unexpected arguments for {cmd}: {' '.join(args)}", file=sys.stderr)
+        return 2
+    src, dst = io
+    try:
+        if cmd == "to-json":
+            out = json.dumps(_to_json(src), ensure_ascii=False, indent=2)
+            sys.stdout.buffer.write(out.encode("utf-8"))
+            return 0
+        if src == "-":
+            doc = json.load(sys.stdin.buffer)
+        else:
+            with open(src, "r", encoding="utf-8") as f:
+                doc = json.load(f)
+        _from_json(doc, dst)
+        return 0
+    except (OSError, ValueError, GvasUnsupported) as e:
+        print(f"error: {type(e).__name__}: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))